@@ -3,13 +3,18 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import copy
+import functools
 import logging
 import os
+import time
 import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from unittest.mock import Mock
-from typing import Any, AsyncIterator, Sequence
+from typing import Any, AsyncIterator, Callable, Sequence
 
+import orjson
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import (
     AIMessage,
@@ -25,6 +30,7 @@ from .prompts.assembler import assemble_system_prompt
 from .prompts.presets import get_preset
 from .provider_contracts import get_provider_contract
 from .providers import create_chat_model
+from .tools.capabilities import tool_is_read_only, tool_result_is_cacheable
 from .tools.result_schema import (
     extract_text_from_legacy_list,
     make_tool_error,
@@ -49,7 +55,43 @@ def _load_max_iterations() -> int:
         return 0
 
 
+def _load_delta_flush_interval() -> float:
+    """Load the assistant_delta coalescing window (seconds) from environment.
+
+    ``DELTA_FLUSH_INTERVAL_MS`` of 0 or less emits every delta immediately.
+    """
+    raw = (os.getenv("DELTA_FLUSH_INTERVAL_MS", "16") or "16").strip()
+    try:
+        interval_ms = float(raw)
+    except ValueError:
+        logging.getLogger("claude-chat-agent").warning(
+            "Invalid DELTA_FLUSH_INTERVAL_MS=%r, defaulting to 16",
+            raw,
+        )
+        interval_ms = 16.0
+    return max(interval_ms, 0.0) / 1000
+
+
+def _load_tool_result_cache_size() -> int:
+    """Load the per-agent read-only tool result cache size from environment.
+
+    ``TOOL_RESULT_CACHE_SIZE`` of 0 or less (the default) disables caching.
+    """
+    raw = (os.getenv("TOOL_RESULT_CACHE_SIZE", "0") or "0").strip()
+    try:
+        return max(int(raw), 0)
+    except ValueError:
+        logging.getLogger("claude-chat-agent").warning(
+            "Invalid TOOL_RESULT_CACHE_SIZE=%r, defaulting to 0 (disabled)",
+            raw,
+        )
+        return 0
+
+
 MAX_ITERATIONS = _load_max_iterations()
+DELTA_FLUSH_INTERVAL = _load_delta_flush_interval()
+TOOL_RESULT_CACHE_SIZE = _load_tool_result_cache_size()
+DELTA_FLUSH_MAX_CHARS = 256
 DEFAULT_THINKING_BUDGET = 128000
 MIN_THINKING_BUDGET = 1024
 MAX_THINKING_BUDGET = 1_000_000
@@ -91,49 +133,75 @@ def _resolve_thinking_budget(thinking_budget: int | None) -> int:
     return budget
 
 
+@functools.cache
 def _default_system_prompt() -> str:
+    # Built-in presets are immutable, so the lookup is resolved only once.
     preset = get_preset("default")
     if preset is None:
         raise RuntimeError("Built-in 'default' preset is missing")
     return preset.content
 
 
+@dataclass(slots=True, init=False, eq=False)
 class AgentConfig:
     """Configuration received from the backend init message."""
 
+    conversation_id: str
+    provider: str
+    model: str
+    api_key: str = field(repr=False)
+    endpoint_url: str | None
+    subagent_provider: str
+    subagent_model: str
+    subagent_api_key: str = field(repr=False)
+    subagent_endpoint_url: str | None
+    deep_thinking: bool
+    thinking_budget: int | None
+    subagent_thinking_budget: int | None
+    system_prompt: str
+    tools_enabled: bool
+    mcp_servers: list[dict[str, Any]]
+    history: list[dict[str, Any]]
+    history_parts: list[dict[str, Any]]
+    # Image generation model config (separate from chat model)
+    image_provider: str
+    image_model: str
+    image_api_key: str = field(repr=False)
+    image_endpoint_url: str | None
+
     def __init__(self, init_data: dict[str, Any]) -> None:
-        self.conversation_id: str = init_data["conversation_id"]
-        self.provider: str = init_data.get("provider", "openai")
-        self.model: str = init_data.get("model", "gpt-4o")
-        self.api_key: str = init_data.get("api_key", "")
-        self.endpoint_url: str | None = init_data.get("endpoint_url")
-        self.subagent_provider: str = (
-            init_data.get("subagent_provider", "") or self.provider
+        get = init_data.get
+        self.conversation_id = init_data["conversation_id"]
+        self.provider = get("provider", "openai")
+        self.model = get("model", "gpt-4o")
+        self.api_key = get("api_key", "")
+        self.endpoint_url = get("endpoint_url")
+        self.subagent_provider = get("subagent_provider") or self.provider
+        self.subagent_model = get("subagent_model") or self.model
+        self.subagent_api_key = get("subagent_api_key") or self.api_key
+        self.subagent_endpoint_url = get("subagent_endpoint_url") or self.endpoint_url
+        self.deep_thinking = bool(get("deep_thinking", False))
+        self.thinking_budget = get("thinking_budget")
+        subagent_thinking_budget = get("subagent_thinking_budget")
+        self.subagent_thinking_budget = (
+            self.thinking_budget if subagent_thinking_budget is None else subagent_thinking_budget
         )
-        self.subagent_model: str = (
-            init_data.get("subagent_model", "") or self.model
-        )
-        self.subagent_api_key: str = (
-            init_data.get("subagent_api_key", "") or self.api_key
-        )
-        self.subagent_endpoint_url: str | None = (
-            init_data.get("subagent_endpoint_url") or self.endpoint_url
-        )
-        self.deep_thinking: bool = bool(init_data.get("deep_thinking", False))
-        self.thinking_budget: int | None = init_data.get("thinking_budget")
-        self.subagent_thinking_budget: int | None = init_data.get("subagent_thinking_budget")
-        if self.subagent_thinking_budget is None:
-            self.subagent_thinking_budget = self.thinking_budget
-        self.system_prompt: str = init_data.get("system_prompt") or _default_system_prompt()
-        self.tools_enabled: bool = init_data.get("tools_enabled", True)
-        self.mcp_servers: list[dict[str, Any]] = init_data.get("mcp_servers", [])
-        self.history: list[dict[str, Any]] = init_data.get("history", [])
-        self.history_parts: list[dict[str, Any]] = init_data.get("history_parts", [])
-        # Image generation model config (separate from chat model)
-        self.image_provider: str = init_data.get("image_provider", "") or ""
-        self.image_model: str = init_data.get("image_model", "") or ""
-        self.image_api_key: str = init_data.get("image_api_key", "") or ""
-        self.image_endpoint_url: str | None = init_data.get("image_endpoint_url")
+        self.system_prompt = get("system_prompt") or _default_system_prompt()
+        self.tools_enabled = get("tools_enabled", True)
+        self.mcp_servers = get("mcp_servers", [])
+        self.history = get("history", [])
+        self.history_parts = get("history_parts", [])
+        self.image_provider = get("image_provider") or ""
+        self.image_model = get("image_model") or ""
+        self.image_api_key = get("image_api_key") or ""
+        self.image_endpoint_url = get("image_endpoint_url")
+
+
+_ROLE_TO_MESSAGE_CLS: dict[str, type[BaseMessage]] = {
+    "user": HumanMessage,
+    "assistant": AIMessage,
+    "system": SystemMessage,
+}
 
 
 def build_message_history(history: list[dict[str, Any]]) -> list[BaseMessage]:
@@ -143,27 +211,32 @@ def build_message_history(history: list[dict[str, Any]]) -> list[BaseMessage]:
     array persisted in the DB), the blocks are reconstructed into the proper
     AIMessage / ToolMessage sequence that LLM APIs expect.
     """
-    messages: list[BaseMessage] = []
+    # Most entries map to exactly one message, so size the list up front and
+    # write by index; reconstructed tool rounds may grow it past that.
+    messages: list[Any] = [None] * len(history)
+    count = 0
     for entry in history:
-        role = entry.get("role", "")
-        content = entry.get("content", "")
-        tool_calls = entry.get("tool_calls")
-        if role == "user":
-            messages.append(HumanMessage(content=content))
-        elif role == "assistant":
-            if tool_calls:
-                if isinstance(tool_calls, list):
-                    reconstructed = _reconstruct_assistant_messages(tool_calls)
-                    if reconstructed:
-                        messages.extend(reconstructed)
-                    else:
-                        messages.append(AIMessage(content=content))
-                else:
-                    messages.append(AIMessage(content=content))
-            else:
-                messages.append(AIMessage(content=content))
-        elif role == "system":
-            messages.append(SystemMessage(content=content))
+        message_cls = _ROLE_TO_MESSAGE_CLS.get(entry.get("role", ""))
+        if message_cls is None:
+            continue
+        if message_cls is AIMessage:
+            tool_calls = entry.get("tool_calls")
+            if tool_calls and isinstance(tool_calls, list):
+                reconstructed = _reconstruct_assistant_messages(tool_calls)
+                if reconstructed:
+                    end = count + len(reconstructed)
+                    messages[count:end] = reconstructed
+                    count = end
+                    continue
+        # Regular constructors on purpose: model_construct() is slower for
+        # these message classes because it resolves every default in Python.
+        message = message_cls(content=entry.get("content", ""))
+        if count < len(messages):
+            messages[count] = message
+        else:
+            messages.append(message)
+        count += 1
+    del messages[count:]
     return messages
 
 
@@ -218,8 +291,8 @@ def build_message_history_from_parts(history_parts: list[dict[str, Any]]) -> lis
                 return payload
             if isinstance(payload, str):
                 try:
-                    parsed = json.loads(payload)
-                except json.JSONDecodeError:
+                    parsed = orjson.loads(payload)
+                except orjson.JSONDecodeError:
                     return {}
                 return parsed if isinstance(parsed, dict) else {}
             return {}
@@ -367,6 +440,27 @@ def _reconstruct_assistant_messages(
     return result
 
 
+# Attachment image formats that providers accept, extension -> MIME type.
+# Kept apart from the read tool's media list so new media types there are not
+# forwarded to providers that would reject them.
+_IMAGE_MIME_TYPES: dict[str, str] = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "gif": "image/gif",
+    "webp": "image/webp",
+}
+# Extension -> ready-made ``data:`` URL prefix for image blocks.
+_IMAGE_DATA_URI_PREFIXES: dict[str, str] = {
+    ext: f"data:{mime};base64," for ext, mime in _IMAGE_MIME_TYPES.items()
+}
+
+
+def _image_url_block(prefix: str, data: str) -> dict[str, Any]:
+    """Wrap already base64-encoded *data* in an image_url content block."""
+    return {"type": "image_url", "image_url": {"url": prefix + data}}
+
+
 def _build_multimodal_content(
     text: str, attachments: list[dict[str, Any]]
 ) -> str | list[dict[str, Any]]:
@@ -378,41 +472,42 @@ def _build_multimodal_content(
     if not attachments:
         return text
 
-    IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
-    blocks: list[dict[str, Any]] = []
-    if text:
-        blocks.append({"type": "text", "text": text})
-
+    image_blocks: list[dict[str, Any]] = []
     for att in attachments:
-        path = att.get("path", "")
-        ext = os.path.splitext(path)[1].lower()
-        if ext not in IMAGE_EXTENSIONS:
+        _, dot, ext = att.get("path", "").rpartition(".")
+        prefix = _IMAGE_DATA_URI_PREFIXES.get(ext.lower()) if dot else None
+        if prefix is None:
             continue
         data = att.get("data")
         if not data:
             continue
-        mime = f"image/{ext.lstrip('.')}"
-        if ext == ".jpg":
-            mime = "image/jpeg"
-        blocks.append({
-            "type": "image_url",
-            "image_url": {"url": f"data:{mime};base64,{data}"},
-        })
+        image_blocks.append(_image_url_block(prefix, data))
 
-    if len(blocks) <= 1 and not any(b["type"] == "image_url" for b in blocks):
+    if not image_blocks:
         return text
-    return blocks
+    if text:
+        image_blocks.insert(0, {"type": "text", "text": text})
+    return image_blocks
 
 
 class StreamEvent:
     """An event emitted during agent streaming."""
 
+    __slots__ = ("data", "type")
+
     def __init__(self, event_type: str, data: dict[str, Any]) -> None:
         self.type = event_type
         self.data = data
 
+    def to_bytes(self) -> bytes:
+        """Serialize to UTF-8 JSON bytes, ready to send as a text frame."""
+        return orjson.dumps(
+            {"type": self.type, **self.data},
+            option=orjson.OPT_NON_STR_KEYS,
+        )
+
     def to_json(self) -> str:
-        return json.dumps({"type": self.type, **self.data})
+        return self.to_bytes().decode("utf-8")
 
 
 logger = logging.getLogger("claude-chat-agent")
@@ -421,6 +516,118 @@ _REPLACEMENT_CHAR = "\ufffd"
 SUBAGENT_EVENT_QUEUE_MAXSIZE = 256
 
 
+class _DeltaCoalescer:
+    """Merge bursts of ``assistant_delta`` events into fewer, larger events.
+
+    A delta is emitted right away when nothing was emitted during the last
+    *interval* seconds or once *max_chars* are pending; otherwise it is held
+    until the interval has elapsed (see ``flush_delay``), *max_chars* are
+    reached, or a non-delta event arrives, which always flushes pending text
+    first to keep ordering intact.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        max_chars: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._interval = interval
+        self._max_chars = max_chars
+        self._clock = clock
+        self._parts: list[str] = []
+        self._size = 0
+        self._last_emit = float("-inf")
+
+    def flush_delay(self) -> float | None:
+        """Seconds until held text is due, or None when nothing is held."""
+        if not self._parts:
+            return None
+        return max(self._last_emit + self._interval - self._clock(), 0.0)
+
+    def feed(self, event: StreamEvent) -> list[StreamEvent]:
+        if event.type != "assistant_delta":
+            pending = self.drain()
+            pending.append(event)
+            return pending
+        delta = event.data["delta"]
+        self._parts.append(delta)
+        self._size += len(delta)
+        if (
+            self._size >= self._max_chars
+            or self._clock() - self._last_emit >= self._interval
+        ):
+            return self.drain()
+        return []
+
+    def drain(self) -> list[StreamEvent]:
+        if not self._parts:
+            return []
+        delta = "".join(self._parts)
+        self._parts = []
+        self._size = 0
+        self._last_emit = self._clock()
+        return [StreamEvent("assistant_delta", {"delta": delta})]
+
+
+async def _coalesce_deltas(
+    events: AsyncIterator[StreamEvent],
+    deltas: _DeltaCoalescer,
+) -> AsyncIterator[StreamEvent]:
+    """Feed *events* through *deltas*, flushing held text when it falls due.
+
+    One producer task per turn drains *events* into a queue, so a quiet
+    stream (e.g. the model streaming tool arguments) cannot hold back text
+    past its deadline. Queued events are taken without waiting; only an
+    empty queue with text held waits under a deadline. When the consumer
+    stops early or is cancelled, the producer is cancelled and *events* is
+    closed here rather than left to the garbage collector.
+    """
+    # None marks the end of *events*; an exception is re-raised here.
+    queue: asyncio.Queue[StreamEvent | BaseException | None] = asyncio.Queue()
+
+    async def _pump() -> None:
+        try:
+            async for event in events:
+                queue.put_nowait(event)
+        except BaseException as exc:
+            queue.put_nowait(exc)
+            raise
+        queue.put_nowait(None)
+
+    producer = asyncio.create_task(_pump())
+    try:
+        while True:
+            if not queue.empty():
+                item = queue.get_nowait()
+            else:
+                delay = deltas.flush_delay()
+                if delay is None:
+                    item = await queue.get()
+                else:
+                    try:
+                        async with asyncio.timeout(delay):
+                            item = await queue.get()
+                    except TimeoutError:
+                        for out in deltas.drain():
+                            yield out
+                        continue
+            if item is None:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            for out in deltas.feed(item):
+                yield out
+    finally:
+        producer.cancel()
+        try:
+            await producer
+        except (asyncio.CancelledError, Exception):
+            # Already re-raised above, or the cancellation requested here.
+            pass
+        await events.aclose()
+
+
 def _coerce_bool(value: Any) -> bool | None:
     if isinstance(value, bool):
         return value
@@ -549,9 +756,14 @@ def _normalize_tool_result(tool_name: str, result: Any) -> dict[str, Any]:
     return make_tool_success(kind=tool_name, text=str(result))
 
 
-def _normalize_tool_result_for_display(tool_name: str, result: Any) -> dict[str, Any]:
-    """Normalize tool output to frontend-safe structured result."""
-    normalized = _normalize_tool_result(tool_name, result)
+def _tool_result_for_display(normalized: dict[str, Any]) -> dict[str, Any]:
+    """Strip internal-only fields from an already-normalized tool envelope.
+
+    Results without ``llm_content`` are returned as-is; the same dict backs
+    both the tool_result event and the persisted tool_call block.
+    """
+    if "llm_content" not in normalized:
+        return normalized
     return {k: v for k, v in normalized.items() if k != "llm_content"}
 
 
@@ -575,6 +787,8 @@ def sanitize_delta(text: str) -> str:
         return text
     logger.warning("Stripped %d U+FFFD from delta: %r",
                    text.count(_REPLACEMENT_CHAR), text[:200])
+    # str.replace beats str.translate with a prebuilt deletion table here:
+    # translate walks a per-character mapping lookup, replace is a memchr scan.
     return text.replace(_REPLACEMENT_CHAR, "")
 
 
@@ -584,6 +798,10 @@ class ChatAgent:
     def __init__(self, config: AgentConfig, tools: Sequence[BaseTool] = ()) -> None:
         self.config = config
         self.tools = list(tools)
+        # First tool wins on duplicate names, matching a linear scan.
+        self._tools_by_name: dict[str, BaseTool] = {
+            t.name: t for t in reversed(self.tools)
+        }
         self.llm: BaseChatModel = create_chat_model(
             provider=config.provider,
             model=config.model,
@@ -604,6 +822,9 @@ class ChatAgent:
             *restored_history,
         ]
         self._cancelled = False
+        # Successful workspace-read results keyed by (name, canonical args),
+        # LRU. Cleared at the start of every user turn.
+        self._tool_cache: OrderedDict[tuple[str, bytes], dict[str, Any]] = OrderedDict()
 
     def cancel(self) -> None:
         """Signal cancellation of the current generation."""
@@ -630,6 +851,10 @@ class ChatAgent:
                 )
         return accepted
 
+    def clear_tool_cache(self) -> None:
+        """Forget memoized workspace-read tool results."""
+        self._tool_cache.clear()
+
     def truncate_history(self, keep_turns: int) -> None:
         """Truncate message history to keep only the first *keep_turns* user exchanges.
 
@@ -641,12 +866,14 @@ class ChatAgent:
         human_count = 0
         truncate_idx = len(self.messages)
         for i, msg in enumerate(self.messages):
-            if isinstance(msg, HumanMessage):
+            # History only ever holds plain HumanMessage instances, never
+            # subclasses, so an identity check on the type is sufficient.
+            if type(msg) is HumanMessage:
                 human_count += 1
                 if human_count > keep_turns:
                     truncate_idx = i
                     break
-        self.messages = self.messages[:truncate_idx]
+        del self.messages[truncate_idx:]
 
     async def handle_message(self, content: str | list, deep_thinking: bool = False, thinking_budget: int | None = None) -> AsyncIterator[StreamEvent]:
         """Process a user message and yield streaming events.
@@ -658,17 +885,30 @@ class ChatAgent:
                              None means use provider defaults.
 
         Yields StreamEvent objects for: assistant_delta, thinking_delta,
-        tool_call, tool_result, complete, error.
+        tool_call, tool_result, complete, error. Consecutive assistant_delta
+        events are coalesced over ``DELTA_FLUSH_INTERVAL`` seconds.
         """
         self._cancelled = False
+        # Files may have changed since the last turn.
+        self.clear_tool_cache()
         self.messages.append(HumanMessage(content=content))
+        deltas = _DeltaCoalescer(DELTA_FLUSH_INTERVAL, DELTA_FLUSH_MAX_CHARS)
+        events = self._agent_loop(deep_thinking, thinking_budget)
+        if DELTA_FLUSH_INTERVAL > 0:
+            events = _coalesce_deltas(events, deltas)
 
         try:
-            async for event in self._agent_loop(deep_thinking, thinking_budget):
+            async for event in events:
                 yield event
+            for out in deltas.drain():
+                yield out
         except asyncio.CancelledError:
+            for out in deltas.drain():
+                yield out
             yield StreamEvent("error", {"code": "cancelled", "message": "Generation cancelled"})
         except Exception as exc:
+            for out in deltas.drain():
+                yield out
             yield StreamEvent("error", {"code": "agent_error", "message": str(exc)})
 
     def _get_budgeted_llm(self, thinking_budget: int | None = None) -> BaseChatModel:
@@ -709,8 +949,11 @@ class ChatAgent:
 
     async def _agent_loop(self, deep_thinking: bool = False, thinking_budget: int | None = None) -> AsyncIterator[StreamEvent]:
         """Run the agent loop: call LLM, handle tool calls, repeat."""
-        total_content = ""  # Accumulates across all iterations
-        all_content_blocks: list[dict[str, Any]] = []  # Interleaved thinking/text/tool_call blocks
+        # Text deltas across all iterations; joined once when needed.
+        content_parts: list[str] = []
+        # Interleaved thinking/text/tool_call blocks; text and thinking blocks
+        # collect delta parts that are joined once the turn completes.
+        all_content_blocks: list[dict[str, Any]] = []
         effective_budget = thinking_budget if thinking_budget is not None else self.config.thinking_budget
         llm = self._get_turn_llm(deep_thinking, effective_budget)
         if deep_thinking:
@@ -724,7 +967,8 @@ class ChatAgent:
             if self._cancelled:
                 return
 
-            iteration_content = ""  # Per-iteration content for LangChain message history
+            # content_parts[iteration_start:] is this iteration's text for history
+            iteration_start = len(content_parts)
             tool_calls: list[dict[str, Any]] = []
             accumulated_chunk: AIMessageChunk | None = None
 
@@ -747,49 +991,39 @@ class ChatAgent:
                                 chunk_count, type(chunk.content).__name__,
                                 repr(chunk.content)[:300])
 
-                # Stream text content
-                if chunk.content:
-                    if isinstance(chunk.content, str):
-                        delta = sanitize_delta(chunk.content)
+                # Stream text content; plain strings (the common case) take
+                # their own branch and are never wrapped as blocks.
+                content = chunk.content
+                if content:
+                    if isinstance(content, str):
+                        delta = sanitize_delta(content)
                         if delta:
-                            iteration_content += delta
-                            total_content += delta
+                            content_parts.append(delta)
                             yield StreamEvent("assistant_delta", {"delta": delta})
-                            if all_content_blocks and all_content_blocks[-1].get("type") == "text":
-                                all_content_blocks[-1]["content"] += delta
-                            else:
-                                all_content_blocks.append({"type": "text", "content": delta})
-                    elif isinstance(chunk.content, list):
-                        for block in chunk.content:
+                            _append_block_delta(all_content_blocks, "text", delta)
+                    elif isinstance(content, list):
+                        for block in content:
                             if isinstance(block, dict):
-                                for thinking_raw in self.provider_contract.extract_thinking_deltas(block):
+                                thinking_deltas, text_delta = (
+                                    self.provider_contract.extract_block_deltas(block)
+                                )
+                                for thinking_raw in thinking_deltas:
                                     thinking_text = sanitize_delta(thinking_raw)
                                     if thinking_text:
                                         thinking_total += len(thinking_text)
                                         yield StreamEvent("thinking_delta", {"delta": thinking_text})
-                                        if all_content_blocks and all_content_blocks[-1].get("type") == "thinking":
-                                            all_content_blocks[-1]["content"] += thinking_text
-                                        else:
-                                            all_content_blocks.append({"type": "thinking", "content": thinking_text})
-                                delta = sanitize_delta(self.provider_contract.extract_text_delta(block))
+                                        _append_block_delta(all_content_blocks, "thinking", thinking_text)
+                                delta = sanitize_delta(text_delta)
                                 if delta:
-                                    iteration_content += delta
-                                    total_content += delta
+                                    content_parts.append(delta)
                                     yield StreamEvent("assistant_delta", {"delta": delta})
-                                    if all_content_blocks and all_content_blocks[-1].get("type") == "text":
-                                        all_content_blocks[-1]["content"] += delta
-                                    else:
-                                        all_content_blocks.append({"type": "text", "content": delta})
+                                    _append_block_delta(all_content_blocks, "text", delta)
                             else:
                                 delta = sanitize_delta(str(block))
                                 if delta:
-                                    iteration_content += delta
-                                    total_content += delta
+                                    content_parts.append(delta)
                                     yield StreamEvent("assistant_delta", {"delta": delta})
-                                    if all_content_blocks and all_content_blocks[-1].get("type") == "text":
-                                        all_content_blocks[-1]["content"] += delta
-                                    else:
-                                        all_content_blocks.append({"type": "text", "content": delta})
+                                    _append_block_delta(all_content_blocks, "text", delta)
 
                 # Accumulate tool calls
                 if chunk.tool_call_chunks:
@@ -800,6 +1034,10 @@ class ChatAgent:
             if deep_thinking:
                 logger.info("Thinking total chars: %d", thinking_total)
             tool_calls = [tc for tc in tool_calls if tc.get("name")]
+            # Fix each call's id once so history, events and results agree.
+            for tc in tool_calls:
+                if not tc.get("id"):
+                    tc["id"] = str(uuid.uuid4())
 
             # If no tool calls, we're done
             if not tool_calls:
@@ -810,15 +1048,12 @@ class ChatAgent:
                         if not (isinstance(block, dict) and block.get("type") == "tool_use")
                     ]
                 else:
-                    final_content = iteration_content
+                    final_content = "".join(content_parts[iteration_start:])
                 final_content = self.provider_contract.normalize_history_content(final_content)
                 self.messages.append(AIMessage(content=final_content))
-                has_rich_blocks = any(
-                    b.get("type") in ("tool_call", "thinking")
-                    for b in all_content_blocks
-                )
+                has_rich_blocks = _join_block_deltas(all_content_blocks)
                 yield StreamEvent("complete", {
-                    "content": total_content,
+                    "content": "".join(content_parts),
                     "tool_calls": all_content_blocks if has_rich_blocks else None,
                 })
                 return
@@ -831,15 +1066,15 @@ class ChatAgent:
                     if not (isinstance(block, dict) and block.get("type") == "tool_use")
                 ]
                 if not ai_content:
-                    ai_content = iteration_content
+                    ai_content = "".join(content_parts[iteration_start:])
             else:
-                ai_content = iteration_content
+                ai_content = "".join(content_parts[iteration_start:])
             ai_content = self.provider_contract.normalize_history_content(ai_content)
             ai_msg = AIMessage(
                 content=ai_content,
                 tool_calls=[
                     {
-                        "id": tc.get("id", str(uuid.uuid4())),
+                        "id": tc["id"],
                         "name": tc["name"],
                         "args": tc.get("args", {}),
                     }
@@ -848,12 +1083,30 @@ class ChatAgent:
             )
             self.messages.append(ai_msg)
 
-            # Execute tool calls
-            for tc in tool_calls:
+            # Execute tool calls; runs of read-only calls execute concurrently.
+            for group in _group_tool_calls(tool_calls, self._tools_by_name):
                 if self._cancelled:
                     return
+                if len(group) > 1:
+                    for tc in group:
+                        yield StreamEvent("tool_call", {
+                            "tool_call_id": tc["id"],
+                            "tool_name": tc["name"],
+                            "tool_input": tc.get("args", {}),
+                        })
+                    outcomes = await asyncio.gather(*(
+                        self._execute_tool(tc["name"], tc.get("args", {}))
+                        for tc in group
+                    ))
+                    for tc, (result, is_error) in zip(group, outcomes):
+                        yield self._record_tool_result(
+                            tc["id"], tc["name"], tc.get("args", {}),
+                            result, is_error, all_content_blocks,
+                        )
+                    continue
 
-                tc_id = tc.get("id", str(uuid.uuid4()))
+                tc = group[0]
+                tc_id = tc["id"]
                 tc_name = tc["name"]
                 tc_args = tc.get("args", {})
 
@@ -863,7 +1116,7 @@ class ChatAgent:
                     "tool_input": tc_args,
                 })
 
-                tool = next((t for t in self.tools if t.name == tc_name), None)
+                tool = self._tools_by_name.get(tc_name)
                 set_event_sink = getattr(tool, "set_event_sink", None)
                 if _tool_supports_runtime_events(tool) and callable(set_event_sink):
                     runtime_event_queue: asyncio.Queue[Any] = asyncio.Queue(
@@ -931,27 +1184,10 @@ class ChatAgent:
                         set_event_sink(None)
                 else:
                     result, is_error = await self._execute_tool(tc_name, tc_args)
-                display_result = _normalize_tool_result_for_display(tc_name, result)
-
-                yield StreamEvent("tool_result", {
-                    "tool_call_id": tc_id,
-                    "result": display_result,
-                    "is_error": is_error,
-                })
-
-                self.messages.append(
-                    ToolMessage(content=_tool_message_content(result), tool_call_id=tc_id)
+                yield self._record_tool_result(
+                    tc_id, tc_name, tc_args, result, is_error, all_content_blocks,
                 )
 
-                all_content_blocks.append({
-                    "type": "tool_call",
-                    "id": tc_id,
-                    "name": tc_name,
-                    "input": tc_args,
-                    "result": display_result,
-                    "isError": is_error,
-                })
-
         if MAX_ITERATIONS > 0:
             # Exhausted MAX_ITERATIONS without a final response
             yield StreamEvent("error", {
@@ -959,6 +1195,34 @@ class ChatAgent:
                 "message": f"Agent exceeded maximum of {MAX_ITERATIONS} iterations",
             })
 
+    def _record_tool_result(
+        self,
+        tc_id: str,
+        tc_name: str,
+        tc_args: dict[str, Any],
+        result: dict[str, Any],
+        is_error: bool,
+        all_content_blocks: list[dict[str, Any]],
+    ) -> StreamEvent:
+        """Append a finished tool call to history and return its tool_result event."""
+        display_result = _tool_result_for_display(result)
+        self.messages.append(
+            ToolMessage(content=_tool_message_content(result), tool_call_id=tc_id)
+        )
+        all_content_blocks.append({
+            "type": "tool_call",
+            "id": tc_id,
+            "name": tc_name,
+            "input": tc_args,
+            "result": display_result,
+            "isError": is_error,
+        })
+        return StreamEvent("tool_result", {
+            "tool_call_id": tc_id,
+            "result": display_result,
+            "is_error": is_error,
+        })
+
     async def _execute_tool(
         self, name: str, args: dict[str, Any]
     ) -> tuple[dict[str, Any], bool]:
@@ -966,19 +1230,91 @@ class ChatAgent:
 
         Result is always a normalized structured envelope.
         """
-        tool = next((t for t in self.tools if t.name == name), None)
+        tool = self._tools_by_name.get(name)
         if tool is None:
             result = make_tool_error(kind=name, error=f"Unknown tool: {name}")
             return result, True
 
+        cache_key = None
+        if TOOL_RESULT_CACHE_SIZE > 0:
+            if tool_result_is_cacheable(tool):
+                cache_key = (name, orjson.dumps(args, option=orjson.OPT_SORT_KEYS))
+                cached = self._tool_cache.get(cache_key)
+                if cached is not None:
+                    self._tool_cache.move_to_end(cache_key)
+                    # Results end up in events and history; hand out a copy.
+                    return copy.deepcopy(cached), False
+            elif not tool_is_read_only(tool):
+                # Any other tool may change what a read-only one would see.
+                self._tool_cache.clear()
+
         try:
             result = await tool.ainvoke(args)
             normalized = _normalize_tool_result(name, result)
-            return normalized, not bool(normalized.get("success", True))
+            is_error = not bool(normalized.get("success", True))
         except Exception as exc:
             error_result = make_tool_error(kind=name, error=f"Tool error: {exc}")
             return error_result, True
 
+        if cache_key is not None and not is_error:
+            self._tool_cache[cache_key] = copy.deepcopy(normalized)
+            if len(self._tool_cache) > TOOL_RESULT_CACHE_SIZE:
+                self._tool_cache.popitem(last=False)
+        return normalized, is_error
+
+
+def _append_block_delta(
+    blocks: list[dict[str, Any]], block_type: str, delta: str
+) -> None:
+    """Add *delta* to the trailing *block_type* block, opening one if needed."""
+    if blocks and blocks[-1]["type"] == block_type:
+        blocks[-1]["content"].append(delta)
+    else:
+        blocks.append({"type": block_type, "content": [delta]})
+
+
+def _join_block_deltas(blocks: list[dict[str, Any]]) -> bool:
+    """Join text/thinking delta parts in place.
+
+    Returns True when any thinking or tool_call block is present.
+    """
+    has_rich_blocks = False
+    for block in blocks:
+        block_type = block["type"]
+        if block_type == "tool_call":
+            has_rich_blocks = True
+            continue
+        if block_type == "thinking":
+            has_rich_blocks = True
+        block["content"] = "".join(block["content"])
+    return has_rich_blocks
+
+
+def _group_tool_calls(
+    tool_calls: list[dict[str, Any]],
+    tools_by_name: dict[str, BaseTool],
+) -> list[list[dict[str, Any]]]:
+    """Split tool calls into execution groups, preserving order.
+
+    Consecutive calls to read-only tools without runtime events share a group
+    and may run concurrently; every other call gets a group of its own.
+    """
+    groups: list[list[dict[str, Any]]] = []
+    in_parallel_run = False
+    for tc in tool_calls:
+        tool = tools_by_name.get(tc["name"])
+        parallel_safe = (
+            tool is not None
+            and tool_is_read_only(tool)
+            and not _tool_supports_runtime_events(tool)
+        )
+        if parallel_safe and in_parallel_run:
+            groups[-1].append(tc)
+        else:
+            groups.append([tc])
+        in_parallel_run = parallel_safe
+    return groups
+
 
 def _accumulate_tool_call(
     tool_calls: list[dict[str, Any]],
@@ -1011,10 +1347,12 @@ def _accumulate_tool_call(
     chunk_args = _get(chunk, "args")
     if chunk_args:
         tc["args_str"] += chunk_args
-
-    # Try to parse accumulated args
-    if tc["args_str"]:
-        try:
-            tc["args"] = json.loads(tc["args_str"])
-        except json.JSONDecodeError:
-            pass
+        # Args are a JSON object, so the buffer can only be complete when the
+        # new text ends in "}". Skipping the other fragments keeps long
+        # streamed args linear instead of re-decoding the prefix per chunk.
+        # The parsed dict is handed to the tool as-is, never decoded again.
+        if chunk_args.rstrip().endswith("}"):
+            try:
+                tc["args"] = orjson.loads(tc["args_str"])
+            except orjson.JSONDecodeError:
+                pass
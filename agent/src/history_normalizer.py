@@ -18,18 +18,25 @@ def _is_empty_text_block(block: dict[str, Any]) -> bool:
 
 
 def _strip_openai_response_ids(value: Any) -> Any:
+    # Copies containers rather than mutating them: the blocks may still be
+    # referenced by the streamed chunk they came from. Scalars are returned
+    # as-is without recursing, which is most of the leaves.
     if isinstance(value, list):
-        return [_strip_openai_response_ids(v) for v in value]
+        return [
+            _strip_openai_response_ids(v) if isinstance(v, (list, dict)) else v
+            for v in value
+        ]
     if isinstance(value, dict):
         cleaned: dict[str, Any] = {}
         for key, val in value.items():
-            if (
-                key in _OPENAI_RESPONSE_ID_KEYS
-                and isinstance(val, str)
-                and val.startswith(_OPENAI_RESPONSE_ID_PREFIXES)
-            ):
-                continue
-            cleaned[key] = _strip_openai_response_ids(val)
+            if isinstance(val, str):
+                if key in _OPENAI_RESPONSE_ID_KEYS and val.startswith(_OPENAI_RESPONSE_ID_PREFIXES):
+                    continue
+                cleaned[key] = val
+            elif isinstance(val, (list, dict)):
+                cleaned[key] = _strip_openai_response_ids(val)
+            else:
+                cleaned[key] = val
         return cleaned
     return value
 
@@ -39,7 +46,16 @@ def normalize_history_content(provider: str, content: Any) -> Any:
     if not isinstance(content, list):
         return content
 
-    normalized = [b for b in content if not (isinstance(b, dict) and _is_empty_text_block(b))]
-    if provider.lower() == "openai":
-        normalized = _strip_openai_response_ids(normalized)
+    strip_ids = provider.lower() == "openai"
+    # One pass: drop empty text/thinking blocks and strip ids as we go.
+    normalized: list[Any] = []
+    for block in content:
+        if isinstance(block, dict):
+            if _is_empty_text_block(block):
+                continue
+            if strip_ids:
+                block = _strip_openai_response_ids(block)
+        elif strip_ids and isinstance(block, list):
+            block = _strip_openai_response_ids(block)
+        normalized.append(block)
     return normalized
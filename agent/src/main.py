@@ -10,6 +10,7 @@ import os
 import signal
 import sys
 
+import orjson
 import websockets
 from tenacity import (
     retry,
@@ -95,8 +96,10 @@ class AgentSession:
     async def _handle_message(self, raw: str | bytes) -> None:
         """Dispatch an incoming WebSocket message."""
         try:
-            msg = json.loads(raw)
-        except json.JSONDecodeError:
+            # The init message carries the whole history (including inline
+            # attachments), so decode it with orjson.
+            msg = orjson.loads(raw)
+        except orjson.JSONDecodeError:
             logger.warning("Invalid JSON received: %s", raw[:200])
             return
 
@@ -224,7 +227,8 @@ class AgentSession:
             self.agent.config.subagent_thinking_budget = subagent_thinking_budget
         try:
             async for event in self.agent.handle_message(content, deep_thinking, thinking_budget):
-                await self.ws.send(event.to_json())
+                # Backend only accepts text frames; send the encoded bytes as one.
+                await self.ws.send(event.to_bytes(), text=True)
         except websockets.ConnectionClosed:
             logger.warning("WebSocket closed during agent run")
         except asyncio.CancelledError:
@@ -264,6 +268,8 @@ class AgentSession:
         keep_turns = msg.get("keep_turns", 0)
         old_len = len(self.agent.messages)
         self.agent.truncate_history(keep_turns)
+        # A regenerate/edit should see the workspace as it is now.
+        self.agent.clear_tool_cache()
         logger.info(
             "Truncated history: keep_turns=%d, messages %d -> %d",
             keep_turns, old_len, len(self.agent.messages),
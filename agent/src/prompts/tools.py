@@ -74,6 +74,16 @@ TOOL_DESCRIPTIONS = {
         "  - Use for retrieving documentation, API responses, "
         "or web page content."
     ),
+    "web_fetch_many": (
+        "**web_fetch_many** - Fetch content from several URLs concurrently.\n"
+        "  - Takes a `urls` list (up to 20) plus the same `format` and "
+        "`max_length` options as web_fetch (applied per URL).\n"
+        "  - Prefer this over repeated web_fetch calls when you already know "
+        "every URL you need.\n"
+        "  - Results come back in input order, one section per URL; a failed "
+        "URL is reported inline without failing the others.\n"
+        "  - Read-only operation; does not modify any files."
+    ),
     "web_search": (
         "**web_search** - Search the web for up-to-date information.\n"
         "  - Returns relevant web page content for a given query.\n"
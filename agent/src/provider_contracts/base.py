@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Sequence
 
 from ..history_normalizer import normalize_history_content
 from ..provider_capabilities import (
@@ -42,3 +42,15 @@ class ProviderContract:
         if block.get("type") != "text":
             return ""
         return str(block.get("text", ""))
+
+    def extract_block_deltas(
+        self, block: dict[str, Any]
+    ) -> tuple[Sequence[str], str]:
+        """Split one streamed content block into (thinking deltas, text delta).
+
+        Only ``text`` blocks carry visible text, so each block is routed to a
+        single extractor instead of being probed by both.
+        """
+        if block.get("type") == "text":
+            return (), self.extract_text_delta(block)
+        return self.extract_thinking_deltas(block), ""
@@ -10,7 +10,7 @@ from .bash import BashTool
 from .file_ops import ReadTool, WriteTool, EditTool
 from .list_tool import ListTool
 from .search import GlobTool, GrepTool
-from .web import WebFetchTool, WebSearchTool
+from .web import WebFetchManyTool, WebFetchTool, WebSearchTool
 from .code_interpreter import CodeInterpreterTool
 from .image_gen import ImageGenerationTool
 from .explore import ExploreTool
@@ -26,6 +26,7 @@ ALL_TOOLS = [
     GlobTool,
     GrepTool,
     WebFetchTool,
+    WebFetchManyTool,
     WebSearchTool,
     QuestionTool,
     CodeInterpreterTool,
@@ -56,6 +57,7 @@ def create_all_tools(
         GlobTool(workspace=workspace),
         GrepTool(workspace=workspace),
         WebFetchTool(),
+        WebFetchManyTool(),
         WebSearchTool(),
         QuestionTool(),
         CodeInterpreterTool(workspace=workspace),
@@ -5,7 +5,26 @@ from typing import Any
 
 from langchain_core.tools import BaseTool
 
-READ_ONLY_BUILTINS = {"read", "list", "glob", "grep", "web_fetch", "web_search"}
+_SERVER_SEPARATORS = (".", "__", ":", "/")
+
+READ_ONLY_BUILTINS = {
+    "read",
+    "list",
+    "glob",
+    "grep",
+    "web_fetch",
+    "web_fetch_many",
+    "web_search",
+}
+
+# Read-only builtins whose results depend only on the workspace. Network reads
+# are deliberately absent: their results must never be served from a cache.
+CACHEABLE_BUILTINS = {
+    "read",
+    "list",
+    "glob",
+    "grep",
+}
 
 
 def _as_bool(value: Any) -> bool | None:
@@ -50,6 +69,10 @@ def tool_is_read_only(tool: BaseTool) -> bool:
     return bool(val) if val is not None else False
 
 
+def tool_result_is_cacheable(tool: BaseTool) -> bool:
+    return tool.name in CACHEABLE_BUILTINS and tool_is_read_only(tool)
+
+
 def annotate_builtin_tools(tools: list[BaseTool]) -> None:
     for tool in tools:
         set_tool_capabilities(
@@ -131,27 +154,35 @@ def _extract_mcp_server_name(
     if not tool_name:
         return None
 
-    for server in known_servers:
-        if (
-            tool_name.startswith(f"{server}.")
-            or tool_name.startswith(f"{server}__")
-            or tool_name.startswith(f"{server}:")
-            or tool_name.startswith(f"{server}/")
-        ):
-            return server
-    return None
+    prefixed = _known_server_prefixes(tool_name, known_servers)
+    return prefixed[0][0] if prefixed else None
+
+
+def _known_server_prefixes(
+    tool_name: str,
+    known_servers: set[str],
+) -> list[tuple[str, str]]:
+    # Probe the set at each separator in the name instead of testing every
+    # server as a prefix, so the cost tracks the name, not the server count.
+    # Longest server first, so "org.repo" wins over "org" for "org.repo__x".
+    matches: list[tuple[str, str]] = []
+    for sep in _SERVER_SEPARATORS:
+        # Start at 1: a server name is never empty, but may begin with a separator.
+        pos = tool_name.find(sep, 1)
+        while pos != -1:
+            server = tool_name[:pos]
+            if server in known_servers:
+                matches.append((server, tool_name[pos + len(sep):]))
+            pos = tool_name.find(sep, pos + 1)
+    matches.sort(key=lambda match: len(match[0]), reverse=True)
+    return matches
 
 
 def _tool_name_candidates(tool_name: str, server_name: str | None) -> list[str]:
     candidates = [tool_name]
     if server_name:
-        prefixes = [
-            f"{server_name}.",
-            f"{server_name}__",
-            f"{server_name}:",
-            f"{server_name}/",
-        ]
-        for prefix in prefixes:
+        for sep in _SERVER_SEPARATORS:
+            prefix = f"{server_name}{sep}"
             if tool_name.startswith(prefix):
                 short = tool_name[len(prefix):]
                 if short:
@@ -209,8 +240,11 @@ def annotate_mcp_tools(
 
         if not applied_override and global_unique_overrides:
             fallback_candidates = _tool_name_candidates(tool_name, server_name)
-            for known_server in known_servers:
-                fallback_candidates.extend(_tool_name_candidates(tool_name, known_server))
+            fallback_candidates.extend(
+                short
+                for _server, short in _known_server_prefixes(tool_name, known_servers)
+                if short
+            )
             for candidate in _unique_preserve_order(fallback_candidates):
                 if candidate in global_unique_overrides:
                     read_only = global_unique_overrides[candidate]
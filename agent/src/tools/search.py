@@ -3,6 +3,7 @@ from __future__ import annotations
 import os
 import re
 from collections import deque
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Iterator, Type
 
@@ -27,6 +28,15 @@ _SKIP_DIRS = {
     "target",
 }
 
+_BRACE_GROUP_RE = re.compile(r"\{([^{}]+)\}")
+
+
+@lru_cache(maxsize=256)
+def _compile_pattern(pattern: str) -> re.Pattern[str]:
+    # The model tends to grep for the same few patterns across turns; skip
+    # re.compile's own bookkeeping on repeats. Errors are not cached.
+    return re.compile(pattern)
+
 
 def _expand_braces(pattern: str) -> list[str]:
     """Expand bash-style brace patterns (e.g. ``*.{py,txt}``) into separate globs.
@@ -34,7 +44,7 @@ def _expand_braces(pattern: str) -> list[str]:
     Python's ``pathlib.glob`` does not support brace expansion, so this helper
     recursively expands ``{a,b,c}`` groups into individual patterns.
     """
-    match = re.search(r"\{([^{}]+)\}", pattern)
+    match = _BRACE_GROUP_RE.search(pattern)
     if not match:
         return [pattern]
     prefix = pattern[: match.start()]
@@ -225,7 +235,7 @@ class GrepTool(BaseTool):
             return make_tool_error(kind=self.name, error=f"path '{path}' does not exist")
 
         try:
-            regex = re.compile(pattern)
+            regex = _compile_pattern(pattern)
         except re.error as exc:
             return make_tool_error(kind=self.name, error=f"invalid regex pattern: {exc}")
 
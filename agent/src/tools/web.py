@@ -1,25 +1,94 @@
 from __future__ import annotations
 
+import asyncio
+import codecs
 import json
 from typing import Any, Literal, Type
 
 import html2text
 import httpx
 import httpx_sse
+import orjson
 from bs4 import BeautifulSoup
 from langchain_core.tools import BaseTool
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 from .result_schema import make_tool_error, make_tool_success
 
 EXA_MCP_URL = "https://mcp.exa.ai/mcp"
 MAX_WEBFETCH_BYTES = 5 * 1024 * 1024
+DEFAULT_FETCH_CONCURRENCY = 10
+MAX_FETCH_MANY_URLS = 20
+# Upper bound on SSE frames read from a single web search response.
+MAX_SSE_EVENTS = 128
 
 _h2t = html2text.HTML2Text()
 _h2t.ignore_links = False
 _h2t.ignore_images = True
 _h2t.body_width = 0  # no wrapping
 
+# Substrings that mark a non-``text/*`` subtype as textual; matching inside
+# the subtype keeps ``x-ndjson``, ``json-seq``, ``ld+json`` etc. fetchable.
+_TEXTUAL_SUBTYPE_TOKENS = ("json", "xml", "javascript", "ecmascript", "yaml", "csv", "html")
+
+# Worst-case bytes per character for the Unicode encodings below. Stateful
+# encodings such as ISO-2022-JP have no such bound and are decoded whole.
+_MAX_BYTES_PER_CHAR = 4
+_BOUNDED_WIDTH_CODECS = frozenset({
+    "utf-8",
+    "utf-8-sig",
+    "utf-16",
+    "utf-16-le",
+    "utf-16-be",
+    "utf-32",
+    "utf-32-le",
+    "utf-32-be",
+})
+
+ContentType = tuple[str, str, str]
+
+
+def _parse_content_type(header: str) -> ContentType:
+    """Split a Content-Type header into lowercased ``(major, subtype, charset)``."""
+    mime, _, params = header.partition(";")
+    major, _, subtype = mime.strip().lower().partition("/")
+    charset = ""
+    for param in params.split(";"):
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset":
+            charset = value.strip().strip('"').lower()
+            break
+    return major, subtype, charset
+
+
+def _is_passthrough_type(parsed_type: ContentType) -> bool:
+    """Return True when bodies of this type are returned verbatim in every format.
+
+    Only HTML and JSON are rewritten by ``_format_response_body``.
+    """
+    _, subtype, _ = parsed_type
+    if subtype in ("html", "xhtml+xml", "json"):
+        return False
+    return not subtype.endswith("+json")
+
+
+def _has_bounded_char_width(charset: str) -> bool:
+    """Return True when *charset* never spends more than ``_MAX_BYTES_PER_CHAR`` bytes per char."""
+    try:
+        name = codecs.lookup(charset or "utf-8").name
+    except LookupError:
+        # _decode_body falls back to UTF-8 for unknown charsets.
+        return True
+    return name in _BOUNDED_WIDTH_CODECS
+
+
+def _decode_body(raw: bytes, *, charset: str) -> str:
+    """Decode response bytes with the declared charset, defaulting to UTF-8."""
+    try:
+        return raw.decode(charset or "utf-8", errors="replace")
+    except LookupError:
+        return raw.decode("utf-8", errors="replace")
+
 
 class WebFetchInput(BaseModel):
     """Input for the WebFetchTool."""
@@ -55,37 +124,27 @@ class WebFetchTool(BaseTool):
             "WebFetchTool does not support synchronous execution. Use the async interface."
         )
 
-    def _is_textual_content_type(self, content_type: str) -> bool:
-        lowered = content_type.lower()
-        return any(
-            token in lowered
-            for token in (
-                "text/",
-                "json",
-                "xml",
-                "javascript",
-                "yaml",
-                "csv",
-                "html",
-            )
-        )
+    def _is_textual_content_type(self, *, parsed_type: ContentType) -> bool:
+        major, subtype, _ = parsed_type
+        return major == "text" or any(token in subtype for token in _TEXTUAL_SUBTYPE_TOKENS)
 
     def _format_response_body(
         self,
         *,
         body: str,
-        content_type: str,
+        parsed_type: ContentType,
         format: Literal["text", "markdown", "html"],
     ) -> str:
-        lowered_type = content_type.lower()
-        if "html" in lowered_type:
+        # Passthrough types never get here; _arun returns them verbatim.
+        _, subtype, _ = parsed_type
+        if subtype == "html" or subtype == "xhtml+xml":
             if format == "html":
                 return body
             if format == "markdown":
                 return _h2t.handle(body)
             return BeautifulSoup(body, "html.parser").get_text("\n", strip=True)
 
-        if "json" in lowered_type:
+        if subtype == "json" or subtype.endswith("+json"):
             try:
                 obj = json.loads(body)
             except json.JSONDecodeError:
@@ -133,30 +192,50 @@ class WebFetchTool(BaseTool):
             )
 
         content_type = response.headers.get("content-type", "")
-        if len(response.content) > MAX_WEBFETCH_BYTES:
+        parsed_type = _parse_content_type(content_type)
+        raw = response.content
+        if len(raw) > MAX_WEBFETCH_BYTES:
             return make_tool_error(
                 kind=self.name,
                 error=(
-                    f"response too large for '{url}': {len(response.content)} bytes "
+                    f"response too large for '{url}': {len(raw)} bytes "
                     f"(max {MAX_WEBFETCH_BYTES} bytes)"
                 ),
             )
-        if not self._is_textual_content_type(content_type):
+        if not self._is_textual_content_type(parsed_type=parsed_type):
             return make_tool_error(
                 kind=self.name,
                 error=f"unsupported content type for text fetch: '{content_type}'",
                 data={"url": str(response.url), "content_type": content_type},
             )
 
-        body = response.text
-        text = self._format_response_body(
-            body=body,
-            content_type=content_type,
-            format=format,
+        # Passthrough bodies are returned verbatim, so only the prefix that can
+        # survive truncation needs decoding and the formatter is skipped.
+        # HTML/JSON, and charsets without a per-char byte bound, are decoded whole.
+        passthrough = _is_passthrough_type(parsed_type)
+        decode_limit = (max_length + 1) * _MAX_BYTES_PER_CHAR
+        fully_decoded = (
+            not passthrough
+            or len(raw) <= decode_limit
+            or not _has_bounded_char_width(parsed_type[2])
+        )
+        body = _decode_body(
+            raw if fully_decoded else raw[:decode_limit],
+            charset=parsed_type[2],
         )
+        if passthrough:
+            text = body
+        else:
+            text = self._format_response_body(
+                body=body,
+                parsed_type=parsed_type,
+                format=format,
+            )
 
         truncated = False
-        original_char_count = len(text)
+        # A body cut off before decoding has no known length; ``bytes`` still
+        # reports its size.
+        original_char_count = len(text) if fully_decoded else None
         if len(text) > max_length:
             text = text[:max_length] + "\n... content truncated"
             truncated = True
@@ -173,10 +252,139 @@ class WebFetchTool(BaseTool):
                 "truncated": truncated,
                 "char_count": len(text),
                 "original_char_count": original_char_count,
-                "bytes": len(response.content),
+                "bytes": len(raw),
             },
         )
 
+    async def afetch_many(
+        self,
+        urls: list[str],
+        max_length: int = 50000,
+        format: Literal["text", "markdown", "html"] = "markdown",
+        concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+    ) -> list[dict[str, Any]]:
+        """Fetch several URLs concurrently, at most *concurrency* at a time.
+
+        Results are returned in input order; an unexpected exception for one
+        URL becomes an error envelope instead of failing the whole batch.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _fetch_one(url: str) -> dict[str, Any]:
+            async with semaphore:
+                return await self._arun(url, max_length, format)
+
+        outcomes = await asyncio.gather(
+            *(_fetch_one(url) for url in urls),
+            return_exceptions=True,
+        )
+        results: list[dict[str, Any]] = []
+        for url, outcome in zip(urls, outcomes):
+            if isinstance(outcome, BaseException):
+                if isinstance(outcome, asyncio.CancelledError):
+                    raise outcome
+                outcome = make_tool_error(
+                    kind=self.name,
+                    error=f"failed to fetch '{url}': {outcome}",
+                )
+            results.append(outcome)
+        return results
+
+
+class WebFetchManyInput(BaseModel):
+    """Input for the WebFetchManyTool."""
+
+    urls: list[str] = Field(
+        description=f"The URLs to fetch (at most {MAX_FETCH_MANY_URLS}).",
+    )
+    max_length: int = Field(
+        default=50000,
+        description="Maximum number of characters to return per URL.",
+    )
+    format: Literal["text", "markdown", "html"] = Field(
+        default="markdown",
+        description="Desired output format: text, markdown, or html.",
+    )
+
+
+class WebFetchManyTool(BaseTool):
+    """Fetch several URLs concurrently and return their text content."""
+
+    name: str = "web_fetch_many"
+    description: str = (
+        "Fetch content from several URLs concurrently. Supports output formats "
+        "text/markdown/html. Each result is truncated to max_length characters."
+    )
+    args_schema: Type[BaseModel] = WebFetchManyInput
+    concurrency: int = DEFAULT_FETCH_CONCURRENCY
+    _fetcher: WebFetchTool = PrivateAttr(default_factory=WebFetchTool)
+
+    def _run(
+        self,
+        urls: list[str],
+        max_length: int = 50000,
+        format: Literal["text", "markdown", "html"] = "markdown",
+    ) -> dict[str, Any]:
+        raise NotImplementedError(
+            "WebFetchManyTool does not support synchronous execution. Use the async interface."
+        )
+
+    async def _arun(
+        self,
+        urls: list[str],
+        max_length: int = 50000,
+        format: Literal["text", "markdown", "html"] = "markdown",
+    ) -> dict[str, Any]:
+        if not urls:
+            return make_tool_error(kind=self.name, error="no URLs given")
+        if len(urls) > MAX_FETCH_MANY_URLS:
+            return make_tool_error(
+                kind=self.name,
+                error=f"too many URLs: {len(urls)} (max {MAX_FETCH_MANY_URLS})",
+            )
+
+        results = await self._fetcher.afetch_many(
+            urls,
+            max_length=max_length,
+            format=format,
+            concurrency=self.concurrency,
+        )
+        sections = [
+            f"## {url}\n\n{result.get('text', '')}"
+            for url, result in zip(urls, results)
+        ]
+        failed = sum(1 for result in results if not result.get("success"))
+        # Page bodies already live in ``text``; keep ``data`` to per-URL status.
+        data = {
+            "format": format,
+            "results": [
+                {
+                    "url": url,
+                    "success": bool(result.get("success")),
+                    "error": result.get("error"),
+                    "meta": result.get("meta") or {},
+                }
+                for url, result in zip(urls, results)
+            ],
+        }
+        meta = {"url_count": len(urls), "failed_count": failed}
+        text = "\n\n".join(sections)
+        if failed == len(urls):
+            return make_tool_error(
+                kind=self.name,
+                error=f"all {len(urls)} URLs failed to fetch",
+                text=text,
+                data=data,
+                meta=meta,
+            )
+        return make_tool_success(kind=self.name, text=text, data=data, meta=meta)
+
+
+def _jsonrpc_error_message(error: Any) -> str:
+    if isinstance(error, dict):
+        return str(error.get("message") or error)
+    return str(error)
+
 
 class WebSearchInput(BaseModel):
     """Input for the WebSearchTool."""
@@ -235,9 +443,31 @@ class WebSearchTool(BaseTool):
                         "content-type": "application/json",
                     },
                 ) as event_source:
+                    events_seen = 0
                     async for event in event_source.aiter_sse():
+                        events_seen += 1
+                        if events_seen > MAX_SSE_EVENTS:
+                            return make_tool_error(
+                                kind=self.name,
+                                error=(
+                                    "web search response exceeded the limit of "
+                                    f"{MAX_SSE_EVENTS} SSE events without a result"
+                                ),
+                            )
+                        if event.event == "error":
+                            return make_tool_error(
+                                kind=self.name,
+                                error=f"web search stream error: {event.data}",
+                            )
+                        if event.event == "done":
+                            break
                         try:
-                            data = json.loads(event.data)
+                            data = orjson.loads(event.data)
+                            if data.get("error"):
+                                return make_tool_error(
+                                    kind=self.name,
+                                    error=f"web search failed: {_jsonrpc_error_message(data['error'])}",
+                                )
                             content = data.get("result", {}).get("content") or []
                             if content:
                                 text = "\n\n".join(
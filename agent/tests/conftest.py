@@ -2,14 +2,17 @@
 
 from __future__ import annotations
 
-import json
 from typing import Any
-from unittest.mock import MagicMock
 
+import orjson
 import pytest
 from langchain_core.messages import AIMessageChunk, ToolCallChunk
+from langchain_core.tools import BaseTool
 
 from src.agent import AgentConfig, ChatAgent, StreamEvent
+from src.tools import create_all_tools
+
+from .stubs import _CreateChatModelStub
 
 
 @pytest.fixture
@@ -18,6 +21,31 @@ def workspace(tmp_path):
     return str(tmp_path)
 
 
+@pytest.fixture
+def tools_by_name(workspace) -> dict[str, BaseTool]:
+    """All built-in tools bound to the test workspace, keyed by name."""
+    return {t.name: t for t in create_all_tools(workspace)}
+
+
+@pytest.fixture(autouse=True)
+def _emit_every_delta(monkeypatch):
+    """Turn off assistant_delta coalescing so delta counts never depend on timing.
+
+    Coalescing tests opt back in by setting DELTA_FLUSH_INTERVAL themselves.
+    """
+    monkeypatch.setattr("src.agent.DELTA_FLUSH_INTERVAL", 0.0)
+
+
+# Function-scoped so the recorded calls never leak between tests; tests that
+# script the model set return_value on it.
+@pytest.fixture
+def mock_create(monkeypatch) -> _CreateChatModelStub:
+    """Patch create_chat_model with a recording stub."""
+    stub = _CreateChatModelStub()
+    monkeypatch.setattr("src.agent.create_chat_model", stub)
+    return stub
+
+
 def make_config(**overrides) -> AgentConfig:
     """Create an AgentConfig with sensible test defaults."""
     return AgentConfig({
@@ -38,7 +66,7 @@ def tool_call_chunk(
         content="",
         tool_call_chunks=[
             ToolCallChunk(
-                name=name, args=json.dumps(args), id=tc_id, index=0
+                name=name, args=orjson.dumps(args).decode(), id=tc_id, index=0
             ),
         ],
     )
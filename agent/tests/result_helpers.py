@@ -2,44 +2,63 @@ from __future__ import annotations
 
 from typing import Any
 
+# Tool results are always plain dicts, so exact ``type(...) is`` checks are
+# enough and skip the subclass walk ``isinstance`` does on every call.
+
 
 def _rtext(result: Any) -> str:
-    if isinstance(result, dict):
-        return str(result.get("text", ""))
+    if type(result) is dict:
+        text = result.get("text", "")
+        return text if type(text) is str else str(text)
     return str(result)
 
 
 def _rdata(result: Any) -> dict[str, Any]:
-    if isinstance(result, dict):
+    if type(result) is dict:
         data = result.get("data")
-        if isinstance(data, dict):
+        if type(data) is dict:
             return data
     return {}
 
 
 def _rmeta(result: Any) -> dict[str, Any]:
-    if isinstance(result, dict):
+    if type(result) is dict:
         meta = result.get("meta")
-        if isinstance(meta, dict):
+        if type(meta) is dict:
             return meta
     return {}
 
 
 def _rllm(result: Any) -> str | list[dict[str, Any]] | None:
-    if isinstance(result, dict):
+    if type(result) is dict:
         llm_content = result.get("llm_content")
-        if isinstance(llm_content, (list, str)):
+        if type(llm_content) is list or type(llm_content) is str:
             return llm_content
     return None
 
 
 def _rerror(result: Any) -> str:
-    if isinstance(result, dict):
-        return str(result.get("error", ""))
+    if type(result) is dict:
+        error = result.get("error", "")
+        return error if type(error) is str else str(error)
     return ""
 
 
 def _rsuccess(result: Any) -> bool:
-    if isinstance(result, dict):
+    if type(result) is dict:
         return bool(result.get("success", False))
     return False
+
+
+def _contains_value(obj: Any, needle: str) -> bool:
+    """True if any string value nested in *obj* equals *needle* exactly."""
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if type(item) is dict:
+            stack.extend(item.values())
+        elif type(item) is list:
+            stack.extend(item)
+        elif item == needle:
+            return True
+    return False
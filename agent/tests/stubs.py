@@ -0,0 +1,53 @@
+"""Lightweight stand-ins for chat models and tools in agent tests."""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+class _StubLLM:
+    """Minimal chat-model stand-in; binding returns the same instance."""
+
+    def __init__(self, astream_fn: Any = None) -> None:
+        self.astream = astream_fn
+
+    def bind_tools(self, tools: Any) -> _StubLLM:
+        return self
+
+    def bind(self, **kwargs: Any) -> _StubLLM:
+        return self
+
+
+class _CreateChatModelStub:
+    """Stands in for create_chat_model; records calls, returns return_value."""
+
+    def __init__(self) -> None:
+        self.return_value: Any = _StubLLM()
+        self.calls: list[dict[str, Any]] = []
+
+    def __call__(self, **kwargs: Any) -> Any:
+        self.calls.append(kwargs)
+        return self.return_value
+
+
+class _StubTool:
+    """Minimal tool stand-in that records the args of each call."""
+
+    def __init__(
+        self,
+        name: str,
+        result: Any = None,
+        exc: Exception | None = None,
+        metadata: dict[str, Any] | None = None,
+    ) -> None:
+        self.name = name
+        self.metadata = metadata
+        self.calls: list[dict[str, Any]] = []
+        self._result = result
+        self._exc = exc
+
+    async def ainvoke(self, args: dict[str, Any]) -> Any:
+        self.calls.append(args)
+        if self._exc is not None:
+            raise self._exc
+        return self._result
@@ -3,10 +3,9 @@
 from __future__ import annotations
 
 import asyncio
-import json
-from types import SimpleNamespace
+from collections import defaultdict
+from dataclasses import dataclass
 from typing import Any, AsyncIterator
-from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -15,86 +14,268 @@ from src.agent import (
     ChatAgent,
     StreamEvent,
     _accumulate_tool_call,
+    _append_block_delta,
+    _DeltaCoalescer,
     _build_multimodal_content,
+    _coalesce_deltas,
+    _join_block_deltas,
+    _load_delta_flush_interval,
     build_message_history_from_parts,
     build_message_history,
     sanitize_delta,
 )
 from src.prompts.presets import BUILTIN_PRESETS
 from src.tools.explore import ExploreTool
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    HumanMessage,
+    SystemMessage,
+    ToolCallChunk,
+    ToolMessage,
+)
+
+from .result_helpers import _contains_value
+from .stubs import _StubLLM, _StubTool
+
+# Everything here runs in-process against stubs, without network or disk access.
+pytestmark = pytest.mark.fast
+
+_DEFAULT_SYSTEM_PROMPT = BUILTIN_PRESETS["default"].content
+
+# Fixed-content chunks and events shared by the scripted streams below. The
+# agent only reads them (chunk accumulation builds new objects), so reusing one
+# instance per module is safe and skips re-running the pydantic validators.
+_HELLO_CHUNK = AIMessageChunk(content="Hello!", tool_call_chunks=[])
+_TASK_DONE_CHUNK = AIMessageChunk(content="Task done.", tool_call_chunks=[])
+_BURST_DELTA = StreamEvent("assistant_delta", {"delta": "x"})
+
+# Two turns, the first with a tool round trip. truncate_history only drops
+# references, so tests copy this into agent.messages rather than rebuilding it.
+_TOOL_TURN_HISTORY = (
+    HumanMessage(content="u1"),
+    AIMessage(content="", tool_calls=[{"id": "tc1", "name": "t", "args": {}}]),
+    ToolMessage(content="result", tool_call_id="tc1"),
+    AIMessage(content="a1"),
+    HumanMessage(content="u2"),
+    AIMessage(content="a2"),
+)
+
+
+async def _collect(events: AsyncIterator[StreamEvent]) -> list[StreamEvent]:
+    return [event async for event in events]
+
+
+async def _collect_by_type(
+    events: AsyncIterator[StreamEvent],
+) -> defaultdict[str, list[StreamEvent]]:
+    """Drain a stream into per-type lists, for tests that ignore ordering."""
+    by_type: defaultdict[str, list[StreamEvent]] = defaultdict(list)
+    async for event in events:
+        by_type[event.type].append(event)
+    return by_type
+
+
+def _two_phase_astream(
+    first: list[AIMessageChunk], then: list[AIMessageChunk]
+) -> Any:
+    """Scripted astream: yields ``first`` on the first call, ``then`` after."""
+    calls = 0
+
+    async def _astream(_messages):
+        nonlocal calls
+        calls += 1
+        for chunk in first if calls == 1 else then:
+            yield chunk
+
+    return _astream
+
+
+_DEFAULT_CONFIG_ATTRS: dict[str, Any] = {
+    "provider": "openai",
+    "model": "gpt-4o",
+    "api_key": "",
+    "endpoint_url": None,
+    "tools_enabled": True,
+    "mcp_servers": [],
+    "history": [],
+    "image_provider": "",
+    "image_model": "",
+    "image_api_key": "",
+    "image_endpoint_url": None,
+}
 
 
 class TestAgentConfig:
-    def test_minimal_config(self):
-        config = AgentConfig({"conversation_id": "conv-1"})
-        assert config.conversation_id == "conv-1"
-        assert config.provider == "openai"
-        assert config.model == "gpt-4o"
-        assert config.api_key == ""
-        assert config.endpoint_url is None
-        assert config.tools_enabled is True
-        assert config.mcp_servers == []
-        assert config.history == []
-        assert config.image_provider == ""
-        assert config.image_model == ""
-        assert config.image_api_key == ""
-        assert config.image_endpoint_url is None
-
-    def test_full_config(self):
-        data = {
-            "conversation_id": "conv-2",
-            "provider": "anthropic",
-            "model": "claude-sonnet-4-20250514",
-            "api_key": "sk-ant-test",
-            "endpoint_url": "https://custom.com",
-            "system_prompt": "You are a pirate.",
-            "tools_enabled": False,
-            "mcp_servers": [{"name": "test-mcp"}],
-            "history": [{"role": "user", "content": "hello"}],
-            "image_provider": "google",
-            "image_model": "gemini-3-pro-image-preview",
-            "image_api_key": "goog-key",
-            "image_endpoint_url": "https://img.custom.com",
-        }
+    @pytest.mark.parametrize(
+        ("data", "expected"),
+        [
+            pytest.param(
+                {"conversation_id": "conv-1"},
+                {"conversation_id": "conv-1", **_DEFAULT_CONFIG_ATTRS},
+                id="minimal",
+            ),
+            pytest.param(
+                {
+                    "conversation_id": "conv-2",
+                    "provider": "anthropic",
+                    "model": "claude-sonnet-4-20250514",
+                    "api_key": "sk-ant-test",
+                    "endpoint_url": "https://custom.com",
+                    "system_prompt": "You are a pirate.",
+                    "tools_enabled": False,
+                    "mcp_servers": [{"name": "test-mcp"}],
+                    "history": [{"role": "user", "content": "hello"}],
+                    "image_provider": "google",
+                    "image_model": "gemini-3-pro-image-preview",
+                    "image_api_key": "goog-key",
+                    "image_endpoint_url": "https://img.custom.com",
+                },
+                {
+                    "provider": "anthropic",
+                    "model": "claude-sonnet-4-20250514",
+                    "api_key": "sk-ant-test",
+                    "endpoint_url": "https://custom.com",
+                    "system_prompt": "You are a pirate.",
+                    "tools_enabled": False,
+                    "mcp_servers": [{"name": "test-mcp"}],
+                    "history": [{"role": "user", "content": "hello"}],
+                    "image_provider": "google",
+                    "image_model": "gemini-3-pro-image-preview",
+                    "image_api_key": "goog-key",
+                    "image_endpoint_url": "https://img.custom.com",
+                },
+                id="full",
+            ),
+            pytest.param(
+                {"conversation_id": "c", "system_prompt": None},
+                {"system_prompt": _DEFAULT_SYSTEM_PROMPT},
+                id="null-system-prompt-uses-default",
+            ),
+            pytest.param(
+                {"conversation_id": "c", "system_prompt": ""},
+                {"system_prompt": _DEFAULT_SYSTEM_PROMPT},
+                id="empty-system-prompt-uses-default",
+            ),
+            pytest.param(
+                {
+                    "conversation_id": "c",
+                    "image_provider": None,
+                    "image_model": None,
+                    "image_api_key": None,
+                    "image_endpoint_url": None,
+                },
+                {
+                    "image_provider": "",
+                    "image_model": "",
+                    "image_api_key": "",
+                    "image_endpoint_url": None,
+                },
+                id="null-image-fields-coerced-to-empty",
+            ),
+        ],
+    )
+    def test_fields(self, data, expected):
         config = AgentConfig(data)
-        assert config.provider == "anthropic"
-        assert config.model == "claude-sonnet-4-20250514"
-        assert config.api_key == "sk-ant-test"
-        assert config.endpoint_url == "https://custom.com"
-        assert config.system_prompt == "You are a pirate."
-        assert config.tools_enabled is False
-        assert len(config.mcp_servers) == 1
-        assert len(config.history) == 1
-        assert config.image_provider == "google"
-        assert config.image_model == "gemini-3-pro-image-preview"
-        assert config.image_api_key == "goog-key"
-        assert config.image_endpoint_url == "https://img.custom.com"
-
-    def test_null_system_prompt_uses_default(self):
-        config = AgentConfig({"conversation_id": "c", "system_prompt": None})
-        assert config.system_prompt == BUILTIN_PRESETS["default"].content
-
-    def test_empty_system_prompt_uses_default(self):
-        config = AgentConfig({"conversation_id": "c", "system_prompt": ""})
-        assert config.system_prompt == BUILTIN_PRESETS["default"].content
+        for name, value in expected.items():
+            assert getattr(config, name) == value, name
+
+    def test_uses_slots_and_hides_keys_from_repr(self):
+        config = AgentConfig({
+            "conversation_id": "c",
+            "api_key": "sk-secret",
+            "image_api_key": "img-secret",
+        })
+        assert not hasattr(config, "__dict__")
+        assert "secret" not in repr(config)
+        assert "conversation_id='c'" in repr(config)
+
+    def test_keeps_identity_equality_and_hashing(self):
+        first = AgentConfig({"conversation_id": "c"})
+        second = AgentConfig({"conversation_id": "c"})
+        assert first != second
+        assert len({first, second}) == 2
 
     def test_missing_conversation_id_raises(self):
         with pytest.raises(KeyError):
             AgentConfig({})
 
-    def test_null_image_fields_coerced_to_empty(self):
-        config = AgentConfig({
-            "conversation_id": "c",
-            "image_provider": None,
-            "image_model": None,
-            "image_api_key": None,
-            "image_endpoint_url": None,
-        })
-        assert config.image_provider == ""
-        assert config.image_model == ""
-        assert config.image_api_key == ""
-        assert config.image_endpoint_url is None
+
+def _bash_tool_call_part(seq: int, tc_id: str, command: str) -> dict[str, Any]:
+    return {
+        "seq": seq,
+        "type": "tool_call",
+        "tool_call_id": tc_id,
+        "json_payload": {
+            "type": "tool_call",
+            "id": tc_id,
+            "name": "bash",
+            "input": {"command": command},
+        },
+    }
+
+
+# Module-scoped: build_message_history_from_parts never mutates its input.
+@pytest.fixture(scope="module")
+def multi_iteration_parts_history() -> list[dict[str, Any]]:
+    return [{
+        "role": "assistant",
+        "parts": [
+            {"seq": 0, "type": "text", "text": "Step 1"},
+            _bash_tool_call_part(1, "tc-1", "ls"),
+            {"seq": 2, "type": "tool_result", "tool_call_id": "tc-1", "text": "file-a\nfile-b"},
+            {"seq": 3, "type": "text", "text": "Step 2"},
+            _bash_tool_call_part(4, "tc-2", "pwd"),
+            {"seq": 5, "type": "tool_result", "tool_call_id": "tc-2", "text": "/workspace"},
+            {"seq": 6, "type": "text", "text": "Done"},
+        ],
+    }]
+
+
+@pytest.fixture(scope="module")
+def out_of_order_parts_history() -> list[dict[str, Any]]:
+    return [{
+        "role": "assistant",
+        "parts": [
+            {"seq": 3, "type": "text", "text": "Done"},
+            _bash_tool_call_part(1, "tc-1", "ls"),
+            {"seq": 0, "type": "text", "text": "Step 1"},
+            {"seq": 2, "type": "tool_result", "tool_call_id": "tc-1", "text": "ok"},
+        ],
+    }]
+
+
+# Expected message-class sequences for reconstructed tool rounds.
+_ONE_TOOL_ROUND = (HumanMessage, AIMessage, ToolMessage, AIMessage)
+_TWO_TOOLS_ONE_ROUND = (HumanMessage, AIMessage, ToolMessage, ToolMessage, AIMessage)
+_TWO_TOOL_ROUNDS = (HumanMessage, AIMessage, ToolMessage, AIMessage, ToolMessage, AIMessage)
+
+
+def _message_types(msgs: list[Any]) -> tuple[type, ...]:
+    return tuple(type(m) for m in msgs)
+
+
+def _tool_call_block(
+    tc_id: str, command: str, result: Any, *, is_error: bool = False
+) -> dict[str, Any]:
+    """A persisted bash tool_call content block."""
+    return {
+        "type": "tool_call",
+        "id": tc_id,
+        "name": "bash",
+        "input": {"command": command},
+        "result": result,
+        "isError": is_error,
+    }
+
+
+def _text_block(content: str) -> dict[str, Any]:
+    return {"type": "text", "content": content}
+
+
+def _assistant_entry(content: str, blocks: list[dict[str, Any]]) -> dict[str, Any]:
+    """An assistant history entry carrying persisted content blocks."""
+    return {"role": "assistant", "content": content, "tool_calls": blocks}
 
 
 class TestBuildMessageHistory:
@@ -121,6 +302,21 @@ class TestBuildMessageHistory:
         msgs = build_message_history([{"role": "tool", "content": "result"}])
         assert len(msgs) == 0
 
+    def test_reconstructed_round_followed_by_more_entries(self):
+        msgs = build_message_history([
+            {"role": "user", "content": "list files"},
+            {"role": "assistant", "content": "done", "tool_calls": [
+                {"type": "tool_call", "id": "tc-1", "name": "bash", "input": {}, "result": "a"},
+                {"type": "tool_call", "id": "tc-2", "name": "bash", "input": {}, "result": "b"},
+                _text_block("done"),
+            ]},
+            {"role": "tool", "content": "ignored"},
+            {"role": "user", "content": "thanks"},
+            {"role": "assistant", "content": "welcome"},
+        ])
+        assert _message_types(msgs) == _TWO_TOOLS_ONE_ROUND + (HumanMessage, AIMessage)
+        assert msgs[-1].content == "welcome"
+
     def test_build_message_history_from_parts_text(self):
         msgs = build_message_history_from_parts([
             {
@@ -203,98 +399,23 @@ class TestBuildMessageHistory:
         assert msgs[1].tool_call_id == "tc-2"
         assert msgs[1].content == "/workspace"
 
-    def test_build_message_history_from_parts_multi_iteration_order_preserved(self):
-        msgs = build_message_history_from_parts([
-            {
-                "role": "assistant",
-                "parts": [
-                    {"seq": 0, "type": "text", "text": "Step 1"},
-                    {
-                        "seq": 1,
-                        "type": "tool_call",
-                        "tool_call_id": "tc-1",
-                        "json_payload": {
-                            "type": "tool_call",
-                            "id": "tc-1",
-                            "name": "bash",
-                            "input": {"command": "ls"},
-                        },
-                    },
-                    {
-                        "seq": 2,
-                        "type": "tool_result",
-                        "tool_call_id": "tc-1",
-                        "text": "file-a\nfile-b",
-                    },
-                    {"seq": 3, "type": "text", "text": "Step 2"},
-                    {
-                        "seq": 4,
-                        "type": "tool_call",
-                        "tool_call_id": "tc-2",
-                        "json_payload": {
-                            "type": "tool_call",
-                            "id": "tc-2",
-                            "name": "bash",
-                            "input": {"command": "pwd"},
-                        },
-                    },
-                    {
-                        "seq": 5,
-                        "type": "tool_result",
-                        "tool_call_id": "tc-2",
-                        "text": "/workspace",
-                    },
-                    {"seq": 6, "type": "text", "text": "Done"},
-                ],
-            },
-        ])
+    def test_build_message_history_from_parts_multi_iteration_order_preserved(
+        self, multi_iteration_parts_history
+    ):
+        msgs = build_message_history_from_parts(multi_iteration_parts_history)
 
         # AI(tool tc-1) + Tool(tc-1) + AI(tool tc-2) + Tool(tc-2) + AI(final)
-        assert len(msgs) == 5
-        assert isinstance(msgs[0], AIMessage)
-        assert msgs[0].content == "Step 1"
-        assert len(msgs[0].tool_calls) == 1
-        assert msgs[0].tool_calls[0]["id"] == "tc-1"
-
-        assert isinstance(msgs[1], ToolMessage)
-        assert msgs[1].tool_call_id == "tc-1"
-        assert msgs[1].content == "file-a\nfile-b"
-
-        assert isinstance(msgs[2], AIMessage)
-        assert msgs[2].content == "Step 2"
-        assert len(msgs[2].tool_calls) == 1
-        assert msgs[2].tool_calls[0]["id"] == "tc-2"
-
-        assert isinstance(msgs[3], ToolMessage)
-        assert msgs[3].tool_call_id == "tc-2"
-        assert msgs[3].content == "/workspace"
-
-        assert isinstance(msgs[4], AIMessage)
-        assert msgs[4].content == "Done"
-        assert msgs[4].tool_calls == []
+        assert _message_types(msgs) == _TWO_TOOL_ROUNDS[1:]
+        assert [m.content for m in msgs] == [
+            "Step 1", "file-a\nfile-b", "Step 2", "/workspace", "Done",
+        ]
+        assert [[tc["id"] for tc in msgs[i].tool_calls] for i in (0, 2, 4)] == [
+            ["tc-1"], ["tc-2"], [],
+        ]
+        assert [msgs[i].tool_call_id for i in (1, 3)] == ["tc-1", "tc-2"]
 
-    def test_build_message_history_from_parts_uses_seq_order(self):
-        msgs = build_message_history_from_parts([
-            {
-                "role": "assistant",
-                "parts": [
-                    {"seq": 3, "type": "text", "text": "Done"},
-                    {
-                        "seq": 1,
-                        "type": "tool_call",
-                        "tool_call_id": "tc-1",
-                        "json_payload": {
-                            "type": "tool_call",
-                            "id": "tc-1",
-                            "name": "bash",
-                            "input": {"command": "ls"},
-                        },
-                    },
-                    {"seq": 0, "type": "text", "text": "Step 1"},
-                    {"seq": 2, "type": "tool_result", "tool_call_id": "tc-1", "text": "ok"},
-                ],
-            },
-        ])
+    def test_build_message_history_from_parts_uses_seq_order(self, out_of_order_parts_history):
+        msgs = build_message_history_from_parts(out_of_order_parts_history)
 
         assert len(msgs) == 3
         assert isinstance(msgs[0], AIMessage)
@@ -334,136 +455,63 @@ class TestBuildMessageHistory:
         """Assistant with one tool_call should produce AIMessage + ToolMessage + AIMessage."""
         history = [
             {"role": "user", "content": "list files"},
-            {
-                "role": "assistant",
-                "content": "Let me check.",
-                "tool_calls": [
-                    {"type": "text", "content": "Let me check."},
-                    {
-                        "type": "tool_call",
-                        "id": "tc1",
-                        "name": "bash",
-                        "input": {"command": "ls"},
-                        "result": "file1.txt\nfile2.txt",
-                        "isError": False,
-                    },
-                    {"type": "text", "content": "Here are the files."},
-                ],
-            },
+            _assistant_entry("Let me check.", [
+                _text_block("Let me check."),
+                _tool_call_block("tc1", "ls", "file1.txt\nfile2.txt"),
+                _text_block("Here are the files."),
+            ]),
         ]
         msgs = build_message_history(history)
-        assert isinstance(msgs[0], HumanMessage)
-        # AIMessage with tool_calls
-        assert isinstance(msgs[1], AIMessage)
-        assert msgs[1].content == "Let me check."
-        assert len(msgs[1].tool_calls) == 1
-        assert msgs[1].tool_calls[0]["name"] == "bash"
-        assert msgs[1].tool_calls[0]["id"] == "tc1"
-        # ToolMessage
-        assert isinstance(msgs[2], ToolMessage)
-        assert msgs[2].content == "file1.txt\nfile2.txt"
+        assert _message_types(msgs) == _ONE_TOOL_ROUND
+        assert [m.content for m in msgs[1:]] == [
+            "Let me check.", "file1.txt\nfile2.txt", "Here are the files.",
+        ]
+        assert [(tc["name"], tc["id"]) for tc in msgs[1].tool_calls] == [("bash", "tc1")]
         assert msgs[2].tool_call_id == "tc1"
-        # Final AIMessage
-        assert isinstance(msgs[3], AIMessage)
-        assert msgs[3].content == "Here are the files."
 
     def test_structured_tool_result_reconstruction_uses_text(self):
         """Structured result objects should be converted to ToolMessage text."""
         history = [
             {"role": "user", "content": "run command"},
-            {
-                "role": "assistant",
-                "content": "Done",
-                "tool_calls": [
-                    {
-                        "type": "tool_call",
-                        "id": "tc1",
-                        "name": "bash",
-                        "input": {"command": "echo hi"},
-                        "result": {"kind": "bash", "text": "hi\n", "exit_code": 0},
-                        "isError": False,
-                    },
-                    {"type": "text", "content": "Done"},
-                ],
-            },
+            _assistant_entry("Done", [
+                _tool_call_block("tc1", "echo hi", {"kind": "bash", "text": "hi\n", "exit_code": 0}),
+                _text_block("Done"),
+            ]),
         ]
         msgs = build_message_history(history)
-        assert isinstance(msgs[1], AIMessage)
+        assert _message_types(msgs) == _ONE_TOOL_ROUND
         assert len(msgs[1].tool_calls) == 1
-        assert isinstance(msgs[2], ToolMessage)
-        assert msgs[2].content == "hi\n"
+        assert [m.content for m in msgs[2:]] == ["hi\n", "Done"]
         assert msgs[2].tool_call_id == "tc1"
-        assert isinstance(msgs[3], AIMessage)
-        assert msgs[3].content == "Done"
 
     def test_multiple_tool_calls_same_iteration(self):
         """Multiple tool_calls before any text should all be in one AIMessage."""
         history = [
             {"role": "user", "content": "do stuff"},
-            {
-                "role": "assistant",
-                "content": "Done",
-                "tool_calls": [
-                    {
-                        "type": "tool_call",
-                        "id": "tc1",
-                        "name": "bash",
-                        "input": {"command": "ls"},
-                        "result": "files",
-                        "isError": False,
-                    },
-                    {
-                        "type": "tool_call",
-                        "id": "tc2",
-                        "name": "bash",
-                        "input": {"command": "pwd"},
-                        "result": "/home",
-                        "isError": False,
-                    },
-                    {"type": "text", "content": "Done"},
-                ],
-            },
+            _assistant_entry("Done", [
+                _tool_call_block("tc1", "ls", "files"),
+                _tool_call_block("tc2", "pwd", "/home"),
+                _text_block("Done"),
+            ]),
         ]
         msgs = build_message_history(history)
         # AIMessage(tool_calls=[tc1, tc2]) + ToolMessage(tc1) + ToolMessage(tc2) + AIMessage("Done")
-        assert isinstance(msgs[1], AIMessage)
+        assert _message_types(msgs) == _TWO_TOOLS_ONE_ROUND
         assert len(msgs[1].tool_calls) == 2
-        assert isinstance(msgs[2], ToolMessage)
-        assert msgs[2].tool_call_id == "tc1"
-        assert isinstance(msgs[3], ToolMessage)
-        assert msgs[3].tool_call_id == "tc2"
-        assert isinstance(msgs[4], AIMessage)
+        assert [m.tool_call_id for m in msgs[2:4]] == ["tc1", "tc2"]
         assert msgs[4].content == "Done"
 
     def test_multi_iteration_tool_calls(self):
         """Multiple rounds of tool calls (text → tool → text → tool → text)."""
         history = [
             {"role": "user", "content": "complex task"},
-            {
-                "role": "assistant",
-                "content": "final",
-                "tool_calls": [
-                    {"type": "text", "content": "Step 1"},
-                    {
-                        "type": "tool_call",
-                        "id": "tc1",
-                        "name": "bash",
-                        "input": {"command": "step1"},
-                        "result": "result1",
-                        "isError": False,
-                    },
-                    {"type": "text", "content": "Step 2"},
-                    {
-                        "type": "tool_call",
-                        "id": "tc2",
-                        "name": "bash",
-                        "input": {"command": "step2"},
-                        "result": "result2",
-                        "isError": False,
-                    },
-                    {"type": "text", "content": "final"},
-                ],
-            },
+            _assistant_entry("final", [
+                _text_block("Step 1"),
+                _tool_call_block("tc1", "step1", "result1"),
+                _text_block("Step 2"),
+                _tool_call_block("tc2", "step2", "result2"),
+                _text_block("final"),
+            ]),
         ]
         msgs = build_message_history(history)
         # HumanMessage
@@ -472,40 +520,20 @@ class TestBuildMessageHistory:
         # AIMessage("Step 2", tool_calls=[tc2])
         # ToolMessage(tc2)
         # AIMessage("final")
-        assert len(msgs) == 6
-        assert isinstance(msgs[1], AIMessage)
-        assert msgs[1].content == "Step 1"
-        assert len(msgs[1].tool_calls) == 1
-        assert isinstance(msgs[2], ToolMessage)
-        assert isinstance(msgs[3], AIMessage)
-        assert msgs[3].content == "Step 2"
-        assert len(msgs[3].tool_calls) == 1
-        assert isinstance(msgs[4], ToolMessage)
-        assert isinstance(msgs[5], AIMessage)
-        assert msgs[5].content == "final"
-        assert msgs[5].tool_calls == []
+        assert _message_types(msgs) == _TWO_TOOL_ROUNDS
+        assert [msgs[i].content for i in (1, 3, 5)] == ["Step 1", "Step 2", "final"]
+        assert [len(msgs[i].tool_calls) for i in (1, 3, 5)] == [1, 1, 0]
 
     def test_thinking_blocks_skipped(self):
         """Thinking blocks in tool_calls should be ignored."""
         history = [
             {"role": "user", "content": "think and act"},
-            {
-                "role": "assistant",
-                "content": "done",
-                "tool_calls": [
-                    {"type": "thinking", "content": "Let me think about this..."},
-                    {"type": "text", "content": "I'll run a command."},
-                    {
-                        "type": "tool_call",
-                        "id": "tc1",
-                        "name": "bash",
-                        "input": {"command": "echo hi"},
-                        "result": "hi",
-                        "isError": False,
-                    },
-                    {"type": "text", "content": "done"},
-                ],
-            },
+            _assistant_entry("done", [
+                {"type": "thinking", "content": "Let me think about this..."},
+                _text_block("I'll run a command."),
+                _tool_call_block("tc1", "echo hi", "hi"),
+                _text_block("done"),
+            ]),
         ]
         msgs = build_message_history(history)
         # No thinking messages should appear
@@ -514,68 +542,39 @@ class TestBuildMessageHistory:
                 assert "think" not in m.content.lower() or m.content == "done"
 
         # Should still have: Human + AI(tool_calls) + Tool + AI
-        assert isinstance(msgs[1], AIMessage)
+        assert _message_types(msgs) == _ONE_TOOL_ROUND
         assert msgs[1].content == "I'll run a command."
         assert len(msgs[1].tool_calls) == 1
-        assert isinstance(msgs[2], ToolMessage)
-        assert isinstance(msgs[3], AIMessage)
         assert msgs[3].content == "done"
 
     def test_no_text_before_tool_call(self):
         """Tool call with no preceding text should produce AIMessage with empty content."""
         history = [
             {"role": "user", "content": "go"},
-            {
-                "role": "assistant",
-                "content": "result",
-                "tool_calls": [
-                    {
-                        "type": "tool_call",
-                        "id": "tc1",
-                        "name": "bash",
-                        "input": {"command": "ls"},
-                        "result": "files",
-                        "isError": False,
-                    },
-                    {"type": "text", "content": "result"},
-                ],
-            },
+            _assistant_entry("result", [
+                _tool_call_block("tc1", "ls", "files"),
+                _text_block("result"),
+            ]),
         ]
         msgs = build_message_history(history)
-        assert isinstance(msgs[1], AIMessage)
+        assert _message_types(msgs) == _ONE_TOOL_ROUND
         assert msgs[1].content == ""
         assert len(msgs[1].tool_calls) == 1
-        assert isinstance(msgs[2], ToolMessage)
-        assert isinstance(msgs[3], AIMessage)
         assert msgs[3].content == "result"
 
     def test_tool_call_with_error(self):
         """Tool call with isError=True should still produce a ToolMessage."""
         history = [
             {"role": "user", "content": "run bad"},
-            {
-                "role": "assistant",
-                "content": "failed",
-                "tool_calls": [
-                    {
-                        "type": "tool_call",
-                        "id": "tc1",
-                        "name": "bash",
-                        "input": {"command": "bad_cmd"},
-                        "result": "Tool error: command not found",
-                        "isError": True,
-                    },
-                    {"type": "text", "content": "failed"},
-                ],
-            },
+            _assistant_entry("failed", [
+                _tool_call_block("tc1", "bad_cmd", "Tool error: command not found", is_error=True),
+                _text_block("failed"),
+            ]),
         ]
         msgs = build_message_history(history)
-        assert isinstance(msgs[1], AIMessage)
+        assert _message_types(msgs) == _ONE_TOOL_ROUND
         assert len(msgs[1].tool_calls) == 1
-        assert isinstance(msgs[2], ToolMessage)
-        assert msgs[2].content == "Tool error: command not found"
-        assert isinstance(msgs[3], AIMessage)
-        assert msgs[3].content == "failed"
+        assert [m.content for m in msgs[2:]] == ["Tool error: command not found", "failed"]
 
     def test_empty_tool_calls_list(self):
         """Empty tool_calls list should behave like no tool_calls."""
@@ -592,41 +591,24 @@ class TestBuildMessageHistory:
         """Tool calls with no trailing text block should still work."""
         history = [
             {"role": "user", "content": "go"},
-            {
-                "role": "assistant",
-                "content": "",
-                "tool_calls": [
-                    {"type": "text", "content": "Running..."},
-                    {
-                        "type": "tool_call",
-                        "id": "tc1",
-                        "name": "bash",
-                        "input": {"command": "ls"},
-                        "result": "files",
-                        "isError": False,
-                    },
-                ],
-            },
+            _assistant_entry("", [
+                _text_block("Running..."),
+                _tool_call_block("tc1", "ls", "files"),
+            ]),
         ]
         msgs = build_message_history(history)
-        # AI("Running...", tool_calls=[tc1]) + ToolMessage
-        assert isinstance(msgs[1], AIMessage)
+        # AI("Running...", tool_calls=[tc1]) + ToolMessage; no trailing AIMessage
+        # since there's no final text
+        assert _message_types(msgs) == (HumanMessage, AIMessage, ToolMessage)
         assert msgs[1].content == "Running..."
         assert len(msgs[1].tool_calls) == 1
-        assert isinstance(msgs[2], ToolMessage)
-        # No trailing AIMessage since there's no final text
-        assert len(msgs) == 3
 
     def test_only_thinking_blocks_falls_back_to_content(self):
         """If tool_calls only has thinking blocks, fall back to content field."""
         history = [
-            {
-                "role": "assistant",
-                "content": "Here is my answer.",
-                "tool_calls": [
-                    {"type": "thinking", "content": "Let me think deeply..."},
-                ],
-            },
+            _assistant_entry("Here is my answer.", [
+                {"type": "thinking", "content": "Let me think deeply..."},
+            ]),
         ]
         msgs = build_message_history(history)
         assert len(msgs) == 1
@@ -637,106 +619,320 @@ class TestBuildMessageHistory:
         """A tool_call block without 'id' should not raise KeyError."""
         history = [
             {"role": "user", "content": "go"},
-            {
-                "role": "assistant",
-                "content": "done",
-                "tool_calls": [
-                    {
-                        "type": "tool_call",
-                        "name": "bash",
-                        "input": {"command": "ls"},
-                        "result": "files",
-                        "isError": False,
-                    },
-                    {"type": "text", "content": "done"},
-                ],
-            },
+            _assistant_entry("done", [
+                {
+                    "type": "tool_call",
+                    "name": "bash",
+                    "input": {"command": "ls"},
+                    "result": "files",
+                    "isError": False,
+                },
+                _text_block("done"),
+            ]),
         ]
         msgs = build_message_history(history)
-        assert isinstance(msgs[1], AIMessage)
-        assert len(msgs[1].tool_calls) == 1
-        assert msgs[1].tool_calls[0]["id"] == ""
-        assert isinstance(msgs[2], ToolMessage)
+        assert _message_types(msgs) == _ONE_TOOL_ROUND
+        assert [tc["id"] for tc in msgs[1].tool_calls] == [""]
         assert msgs[2].tool_call_id == ""
 
 
 class TestBuildMultimodalContent:
-    def test_no_attachments_returns_string(self):
-        result = _build_multimodal_content("hello", [])
-        assert result == "hello"
-
-    def test_non_image_attachments_returns_string(self):
-        result = _build_multimodal_content("hello", [{"path": "doc.pdf", "data": "abc"}])
-        assert result == "hello"
-
-    def test_image_attachment_returns_list(self):
-        result = _build_multimodal_content("describe this", [
-            {"path": "photo.png", "data": "iVBORw0KGgo="},
-        ])
-        assert isinstance(result, list)
-        assert len(result) == 2
-        assert result[0] == {"type": "text", "text": "describe this"}
-        assert result[1]["type"] == "image_url"
-        assert "data:image/png;base64," in result[1]["image_url"]["url"]
-
-    def test_jpg_mime_type(self):
-        result = _build_multimodal_content("test", [
-            {"path": "photo.jpg", "data": "abc123"},
-        ])
-        assert isinstance(result, list)
-        assert "data:image/jpeg;base64," in result[1]["image_url"]["url"]
-
-    def test_multiple_images(self):
-        result = _build_multimodal_content("compare", [
-            {"path": "a.png", "data": "data1"},
-            {"path": "b.jpeg", "data": "data2"},
-        ])
-        assert isinstance(result, list)
-        assert len(result) == 3  # text + 2 images
+    @pytest.mark.parametrize(
+        ("text", "attachments"),
+        [
+            pytest.param("hello", [], id="no-attachments"),
+            pytest.param("hello", [{"path": "doc.pdf", "data": "abc"}], id="non-image"),
+            pytest.param("test", [{"path": "img.png"}], id="missing-data"),
+            pytest.param("test", [{"path": "uploads/png", "data": "x"}], id="no-extension-dot"),
+        ],
+    )
+    def test_returns_plain_text_without_images(self, text, attachments):
+        assert _build_multimodal_content(text, attachments) == text
+
+    @pytest.mark.parametrize(
+        ("text", "attachments", "expected_urls"),
+        [
+            pytest.param(
+                "describe this",
+                [{"path": "photo.png", "data": "iVBORw0KGgo="}],
+                ["data:image/png;base64,iVBORw0KGgo="],
+                id="png",
+            ),
+            pytest.param(
+                "test",
+                [{"path": "photo.jpg", "data": "abc123"}],
+                ["data:image/jpeg;base64,abc123"],
+                id="jpg-maps-to-jpeg",
+            ),
+            pytest.param(
+                "test",
+                [
+                    {"path": "PHOTO.JPEG", "data": "abc"},
+                    {"path": "uploads/png", "data": "not-an-image"},
+                ],
+                ["data:image/jpeg;base64,abc"],
+                id="case-insensitive-and-requires-dot",
+            ),
+            pytest.param(
+                "compare",
+                [{"path": "a.png", "data": "data1"}, {"path": "b.jpeg", "data": "data2"}],
+                ["data:image/png;base64,data1", "data:image/jpeg;base64,data2"],
+                id="multiple-images",
+            ),
+            pytest.param(
+                "test",
+                [{"path": "doc.pdf", "data": "pdf_data"}, {"path": "img.png", "data": "img_data"}],
+                ["data:image/png;base64,img_data"],
+                id="mixed-skips-non-images",
+            ),
+        ],
+    )
+    def test_image_attachments_return_blocks(self, text, attachments, expected_urls):
+        assert _build_multimodal_content(text, attachments) == [
+            {"type": "text", "text": text},
+            *({"type": "image_url", "image_url": {"url": url}} for url in expected_urls),
+        ]
 
-    def test_mixed_attachments_only_images(self):
-        result = _build_multimodal_content("test", [
-            {"path": "doc.pdf", "data": "pdf_data"},
-            {"path": "img.png", "data": "img_data"},
-        ])
-        assert isinstance(result, list)
-        assert len(result) == 2  # text + 1 image (pdf skipped)
+    @pytest.mark.parametrize("path", ["icon.svg", "scan.bmp", "photo.tiff"])
+    def test_formats_providers_reject_are_skipped(self, path):
+        assert _build_multimodal_content("hi", [{"path": path, "data": "d"}]) == "hi"
 
-    def test_missing_data_skipped(self):
-        result = _build_multimodal_content("test", [
-            {"path": "img.png"},  # no data
-        ])
-        assert result == "test"
+    def test_empty_text_omits_text_block(self):
+        assert _build_multimodal_content("", [{"path": "a.png", "data": "d"}]) == [
+            {"type": "image_url", "image_url": {"url": "data:image/png;base64,d"}},
+        ]
 
 
 class TestStreamEvent:
     def test_to_json(self):
         event = StreamEvent("assistant_delta", {"delta": "hello"})
-        parsed = json.loads(event.to_json())
-        assert parsed["type"] == "assistant_delta"
-        assert parsed["delta"] == "hello"
+        # Compact separators, "type" first, then the payload keys in order.
+        assert event.to_json() == '{"type":"assistant_delta","delta":"hello"}'
 
     def test_complete_event(self):
         event = StreamEvent("complete", {
             "content": "full response",
             "token_usage": {"prompt": 10, "completion": 20},
         })
-        parsed = json.loads(event.to_json())
-        assert parsed["type"] == "complete"
-        assert parsed["content"] == "full response"
-        assert parsed["token_usage"]["prompt"] == 10
+        assert event.type == "complete"
+        assert event.data["content"] == "full response"
+        assert event.data["token_usage"]["prompt"] == 10
 
     def test_error_event(self):
         event = StreamEvent("error", {"code": "test", "message": "fail"})
-        parsed = json.loads(event.to_json())
-        assert parsed["type"] == "error"
-        assert parsed["code"] == "test"
+        assert event.type == "error"
+        assert event.data["code"] == "test"
+
+    def test_to_bytes_matches_to_json(self):
+        event = StreamEvent("assistant_delta", {"delta": "héllo ✓"})
+        raw = event.to_bytes()
+        assert isinstance(raw, bytes)
+        assert raw == '{"type":"assistant_delta","delta":"héllo ✓"}'.encode()
+        assert raw.decode("utf-8") == event.to_json()
+
+    def test_is_slotted(self):
+        event = StreamEvent("complete", {})
+        assert not hasattr(event, "__dict__")
+        with pytest.raises(AttributeError):
+            event.extra = 1
+
+
+class TestDeltaCoalescer:
+    def test_first_delta_emitted_then_burst_merged(self):
+        coalescer = _DeltaCoalescer(interval=60.0, max_chars=256)
+        first = coalescer.feed(StreamEvent("assistant_delta", {"delta": "a"}))
+        assert [e.data["delta"] for e in first] == ["a"]
+        assert coalescer.feed(StreamEvent("assistant_delta", {"delta": "b"})) == []
+        assert coalescer.feed(StreamEvent("assistant_delta", {"delta": "c"})) == []
+        [merged] = coalescer.drain()
+        assert merged.data["delta"] == "bc"
+        assert coalescer.drain() == []
+
+    def test_max_chars_forces_flush(self):
+        coalescer = _DeltaCoalescer(interval=60.0, max_chars=4)
+        coalescer.feed(StreamEvent("assistant_delta", {"delta": "a"}))
+        assert coalescer.feed(StreamEvent("assistant_delta", {"delta": "bb"})) == []
+        [flushed] = coalescer.feed(StreamEvent("assistant_delta", {"delta": "cc"}))
+        assert flushed.data["delta"] == "bbcc"
+
+    def test_other_events_flush_pending_text_first(self):
+        coalescer = _DeltaCoalescer(interval=60.0, max_chars=256)
+        coalescer.feed(StreamEvent("assistant_delta", {"delta": "a"}))
+        coalescer.feed(StreamEvent("assistant_delta", {"delta": "b"}))
+        out = coalescer.feed(StreamEvent("tool_call", {"tool_name": "bash"}))
+        assert [(e.type, e.data.get("delta")) for e in out] == [
+            ("assistant_delta", "b"),
+            ("tool_call", None),
+        ]
+
+    def test_flush_delay_tracks_the_held_text_deadline(self):
+        now = [100.0]
+        coalescer = _DeltaCoalescer(interval=0.5, max_chars=256, clock=lambda: now[0])
+        assert coalescer.flush_delay() is None
+        coalescer.feed(StreamEvent("assistant_delta", {"delta": "a"}))
+        assert coalescer.flush_delay() is None
+        now[0] = 100.2
+        assert coalescer.feed(StreamEvent("assistant_delta", {"delta": "b"})) == []
+        assert coalescer.flush_delay() == pytest.approx(0.3)
+        now[0] = 101.0
+        assert coalescer.flush_delay() == 0.0
+
+    async def test_handle_message_flushes_held_text_while_stream_is_quiet(
+        self, mock_create, monkeypatch,
+    ):
+        monkeypatch.setattr("src.agent.DELTA_FLUSH_INTERVAL", 0.05)
+        resumed = False
+
+        async def fake_astream(messages):
+            nonlocal resumed
+            yield AIMessageChunk(content="I'll ", tool_call_chunks=[])
+            yield AIMessageChunk(content="write it.", tool_call_chunks=[])
+            # Stands in for the model streaming tool arguments.
+            await asyncio.sleep(1.0)
+            resumed = True
+            yield AIMessageChunk(content=" Done.", tool_call_chunks=[])
+
+        mock_create.return_value = _StubLLM(fake_astream)
+        agent = ChatAgent(AgentConfig({"conversation_id": "test", "api_key": "k"}))
+
+        seen: list[tuple[str, bool]] = []
+        async for event in agent.handle_message("hi"):
+            if event.type == "assistant_delta":
+                seen.append((event.data["delta"], resumed))
+
+        assert seen == [("I'll ", False), ("write it.", False), (" Done.", True)]
+
+    async def test_handle_message_coalesces_bursts(self, mock_create, monkeypatch):
+        monkeypatch.setattr("src.agent.DELTA_FLUSH_INTERVAL", 60.0)
+
+        async def fake_astream(messages):
+            for i in range(10):
+                yield AIMessageChunk(content=f"t{i} ", tool_call_chunks=[])
+
+        mock_llm = _StubLLM(fake_astream)
+        mock_create.return_value = mock_llm
+
+        agent = ChatAgent(AgentConfig({"conversation_id": "test", "api_key": "k"}))
+        events = await _collect(agent.handle_message("hi"))
+
+        assert [e.type for e in events] == ["assistant_delta", "assistant_delta", "complete"]
+        combined = "".join(e.data["delta"] for e in events[:2])
+        assert combined == events[-1].data["content"]
+        assert combined == "".join(f"t{i} " for i in range(10))
+
+    async def test_handle_message_tool_loop_with_default_interval(
+        self, mock_create, monkeypatch,
+    ):
+        monkeypatch.delenv("DELTA_FLUSH_INTERVAL_MS", raising=False)
+        monkeypatch.setattr("src.agent.DELTA_FLUSH_INTERVAL", _load_delta_flush_interval())
+        mock_create.return_value = _StubLLM(_two_phase_astream(
+            [
+                AIMessageChunk(content="Sure, ", tool_call_chunks=[]),
+                AIMessageChunk(content="checking.", tool_call_chunks=[]),
+                AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        ToolCallChunk(name="test_tool", args="{}", id="tc-1", index=0),
+                    ],
+                ),
+            ],
+            [
+                AIMessageChunk(content="All ", tool_call_chunks=[]),
+                AIMessageChunk(content="done.", tool_call_chunks=[]),
+            ],
+        ))
+        tool = _StubTool("test_tool", result="ok")
+        agent = ChatAgent(
+            AgentConfig({"conversation_id": "test", "api_key": "k"}), tools=[tool],
+        )
+
+        events = await _collect(agent.handle_message("go"))
+
+        # Collapse each run of deltas into one entry holding its joined text.
+        runs: list[tuple[str, str | None]] = []
+        for event in events:
+            if event.type != "assistant_delta":
+                runs.append((event.type, None))
+            elif runs and runs[-1][0] == "assistant_delta":
+                runs[-1] = ("assistant_delta", runs[-1][1] + event.data["delta"])
+            else:
+                runs.append(("assistant_delta", event.data["delta"]))
+        assert runs == [
+            ("assistant_delta", "Sure, checking."),
+            ("tool_call", None),
+            ("tool_result", None),
+            ("assistant_delta", "All done."),
+            ("complete", None),
+        ]
+        assert tool.calls == [{}]
+
+    @pytest.mark.parametrize("stop", ["aclose", "cancel"])
+    async def test_coalesce_deltas_closes_source_when_consumer_stops(self, stop):
+        closed = asyncio.Event()
+
+        async def source():
+            try:
+                yield StreamEvent("assistant_delta", {"delta": "a"})
+                await asyncio.sleep(60)
+                yield StreamEvent("assistant_delta", {"delta": "b"})
+            finally:
+                closed.set()
+
+        coalesced = _coalesce_deltas(
+            source(), _DeltaCoalescer(interval=60.0, max_chars=256),
+        )
+        first = await anext(coalesced)
+        assert first.data["delta"] == "a"
+        if stop == "aclose":
+            await coalesced.aclose()
+        else:
+            step = asyncio.ensure_future(anext(coalesced))
+            await asyncio.sleep(0)
+            step.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await step
+        assert closed.is_set()
+
+
+class TestBlockDeltas:
+    def test_consecutive_deltas_share_a_block(self):
+        blocks: list[dict[str, Any]] = []
+        for block_type, delta in [
+            ("thinking", "hm"), ("thinking", "m"), ("text", "Hel"), ("text", "lo"),
+        ]:
+            _append_block_delta(blocks, block_type, delta)
+        blocks.append({"type": "tool_call", "id": "tc-1"})
+        _append_block_delta(blocks, "text", "!")
+
+        assert _join_block_deltas(blocks) is True
+        assert blocks == [
+            {"type": "thinking", "content": "hmm"},
+            {"type": "text", "content": "Hello"},
+            {"type": "tool_call", "id": "tc-1"},
+            {"type": "text", "content": "!"},
+        ]
+
+    def test_text_only_is_not_rich(self):
+        blocks: list[dict[str, Any]] = []
+        _append_block_delta(blocks, "text", "plain")
+        assert _join_block_deltas(blocks) is False
+        assert blocks == [{"type": "text", "content": "plain"}]
+
+
+@dataclass(slots=True, frozen=True)
+class _ChunkStub:
+    """The tool-call chunk fields _accumulate_tool_call reads."""
+
+    index: int | None
+    id: str
+    name: str
+    args: str
 
 
 class TestAccumulateToolCall:
     def test_single_chunk(self):
         tool_calls: list[dict[str, Any]] = []
-        chunk = SimpleNamespace(index=0, id="tc-1", name="bash", args='{"cmd": "ls"}')
+        chunk = _ChunkStub(index=0, id="tc-1", name="bash", args='{"cmd": "ls"}')
         _accumulate_tool_call(tool_calls, chunk)
         assert len(tool_calls) == 1
         assert tool_calls[0]["id"] == "tc-1"
@@ -745,18 +941,28 @@ class TestAccumulateToolCall:
 
     def test_streaming_args(self):
         tool_calls: list[dict[str, Any]] = []
-        chunk1 = SimpleNamespace(index=0, id="tc-1", name="bash", args='{"cm')
+        chunk1 = _ChunkStub(index=0, id="tc-1", name="bash", args='{"cm')
         _accumulate_tool_call(tool_calls, chunk1)
         assert "args" not in tool_calls[0]  # Not yet parseable
 
-        chunk2 = SimpleNamespace(index=0, id="", name="", args='d": "ls"}')
+        chunk2 = _ChunkStub(index=0, id="", name="", args='d": "ls"}')
         _accumulate_tool_call(tool_calls, chunk2)
         assert tool_calls[0]["args"] == {"cmd": "ls"}
 
+    def test_chunk_without_args_keeps_parsed_args(self):
+        tool_calls: list[dict[str, Any]] = []
+        _accumulate_tool_call(
+            tool_calls, _ChunkStub(index=0, id="", name="bash", args='{"cmd": "ls"}')
+        )
+        parsed = tool_calls[0]["args"]
+        _accumulate_tool_call(tool_calls, _ChunkStub(index=0, id="tc-1", name="", args=""))
+        assert tool_calls[0]["id"] == "tc-1"
+        assert tool_calls[0]["args"] is parsed
+
     def test_multiple_tool_calls(self):
         tool_calls: list[dict[str, Any]] = []
-        chunk0 = SimpleNamespace(index=0, id="tc-0", name="bash", args='{"a": 1}')
-        chunk1 = SimpleNamespace(index=1, id="tc-1", name="read", args='{"b": 2}')
+        chunk0 = _ChunkStub(index=0, id="tc-0", name="bash", args='{"a": 1}')
+        chunk1 = _ChunkStub(index=1, id="tc-1", name="read", args='{"b": 2}')
         _accumulate_tool_call(tool_calls, chunk0)
         _accumulate_tool_call(tool_calls, chunk1)
         assert len(tool_calls) == 2
@@ -765,13 +971,35 @@ class TestAccumulateToolCall:
 
     def test_none_index_defaults_to_zero(self):
         tool_calls: list[dict[str, Any]] = []
-        chunk = SimpleNamespace(index=None, id="tc-1", name="bash", args='{}')
+        chunk = _ChunkStub(index=None, id="tc-1", name="bash", args='{}')
         _accumulate_tool_call(tool_calls, chunk)
         assert len(tool_calls) == 1
 
 
+_MULTIMODAL_RESULT = [
+    {"type": "text", "text": "Image file: photo.png"},
+    {"type": "image_url", "image_url": {"url": "data:image/png;base64,abc123"}},
+]
+
+_STRUCTURED_LLM_CONTENT = [
+    {"type": "text", "text": "Generated image markdown"},
+    {"type": "image_url", "image_url": {"url": "data:image/png;base64,abc123"}},
+]
+
+_IMAGE_GENERATION_RESULT = {
+    "kind": "image_generation",
+    "text": "![Generated Image](sandbox:///generated_images/sample.png)",
+    "success": True,
+    "error": None,
+    "data": {"media": [{"type": "image", "url": "sandbox:///generated_images/sample.png"}]},
+    "meta": {"image_count": 1},
+    "llm_content": _STRUCTURED_LLM_CONTENT,
+}
+
+
 class TestChatAgent:
-    def _make_config(self, **overrides) -> AgentConfig:
+    @staticmethod
+    def _make_config(**overrides) -> AgentConfig:
         data = {
             "conversation_id": "test-conv",
             "provider": "openai",
@@ -781,32 +1009,28 @@ class TestChatAgent:
         }
         return AgentConfig(data)
 
-    @patch("src.agent.create_chat_model")
-    async def test_creates_llm_on_init(self, mock_create):
-        mock_llm = MagicMock()
+    def test_creates_llm_on_init(self, mock_create):
+        mock_llm = _StubLLM()
         mock_create.return_value = mock_llm
         config = self._make_config()
         agent = ChatAgent(config)
-        mock_create.assert_called_once_with(
-            provider="openai",
-            model="gpt-4o",
-            api_key="test-key",
-            endpoint_url=None,
-            streaming=True,
-        )
+        assert agent.llm is mock_llm
+        assert mock_create.calls == [{
+            "provider": "openai",
+            "model": "gpt-4o",
+            "api_key": "test-key",
+            "endpoint_url": None,
+            "streaming": True,
+        }]
 
-    @patch("src.agent.create_chat_model")
-    async def test_system_prompt_in_messages(self, mock_create):
-        mock_create.return_value = MagicMock()
+    def test_system_prompt_in_messages(self, mock_create):
         config = self._make_config(system_prompt="Be helpful")
         agent = ChatAgent(config)
         assert len(agent.messages) == 1
         assert isinstance(agent.messages[0], SystemMessage)
         assert agent.messages[0].content == "Be helpful"
 
-    @patch("src.agent.create_chat_model")
-    async def test_history_loaded(self, mock_create):
-        mock_create.return_value = MagicMock()
+    def test_history_loaded(self, mock_create):
         config = self._make_config(
             history=[
                 {"role": "user", "content": "hi"},
@@ -817,30 +1041,22 @@ class TestChatAgent:
         # system + 2 history messages
         assert len(agent.messages) == 3
 
-    @patch("src.agent.create_chat_model")
-    async def test_cancel_sets_flag(self, mock_create):
-        mock_create.return_value = MagicMock()
+    def test_cancel_sets_flag(self, mock_create):
         agent = ChatAgent(self._make_config())
         assert agent._cancelled is False
         agent.cancel()
         assert agent._cancelled is True
 
-    @patch("src.agent.create_chat_model")
     async def test_handle_message_adds_user_message(self, mock_create):
         """After handle_message, the user message should be in history."""
-        from langchain_core.messages import AIMessageChunk
-
-        mock_llm = AsyncMock()
         # Simulate a simple text response (no tool calls)
         async def fake_astream(messages):
-            yield AIMessageChunk(content="Hello!", tool_call_chunks=[])
-        mock_llm.astream = fake_astream
+            yield _HELLO_CHUNK
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         agent = ChatAgent(self._make_config())
-        events = []
-        async for event in agent.handle_message("test"):
-            events.append(event)
+        events = await _collect(agent.handle_message("test"))
 
         # Should have delta + complete events
         types = [e.type for e in events]
@@ -852,60 +1068,39 @@ class TestChatAgent:
         assert isinstance(agent.messages[1], HumanMessage)
         assert agent.messages[1].content == "test"
 
-    @patch("src.agent.create_chat_model")
     async def test_handle_message_error_yields_error_event(self, mock_create):
-        mock_llm = AsyncMock()
         async def fake_astream(messages):
             raise RuntimeError("LLM error")
             yield  # make it a generator
-        mock_llm.astream = fake_astream
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         agent = ChatAgent(self._make_config())
-        events = []
-        async for event in agent.handle_message("test"):
-            events.append(event)
+        events = await _collect_by_type(agent.handle_message("test"))
 
-        assert any(e.type == "error" for e in events)
-        error_event = next(e for e in events if e.type == "error")
+        [error_event] = events["error"]
         assert "LLM error" in error_event.data["message"]
 
-    @patch("src.agent.create_chat_model")
     async def test_multi_iteration_content_accumulation(self, mock_create):
         """Content from iteration 1 (before tool call) should be included in complete event."""
-        from langchain_core.messages import AIMessageChunk, ToolCallChunk
-
-        call_count = 0
-
-        async def fake_astream(messages):
-            nonlocal call_count
-            call_count += 1
-            if call_count == 1:
-                # Iteration 1: text + tool call
-                yield AIMessageChunk(content="Sure, ", tool_call_chunks=[])
-                yield AIMessageChunk(
+        mock_llm = _StubLLM(_two_phase_astream(
+            [
+                AIMessageChunk(content="Sure, ", tool_call_chunks=[]),
+                AIMessageChunk(
                     content="",
                     tool_call_chunks=[
                         ToolCallChunk(name="test_tool", args='{"cmd": "echo hi"}', id="tc-1", index=0),
                     ],
-                )
-            else:
-                # Iteration 2: final text response after tool execution
-                yield AIMessageChunk(content="Done!", tool_call_chunks=[])
-
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
+                ),
+            ],
+            [AIMessageChunk(content="Done!", tool_call_chunks=[])],
+        ))
         mock_create.return_value = mock_llm
 
-        mock_tool = MagicMock()
-        mock_tool.name = "test_tool"
-        mock_tool.ainvoke = AsyncMock(return_value="hello")
+        mock_tool = _StubTool("test_tool", result="hello")
 
         agent = ChatAgent(self._make_config(), tools=[mock_tool])
-        events = []
-        async for event in agent.handle_message("run echo"):
-            events.append(event)
+        events = await _collect(agent.handle_message("run echo"))
 
         complete_event = next(e for e in events if e.type == "complete")
         # total_content should include text from BOTH iterations
@@ -920,42 +1115,60 @@ class TestChatAgent:
         text_blocks = [b for b in blocks if b.get("type") == "text"]
         assert len(text_blocks) >= 1
 
-    @patch("src.agent.create_chat_model")
     async def test_complete_event_no_tool_calls_when_none(self, mock_create):
         """When no tool calls happen, tool_calls in complete should be None."""
-        from langchain_core.messages import AIMessageChunk
-
         async def fake_astream(messages):
-            yield AIMessageChunk(content="Hello!", tool_call_chunks=[])
+            yield _HELLO_CHUNK
 
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         agent = ChatAgent(self._make_config())
-        events = []
-        async for event in agent.handle_message("hi"):
-            events.append(event)
+        events = await _collect(agent.handle_message("hi"))
 
         complete_event = next(e for e in events if e.type == "complete")
         assert complete_event.data["tool_calls"] is None
 
-    @patch("src.agent.create_chat_model")
-    async def test_execute_tool_unknown(self, mock_create):
-        mock_create.return_value = MagicMock()
-        agent = ChatAgent(self._make_config())
-        result, is_error = await agent._execute_tool("nonexistent", {})
-        assert is_error is True
-        assert result["kind"] == "nonexistent"
-        assert result["success"] is False
-        assert "Unknown tool" in result["text"]
+    @pytest.fixture
+    def tool_agent(self, mock_create) -> ChatAgent:
+        """Agent serving the _execute_tool dispatch cases."""
+        tools = [
+            _StubTool("bad_tool", exc=RuntimeError("tool broke")),
+            _StubTool("read", result=_MULTIMODAL_RESULT),
+            _StubTool("image_generation", result=_IMAGE_GENERATION_RESULT),
+        ]
+        return ChatAgent(self._make_config(), tools=tools)
+
+    @pytest.mark.parametrize(
+        ("name", "args", "is_error", "text_part", "llm_content"),
+        [
+            pytest.param("nonexistent", {}, True, "Unknown tool", None, id="unknown"),
+            pytest.param("bad_tool", {}, True, "tool broke", None, id="error"),
+            # A bare list result is normalized with llm_content for the model.
+            pytest.param(
+                "read", {"file_path": "photo.png"}, False, None, _MULTIMODAL_RESULT,
+                id="multimodal",
+            ),
+            # Structured dict results keep llm_content for ToolMessage context.
+            pytest.param(
+                "image_generation", {"prompt": "a cat"}, False, "![Generated Image]",
+                _STRUCTURED_LLM_CONTENT, id="structured",
+            ),
+        ],
+    )
+    async def test_execute_tool_result(
+        self, tool_agent, name, args, is_error, text_part, llm_content
+    ):
+        result, result_is_error = await tool_agent._execute_tool(name, args)
+        assert result_is_error is is_error
+        assert result["kind"] == name
+        assert result["success"] is not is_error
+        if text_part is not None:
+            assert text_part in result["text"]
+        assert result.get("llm_content") == llm_content
 
-    @patch("src.agent.create_chat_model")
     async def test_execute_tool_success(self, mock_create):
-        mock_create.return_value = MagicMock()
-        mock_tool = MagicMock()
-        mock_tool.name = "test_tool"
-        mock_tool.ainvoke = AsyncMock(return_value="tool output")
+        mock_tool = _StubTool("test_tool", result="tool output")
 
         agent = ChatAgent(self._make_config(), tools=[mock_tool])
         result, is_error = await agent._execute_tool("test_tool", {"arg": "val"})
@@ -963,25 +1176,111 @@ class TestChatAgent:
         assert result["kind"] == "test_tool"
         assert result["success"] is True
         assert result["text"] == "tool output"
-        mock_tool.ainvoke.assert_called_once_with({"arg": "val"})
+        assert mock_tool.calls == [{"arg": "val"}]
 
-    @patch("src.agent.create_chat_model")
-    async def test_execute_tool_error(self, mock_create):
-        mock_create.return_value = MagicMock()
-        mock_tool = MagicMock()
-        mock_tool.name = "bad_tool"
-        mock_tool.ainvoke = AsyncMock(side_effect=RuntimeError("tool broke"))
+    async def test_execute_tool_duplicate_names_use_first_tool(self, mock_create):
+        first = _StubTool("dup", result="first")
+        second = _StubTool("dup", result="second")
 
-        agent = ChatAgent(self._make_config(), tools=[mock_tool])
-        result, is_error = await agent._execute_tool("bad_tool", {})
-        assert is_error is True
-        assert result["kind"] == "bad_tool"
-        assert result["success"] is False
-        assert "tool broke" in result["text"]
-
-    @patch("src.agent.create_chat_model")
-    async def test_truncate_history_keeps_system_and_turns(self, mock_create):
-        mock_create.return_value = MagicMock()
+        agent = ChatAgent(self._make_config(), tools=[first, second])
+        result, _ = await agent._execute_tool("dup", {})
+        assert result["text"] == "first"
+        assert second.calls == []
+
+    async def test_execute_tool_cache_disabled_by_default(self, mock_create):
+        tool = _StubTool("read", result="contents", metadata={"read_only": True})
+
+        agent = ChatAgent(self._make_config(), tools=[tool])
+        await agent._execute_tool("read", {"file_path": "a"})
+        await agent._execute_tool("read", {"file_path": "a"})
+        assert len(tool.calls) == 2
+
+    async def test_execute_tool_caches_read_only_results(
+        self, mock_create, monkeypatch
+    ):
+        monkeypatch.setattr("src.agent.TOOL_RESULT_CACHE_SIZE", 2)
+        tool = _StubTool("read", result="contents", metadata={"read_only": True})
+
+        agent = ChatAgent(self._make_config(), tools=[tool])
+        first, _ = await agent._execute_tool("read", {"file_path": "a", "limit": 1})
+        # Key order in the args does not matter.
+        second, is_error = await agent._execute_tool("read", {"limit": 1, "file_path": "a"})
+        assert second == first
+        assert second is not first
+        assert is_error is False
+        assert tool.calls == [{"file_path": "a", "limit": 1}]
+
+        await agent._execute_tool("read", {"file_path": "b"})
+        await agent._execute_tool("read", {"file_path": "c"})  # evicts "a"
+        await agent._execute_tool("read", {"file_path": "a", "limit": 1})
+        assert len(tool.calls) == 4
+
+    async def test_execute_tool_cache_skips_errors_and_mutating_tools(
+        self, mock_create, monkeypatch
+    ):
+        monkeypatch.setattr("src.agent.TOOL_RESULT_CACHE_SIZE", 8)
+        flaky = _StubTool("grep", exc=RuntimeError("boom"), metadata={"read_only": True})
+        read = _StubTool("read", result="contents", metadata={"read_only": True})
+        write = _StubTool("write", result="ok", metadata={"read_only": False})
+
+        agent = ChatAgent(self._make_config(), tools=[flaky, read, write])
+        await agent._execute_tool("grep", {"pattern": "x"})
+        await agent._execute_tool("grep", {"pattern": "x"})
+        assert len(flaky.calls) == 2
+
+        await agent._execute_tool("read", {"file_path": "a"})
+        await agent._execute_tool("write", {"file_path": "a"})
+        await agent._execute_tool("read", {"file_path": "a"})
+        assert len(read.calls) == 2
+
+        agent.clear_tool_cache()
+        await agent._execute_tool("read", {"file_path": "a"})
+        assert len(read.calls) == 3
+
+    async def test_execute_tool_cache_never_serves_network_reads(
+        self, mock_create, monkeypatch
+    ):
+        monkeypatch.setattr("src.agent.TOOL_RESULT_CACHE_SIZE", 8)
+        fetch = _StubTool("web_fetch", result="page", metadata={"read_only": True})
+        read = _StubTool("read", result="contents", metadata={"read_only": True})
+
+        agent = ChatAgent(self._make_config(), tools=[fetch, read])
+        await agent._execute_tool("read", {"file_path": "a"})
+        await agent._execute_tool("web_fetch", {"url": "https://example.com"})
+        await agent._execute_tool("web_fetch", {"url": "https://example.com"})
+        await agent._execute_tool("read", {"file_path": "a"})
+        assert len(fetch.calls) == 2
+        # A network read does not touch the workspace, so "a" stays cached.
+        assert len(read.calls) == 1
+
+    async def test_execute_tool_cache_copies_results(
+        self, mock_create, monkeypatch
+    ):
+        monkeypatch.setattr("src.agent.TOOL_RESULT_CACHE_SIZE", 8)
+        read = _StubTool("read", result="contents", metadata={"read_only": True})
+
+        agent = ChatAgent(self._make_config(), tools=[read])
+        first, _ = await agent._execute_tool("read", {"file_path": "a"})
+        first["text"] = "mutated"
+        second, _ = await agent._execute_tool("read", {"file_path": "a"})
+        second["text"] = "mutated again"
+        third, _ = await agent._execute_tool("read", {"file_path": "a"})
+        assert third["text"] == "contents"
+        assert len(read.calls) == 1
+
+    async def test_handle_message_starts_with_an_empty_tool_cache(
+        self, mock_create, monkeypatch
+    ):
+        monkeypatch.setattr("src.agent.TOOL_RESULT_CACHE_SIZE", 8)
+        read = _StubTool("read", result="contents", metadata={"read_only": True})
+
+        agent = ChatAgent(self._make_config(), tools=[read])
+        await agent._execute_tool("read", {"file_path": "a"})
+        await _collect(agent.handle_message("again"))
+        await agent._execute_tool("read", {"file_path": "a"})
+        assert len(read.calls) == 2
+
+    def test_truncate_history_keeps_system_and_turns(self, mock_create):
         config = self._make_config(history=[
             {"role": "user", "content": "u1"},
             {"role": "assistant", "content": "a1"},
@@ -992,17 +1291,17 @@ class TestChatAgent:
         ])
         agent = ChatAgent(config)
         assert len(agent.messages) == 7  # system + 6
+        messages = agent.messages
 
         agent.truncate_history(2)
+        assert agent.messages is messages  # truncated in place
         # system + u1 + a1 + u2 + a2
         assert len(agent.messages) == 5
         assert isinstance(agent.messages[0], SystemMessage)
         assert agent.messages[1].content == "u1"
         assert agent.messages[4].content == "a2"
 
-    @patch("src.agent.create_chat_model")
-    async def test_truncate_history_zero_keeps_only_system(self, mock_create):
-        mock_create.return_value = MagicMock()
+    def test_truncate_history_zero_keeps_only_system(self, mock_create):
         config = self._make_config(history=[
             {"role": "user", "content": "u1"},
             {"role": "assistant", "content": "a1"},
@@ -1012,88 +1311,21 @@ class TestChatAgent:
         assert len(agent.messages) == 1
         assert isinstance(agent.messages[0], SystemMessage)
 
-    @patch("src.agent.create_chat_model")
-    async def test_truncate_history_preserves_tool_messages(self, mock_create):
+    def test_truncate_history_preserves_tool_messages(self, mock_create):
         """ToolMessages between AI messages should be preserved for kept turns."""
-        from langchain_core.messages import ToolMessage
-        mock_create.return_value = MagicMock()
         config = self._make_config()
         agent = ChatAgent(config)
-        # Manually build a history with tool messages
-        agent.messages = [
-            agent.messages[0],  # SystemMessage
-            HumanMessage(content="u1"),
-            AIMessage(content="", tool_calls=[{"id": "tc1", "name": "t", "args": {}}]),
-            ToolMessage(content="result", tool_call_id="tc1"),
-            AIMessage(content="a1"),
-            HumanMessage(content="u2"),
-            AIMessage(content="a2"),
-        ]
+        agent.messages = [agent.messages[0], *_TOOL_TURN_HISTORY]
         agent.truncate_history(1)
         # Should keep: System + u1 + AI(tool_call) + ToolMessage + AI(a1)
         assert len(agent.messages) == 5
         assert isinstance(agent.messages[3], ToolMessage)
         assert agent.messages[4].content == "a1"
 
-    @patch("src.agent.create_chat_model")
-    async def test_execute_tool_multimodal_result(self, mock_create):
-        """When a tool returns a list, _execute_tool should normalize it with llm_content."""
-        mock_create.return_value = MagicMock()
-        multimodal_result = [
-            {"type": "text", "text": "Image file: photo.png"},
-            {"type": "image_url", "image_url": {"url": "data:image/png;base64,abc123"}},
-        ]
-        mock_tool = MagicMock()
-        mock_tool.name = "read"
-        mock_tool.ainvoke = AsyncMock(return_value=multimodal_result)
-
-        agent = ChatAgent(self._make_config(), tools=[mock_tool])
-        result, is_error = await agent._execute_tool("read", {"file_path": "photo.png"})
-        assert is_error is False
-        assert result["kind"] == "read"
-        assert result["success"] is True
-        assert isinstance(result["llm_content"], list)
-        assert result["llm_content"] == multimodal_result
-
-    @patch("src.agent.create_chat_model")
-    async def test_structured_tool_result_keeps_llm_content(self, mock_create):
-        """Structured dict results should preserve llm_content for ToolMessage context."""
-        mock_create.return_value = MagicMock()
-        llm_content = [
-            {"type": "text", "text": "Generated image markdown"},
-            {"type": "image_url", "image_url": {"url": "data:image/png;base64,abc123"}},
-        ]
-        mock_tool = MagicMock()
-        mock_tool.name = "image_generation"
-        mock_tool.ainvoke = AsyncMock(return_value={
-            "kind": "image_generation",
-            "text": "![Generated Image](sandbox:///generated_images/sample.png)",
-            "success": True,
-            "error": None,
-            "data": {"media": [{"type": "image", "url": "sandbox:///generated_images/sample.png"}]},
-            "meta": {"image_count": 1},
-            "llm_content": llm_content,
-        })
-
-        agent = ChatAgent(self._make_config(), tools=[mock_tool])
-        result, is_error = await agent._execute_tool("image_generation", {"prompt": "a cat"})
-        assert is_error is False
-        assert result["kind"] == "image_generation"
-        assert result["success"] is True
-        assert result["text"].startswith("![Generated Image]")
-        assert result["llm_content"] == llm_content
-
-    @patch("src.agent.create_chat_model")
     async def test_explore_tool_streams_subagent_trace_events(self, mock_create):
-        from langchain_core.messages import AIMessageChunk, ToolCallChunk
-
-        call_count = 0
-
-        async def fake_astream(messages):
-            nonlocal call_count
-            call_count += 1
-            if call_count == 1:
-                yield AIMessageChunk(
+        mock_llm = _StubLLM(_two_phase_astream(
+            [
+                AIMessageChunk(
                     content="",
                     tool_call_chunks=[
                         ToolCallChunk(
@@ -1103,13 +1335,10 @@ class TestChatAgent:
                             index=0,
                         ),
                     ],
-                )
-            else:
-                yield AIMessageChunk(content="Task done.", tool_call_chunks=[])
-
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
+                ),
+            ],
+            [_TASK_DONE_CHUNK],
+        ))
         mock_create.return_value = mock_llm
 
         class _Runner:
@@ -1140,37 +1369,28 @@ class TestChatAgent:
         explore_tool = ExploreTool(runner=_Runner())
         agent = ChatAgent(self._make_config(), tools=[explore_tool])
 
-        events = []
-        async for event in agent.handle_message("run explore"):
-            events.append(event)
+        events = await _collect_by_type(agent.handle_message("run explore"))
 
-        trace_events = [e for e in events if e.type == "subagent_trace_delta"]
+        trace_events = events["subagent_trace_delta"]
         assert [e.data["event_type"] for e in trace_events] == [
             "assistant_delta",
             "tool_call",
             "tool_result",
             "complete",
         ]
-        assert not any(e.type == "task_trace_delta" for e in events)
+        assert not events["task_trace_delta"]
         assert trace_events[1].data["payload"]["tool_name"] == "read"
 
-        tool_result_event = next(e for e in events if e.type == "tool_result")
+        [tool_result_event] = events["tool_result"]
         assert tool_result_event.data["result"]["kind"] == "explore"
         assert tool_result_event.data["is_error"] is False
 
-    @patch("src.agent.create_chat_model")
     async def test_set_event_sink_alone_does_not_enable_subagent_trace(
         self, mock_create
     ):
-        from langchain_core.messages import AIMessageChunk, ToolCallChunk
-
-        call_count = 0
-
-        async def fake_astream(_messages):
-            nonlocal call_count
-            call_count += 1
-            if call_count == 1:
-                yield AIMessageChunk(
+        mock_llm = _StubLLM(_two_phase_astream(
+            [
+                AIMessageChunk(
                     content="",
                     tool_call_chunks=[
                         ToolCallChunk(
@@ -1180,13 +1400,10 @@ class TestChatAgent:
                             index=0,
                         ),
                     ],
-                )
-            else:
-                yield AIMessageChunk(content="done", tool_call_chunks=[])
-
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
+                ),
+            ],
+            [AIMessageChunk(content="done", tool_call_chunks=[])],
+        ))
         mock_create.return_value = mock_llm
 
         class _RuntimeHookTool:
@@ -1214,25 +1431,16 @@ class TestChatAgent:
 
         tool = _RuntimeHookTool()
         agent = ChatAgent(self._make_config(), tools=[tool])
-        events = []
-        async for event in agent.handle_message("run hook"):
-            events.append(event)
+        events = await _collect_by_type(agent.handle_message("run hook"))
 
         assert tool.set_event_sink_called is False
-        assert not any(e.type == "subagent_trace_delta" for e in events)
-        assert not any(e.type == "task_trace_delta" for e in events)
+        assert not events["subagent_trace_delta"]
+        assert not events["task_trace_delta"]
 
-    @patch("src.agent.create_chat_model")
     async def test_runtime_event_opt_in_forwards_question_events(self, mock_create):
-        from langchain_core.messages import AIMessageChunk, ToolCallChunk
-
-        call_count = 0
-
-        async def fake_astream(_messages):
-            nonlocal call_count
-            call_count += 1
-            if call_count == 1:
-                yield AIMessageChunk(
+        mock_llm = _StubLLM(_two_phase_astream(
+            [
+                AIMessageChunk(
                     content="",
                     tool_call_chunks=[
                         ToolCallChunk(
@@ -1242,13 +1450,10 @@ class TestChatAgent:
                             index=0,
                         ),
                     ],
-                )
-            else:
-                yield AIMessageChunk(content="continued", tool_call_chunks=[])
-
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
+                ),
+            ],
+            [AIMessageChunk(content="continued", tool_call_chunks=[])],
+        ))
         mock_create.return_value = mock_llm
 
         class _QuestionHookTool:
@@ -1291,20 +1496,19 @@ class TestChatAgent:
         tool = _QuestionHookTool()
         agent = ChatAgent(self._make_config(), tools=[tool])
 
-        events = []
-        async for event in agent.handle_message("ask"):
-            events.append(event)
+        events = await _collect_by_type(agent.handle_message("ask"))
 
-        question_event = next(e for e in events if e.type == "question")
+        [question_event] = events["question"]
         assert question_event.data["tool_call_id"] == "tc-question-hook-1"
         assert question_event.data["questionnaire_id"] == "qq-test"
-        assert not any(e.type == "subagent_trace_delta" for e in events)
-        assert any(e.type == "complete" for e in events)
+        assert not events["subagent_trace_delta"]
+        assert events["complete"]
 
-    @patch("src.agent.create_chat_model")
+    # With --dist=loadgroup (the CLAUDE.md command), xdist runs every test in
+    # this group on one worker, so this and the other wait_for-bounded test
+    # never run at the same time. Without that flag the marker is ignored.
+    @pytest.mark.xdist_group("serial")
     async def test_explore_tool_cancel_clears_event_sink(self, mock_create):
-        from langchain_core.messages import AIMessageChunk, ToolCallChunk
-
         async def fake_astream(_messages):
             yield AIMessageChunk(
                 content="",
@@ -1318,9 +1522,7 @@ class TestChatAgent:
                 ],
             )
 
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         class _Runner:
@@ -1334,8 +1536,8 @@ class TestChatAgent:
                 if sink is not None:
                     await sink(StreamEvent("assistant_delta", {"delta": "working"}))
                 try:
-                    while True:
-                        await asyncio.sleep(0.05)
+                    # Never set: parks until the agent cancels the tool call.
+                    await asyncio.Event().wait()
                 except asyncio.CancelledError:
                     self.cancelled.set()
                     raise
@@ -1344,34 +1546,23 @@ class TestChatAgent:
         explore_tool = ExploreTool(runner=runner)
         agent = ChatAgent(self._make_config(), tools=[explore_tool])
 
-        events: list[StreamEvent] = []
-
-        async def _collect() -> None:
-            async for event in agent.handle_message("run explore"):
-                events.append(event)
-
-        collect_task = asyncio.create_task(_collect())
+        collect_task = asyncio.create_task(
+            _collect_by_type(agent.handle_message("run explore"))
+        )
         await asyncio.wait_for(runner.started.wait(), timeout=1)
         agent.cancel()
-        await asyncio.wait_for(collect_task, timeout=1)
+        events = await asyncio.wait_for(collect_task, timeout=1)
 
         assert runner.cancelled.is_set()
         assert explore_tool._event_sink is None
-        assert any(e.type == "subagent_trace_delta" for e in events)
-        error_event = next(e for e in events if e.type == "error")
+        assert events["subagent_trace_delta"]
+        [error_event] = events["error"]
         assert error_event.data["code"] == "cancelled"
 
-    @patch("src.agent.create_chat_model")
     async def test_explore_tool_streams_large_trace_burst(self, mock_create):
-        from langchain_core.messages import AIMessageChunk, ToolCallChunk
-
-        call_count = 0
-
-        async def fake_astream(_messages):
-            nonlocal call_count
-            call_count += 1
-            if call_count == 1:
-                yield AIMessageChunk(
+        mock_llm = _StubLLM(_two_phase_astream(
+            [
+                AIMessageChunk(
                     content="",
                     tool_call_chunks=[
                         ToolCallChunk(
@@ -1381,23 +1572,20 @@ class TestChatAgent:
                             index=0,
                         ),
                     ],
-                )
-            else:
-                yield AIMessageChunk(content="Task done.", tool_call_chunks=[])
-
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
+                ),
+            ],
+            [_TASK_DONE_CHUNK],
+        ))
         mock_create.return_value = mock_llm
 
+        # Larger than SUBAGENT_EVENT_QUEUE_MAXSIZE, so some sinks must wait.
         burst_size = 300
 
         class _Runner:
             async def run_subagent(self, **kwargs):
                 sink = kwargs.get("event_sink")
                 if sink is not None:
-                    for _ in range(burst_size):
-                        await sink(StreamEvent("assistant_delta", {"delta": "x"}))
+                    await asyncio.gather(*(sink(_BURST_DELTA) for _ in range(burst_size)))
                 return {
                     "kind": "explore",
                     "text": "Subagent summary",
@@ -1410,51 +1598,35 @@ class TestChatAgent:
         explore_tool = ExploreTool(runner=_Runner())
         agent = ChatAgent(self._make_config(), tools=[explore_tool])
 
-        events = []
-        async for event in agent.handle_message("run explore"):
-            events.append(event)
+        events = await _collect_by_type(agent.handle_message("run explore"))
 
-        trace_events = [e for e in events if e.type == "subagent_trace_delta"]
+        trace_events = events["subagent_trace_delta"]
         assert len(trace_events) == burst_size
         assert all(e.data["event_type"] == "assistant_delta" for e in trace_events)
 
-    @patch("src.agent.create_chat_model")
     async def test_tool_result_event_display_string(self, mock_create):
         """tool_result event sent to frontend should not contain base64 data."""
-        from langchain_core.messages import AIMessageChunk, ToolCallChunk
-
-        call_count = 0
-
-        async def fake_astream(messages):
-            nonlocal call_count
-            call_count += 1
-            if call_count == 1:
-                yield AIMessageChunk(
+        mock_llm = _StubLLM(_two_phase_astream(
+            [
+                AIMessageChunk(
                     content="",
                     tool_call_chunks=[
                         ToolCallChunk(name="read", args='{"file_path": "img.png"}', id="tc-1", index=0),
                     ],
-                )
-            else:
-                yield AIMessageChunk(content="I see a cat.", tool_call_chunks=[])
-
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
+                ),
+            ],
+            [AIMessageChunk(content="I see a cat.", tool_call_chunks=[])],
+        ))
         mock_create.return_value = mock_llm
 
         multimodal_result = [
             {"type": "text", "text": "Image file: img.png"},
             {"type": "image_url", "image_url": {"url": "data:image/png;base64,iVBORw0KGgo="}},
         ]
-        mock_tool = MagicMock()
-        mock_tool.name = "read"
-        mock_tool.ainvoke = AsyncMock(return_value=multimodal_result)
+        mock_tool = _StubTool("read", result=multimodal_result)
 
         agent = ChatAgent(self._make_config(), tools=[mock_tool])
-        events = []
-        async for event in agent.handle_message("describe img.png"):
-            events.append(event)
+        events = await _collect(agent.handle_message("describe img.png"))
 
         tool_result_events = [e for e in events if e.type == "tool_result"]
         assert len(tool_result_events) == 1
@@ -1470,19 +1642,14 @@ class TestChatAgent:
         tool_block = next(b for b in blocks if b.get("type") == "tool_call")
         assert tool_block["result"]["kind"] == "read"
         assert "base64" not in tool_block["result"]["text"]
+        # The display result is computed once and shared by both.
+        assert tool_block["result"] is tr.data["result"]
 
-    @patch("src.agent.create_chat_model")
     async def test_tool_result_hides_llm_content_but_tool_message_keeps_it(self, mock_create):
         """tool_result should omit llm_content while ToolMessage keeps multimodal payload."""
-        from langchain_core.messages import AIMessageChunk, ToolCallChunk
-
-        call_count = 0
-
-        async def fake_astream(messages):
-            nonlocal call_count
-            call_count += 1
-            if call_count == 1:
-                yield AIMessageChunk(
+        mock_llm = _StubLLM(_two_phase_astream(
+            [
+                AIMessageChunk(
                     content="",
                     tool_call_chunks=[
                         ToolCallChunk(
@@ -1492,22 +1659,17 @@ class TestChatAgent:
                             index=0,
                         ),
                     ],
-                )
-            else:
-                yield AIMessageChunk(content="Done.", tool_call_chunks=[])
-
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
+                ),
+            ],
+            [AIMessageChunk(content="Done.", tool_call_chunks=[])],
+        ))
         mock_create.return_value = mock_llm
 
         llm_content = [
             {"type": "text", "text": "![Generated Image](sandbox:///generated_images/a.png)"},
             {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}},
         ]
-        mock_tool = MagicMock()
-        mock_tool.name = "image_generation"
-        mock_tool.ainvoke = AsyncMock(return_value={
+        mock_tool = _StubTool("image_generation", result={
             "kind": "image_generation",
             "text": "![Generated Image](sandbox:///generated_images/a.png)",
             "success": True,
@@ -1518,9 +1680,7 @@ class TestChatAgent:
         })
 
         agent = ChatAgent(self._make_config(), tools=[mock_tool])
-        events = []
-        async for event in agent.handle_message("generate image"):
-            events.append(event)
+        events = await _collect(agent.handle_message("generate image"))
 
         tool_result_event = next(e for e in events if e.type == "tool_result")
         assert tool_result_event.data["result"]["kind"] == "image_generation"
@@ -1531,43 +1691,29 @@ class TestChatAgent:
         assert len(tool_msgs) == 1
         assert tool_msgs[0].content == llm_content
 
-    @patch("src.agent.create_chat_model")
     async def test_tool_message_contains_full_multimodal(self, mock_create):
         """ToolMessage appended to agent.messages should contain the full list content."""
-        from langchain_core.messages import AIMessageChunk, ToolCallChunk, ToolMessage
-
-        call_count = 0
-
-        async def fake_astream(messages):
-            nonlocal call_count
-            call_count += 1
-            if call_count == 1:
-                yield AIMessageChunk(
+        mock_llm = _StubLLM(_two_phase_astream(
+            [
+                AIMessageChunk(
                     content="",
                     tool_call_chunks=[
                         ToolCallChunk(name="read", args='{"file_path": "x.png"}', id="tc-1", index=0),
                     ],
-                )
-            else:
-                yield AIMessageChunk(content="Got it.", tool_call_chunks=[])
-
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
+                ),
+            ],
+            [AIMessageChunk(content="Got it.", tool_call_chunks=[])],
+        ))
         mock_create.return_value = mock_llm
 
         multimodal_result = [
             {"type": "text", "text": "Image file: x.png"},
             {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}},
         ]
-        mock_tool = MagicMock()
-        mock_tool.name = "read"
-        mock_tool.ainvoke = AsyncMock(return_value=multimodal_result)
+        mock_tool = _StubTool("read", result=multimodal_result)
 
         agent = ChatAgent(self._make_config(), tools=[mock_tool])
-        events = []
-        async for event in agent.handle_message("read x.png"):
-            events.append(event)
+        await _collect(agent.handle_message("read x.png"))
 
         # Find the ToolMessage in agent.messages
         tool_msgs = [m for m in agent.messages if isinstance(m, ToolMessage)]
@@ -1576,35 +1722,23 @@ class TestChatAgent:
         assert isinstance(tool_msgs[0].content, list)
         assert tool_msgs[0].content == multimodal_result
 
-    @patch("src.agent.create_chat_model")
     async def test_mixed_tool_calls_string_and_multimodal(self, mock_create):
         """When multiple tools run, string and multimodal results should both work."""
-        from langchain_core.messages import AIMessageChunk, ToolCallChunk
-
-        call_count = 0
-
-        async def fake_astream(messages):
-            nonlocal call_count
-            call_count += 1
-            if call_count == 1:
-                yield AIMessageChunk(
+        mock_llm = _StubLLM(_two_phase_astream(
+            [
+                AIMessageChunk(
                     content="",
                     tool_call_chunks=[
                         ToolCallChunk(name="bash", args='{"command": "ls"}', id="tc-1", index=0),
                         ToolCallChunk(name="read", args='{"file_path": "img.png"}', id="tc-2", index=1),
                     ],
-                )
-            else:
-                yield AIMessageChunk(content="Done.", tool_call_chunks=[])
-
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
+                ),
+            ],
+            [AIMessageChunk(content="Done.", tool_call_chunks=[])],
+        ))
         mock_create.return_value = mock_llm
 
-        bash_tool = MagicMock()
-        bash_tool.name = "bash"
-        bash_tool.ainvoke = AsyncMock(return_value={
+        bash_tool = _StubTool("bash", result={
             "kind": "bash",
             "text": "file1.txt\nimg.png",
             "stdout": "file1.txt\nimg.png",
@@ -1616,17 +1750,13 @@ class TestChatAgent:
             "error": False,
         })
 
-        read_tool = MagicMock()
-        read_tool.name = "read"
-        read_tool.ainvoke = AsyncMock(return_value=[
+        read_tool = _StubTool("read", result=[
             {"type": "text", "text": "Image file: img.png"},
             {"type": "image_url", "image_url": {"url": "data:image/png;base64,abc"}},
         ])
 
         agent = ChatAgent(self._make_config(), tools=[bash_tool, read_tool])
-        events = []
-        async for event in agent.handle_message("list and show"):
-            events.append(event)
+        events = await _collect(agent.handle_message("list and show"))
 
         tool_results = [e for e in events if e.type == "tool_result"]
         assert len(tool_results) == 2
@@ -1638,18 +1768,14 @@ class TestChatAgent:
         assert "base64" not in tool_results[1].data["result"]["text"]
         assert "img.png" in tool_results[1].data["result"]["text"]
 
-    @patch("src.agent.create_chat_model")
     async def test_display_result_joins_multiple_text_blocks(self, mock_create):
         """If multimodal result has multiple text blocks, normalization should join them."""
-        mock_create.return_value = MagicMock()
         multi_text_result = [
             {"type": "text", "text": "Part one."},
             {"type": "image_url", "image_url": {"url": "data:image/png;base64,x"}},
             {"type": "text", "text": "Part two."},
         ]
-        mock_tool = MagicMock()
-        mock_tool.name = "read"
-        mock_tool.ainvoke = AsyncMock(return_value=multi_text_result)
+        mock_tool = _StubTool("read", result=multi_text_result)
 
         agent = ChatAgent(self._make_config(), tools=[mock_tool])
         result, is_error = await agent._execute_tool("read", {"file_path": "x.png"})
@@ -1661,50 +1787,33 @@ class TestChatAgent:
         assert len(result["llm_content"]) == 3
 
 
-    @patch("src.agent.create_chat_model")
     async def test_thinking_blocks_preserved_in_messages_during_tool_loop(self, mock_create):
         """Thinking blocks should be preserved in AIMessage content during tool-call iterations."""
-        from langchain_core.messages import AIMessageChunk, ToolCallChunk
-
-        call_count = 0
-
-        async def fake_astream(messages):
-            nonlocal call_count
-            call_count += 1
-            if call_count == 1:
-                # Iteration 1: thinking + text + tool call
-                yield AIMessageChunk(
+        mock_llm = _StubLLM(_two_phase_astream(
+            [
+                AIMessageChunk(
                     content=[{"type": "thinking", "thinking": "Let me search for this"}],
                     tool_call_chunks=[],
-                )
-                yield AIMessageChunk(
+                ),
+                AIMessageChunk(
                     content=[{"type": "text", "text": "I'll search that."}],
                     tool_call_chunks=[],
-                )
-                yield AIMessageChunk(
+                ),
+                AIMessageChunk(
                     content="",
                     tool_call_chunks=[
                         ToolCallChunk(name="web_search", args='{"query": "test"}', id="tc-1", index=0),
                     ],
-                )
-            else:
-                # Iteration 2: final text
-                yield AIMessageChunk(content="Here are the results.", tool_call_chunks=[])
-
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
-        mock_llm.bind = MagicMock(return_value=mock_llm)
+                ),
+            ],
+            [AIMessageChunk(content="Here are the results.", tool_call_chunks=[])],
+        ))
         mock_create.return_value = mock_llm
 
-        mock_tool = MagicMock()
-        mock_tool.name = "web_search"
-        mock_tool.ainvoke = AsyncMock(return_value="search results here")
+        mock_tool = _StubTool("web_search", result="search results here")
 
         agent = ChatAgent(self._make_config(), tools=[mock_tool])
-        events = []
-        async for event in agent.handle_message("search for test", deep_thinking=True):
-            events.append(event)
+        await _collect(agent.handle_message("search for test", deep_thinking=True))
 
         # Find the AIMessage with tool_calls (iteration 1)
         ai_with_tools = [
@@ -1728,11 +1837,86 @@ class TestChatAgent:
         ]
         assert len(text_blocks) >= 1
 
-    @patch("src.agent.create_chat_model")
+    # Shares the loadgroup worker with test_explore_tool_cancel_clears_event_sink.
+    @pytest.mark.xdist_group("serial")
+    async def test_read_only_tool_calls_run_concurrently(self, mock_create):
+        """Consecutive read-only tool calls run together but report in call order."""
+        mock_llm = _StubLLM(_two_phase_astream(
+            [
+                AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        ToolCallChunk(name="slow", args='{}', id="tc-1", index=0),
+                        ToolCallChunk(name="fast", args='{}', id="tc-2", index=1),
+                    ],
+                ),
+            ],
+            [AIMessageChunk(content="Done.", tool_call_chunks=[])],
+        ))
+        mock_create.return_value = mock_llm
+
+        both_started = asyncio.Event()
+        started: list[str] = []
+
+        class _RendezvousTool(_StubTool):
+            async def ainvoke(self, args):
+                started.append(self.name)
+                if len(started) == 2:
+                    both_started.set()
+                # Deadlocks unless the other call is already running.
+                await asyncio.wait_for(both_started.wait(), timeout=1)
+                return f"{self.name} result"
+
+        tools = [
+            _RendezvousTool(name, metadata={"read_only": True})
+            for name in ("slow", "fast")
+        ]
+        agent = ChatAgent(self._make_config(), tools=tools)
+        events = await _collect(agent.handle_message("go"))
+
+        kinds = [(e.type, e.data.get("tool_call_id")) for e in events if e.type.startswith("tool_")]
+        assert kinds == [
+            ("tool_call", "tc-1"),
+            ("tool_call", "tc-2"),
+            ("tool_result", "tc-1"),
+            ("tool_result", "tc-2"),
+        ]
+        tool_messages = [m for m in agent.messages if isinstance(m, ToolMessage)]
+        assert [m.tool_call_id for m in tool_messages] == ["tc-1", "tc-2"]
+
+    async def test_tool_calls_without_ids_get_one_id_everywhere(self, mock_create):
+        """Missing ids are filled once and shared by history, events and results."""
+        mock_create.return_value = _StubLLM(_two_phase_astream(
+            [
+                AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        ToolCallChunk(name="read", args='{}', id=None, index=0),
+                        ToolCallChunk(name="glob", args='{}', id=None, index=1),
+                        ToolCallChunk(name="write", args='{}', id=None, index=2),
+                    ],
+                ),
+            ],
+            [AIMessageChunk(content="Done.", tool_call_chunks=[])],
+        ))
+        tools = [
+            _StubTool("read", result="r", metadata={"read_only": True}),
+            _StubTool("glob", result="g", metadata={"read_only": True}),
+            _StubTool("write", result="w", metadata={"read_only": False}),
+        ]
+        agent = ChatAgent(self._make_config(), tools=tools)
+        by_type = await _collect_by_type(agent.handle_message("go"))
+
+        [ai_msg] = [m for m in agent.messages if isinstance(m, AIMessage) and m.tool_calls]
+        ids = [tc["id"] for tc in ai_msg.tool_calls]
+        assert all(ids) and len(set(ids)) == 3
+        assert [e.data["tool_call_id"] for e in by_type["tool_call"]] == ids
+        assert [e.data["tool_call_id"] for e in by_type["tool_result"]] == ids
+        tool_messages = [m for m in agent.messages if isinstance(m, ToolMessage)]
+        assert [m.tool_call_id for m in tool_messages] == ids
+
     async def test_thinking_blocks_in_final_message_no_tool_calls(self, mock_create):
         """Thinking blocks should be preserved in the final AIMessage when no tool calls occur."""
-        from langchain_core.messages import AIMessageChunk
-
         async def fake_astream(messages):
             yield AIMessageChunk(
                 content=[{"type": "thinking", "thinking": "Deep thought here"}],
@@ -1743,15 +1927,11 @@ class TestChatAgent:
                 tool_call_chunks=[],
             )
 
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
-        mock_llm.bind = MagicMock(return_value=mock_llm)
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         agent = ChatAgent(self._make_config())
-        events = []
-        async for event in agent.handle_message("think about this", deep_thinking=True):
-            events.append(event)
+        await _collect(agent.handle_message("think about this", deep_thinking=True))
 
         # The final AIMessage should have list content with thinking blocks
         final_ai = agent.messages[-1]
@@ -1768,11 +1948,8 @@ class TestChatAgent:
         ]
         assert len(text_blocks) >= 1
 
-    @patch("src.agent.create_chat_model")
     async def test_openai_strips_rs_ids_from_saved_content_blocks(self, mock_create):
         """OpenAI history should not keep rs_* ids that become invalid item refs."""
-        from langchain_core.messages import AIMessageChunk
-
         async def fake_astream(messages):
             yield AIMessageChunk(
                 content=[
@@ -1789,27 +1966,21 @@ class TestChatAgent:
                 tool_call_chunks=[],
             )
 
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         agent = ChatAgent(self._make_config(provider="openai"))
-        async for _ in agent.handle_message("hi"):
-            pass
+        await _collect(agent.handle_message("hi"))
 
         final_ai = agent.messages[-1]
         assert isinstance(final_ai, AIMessage)
         assert isinstance(final_ai.content, list)
-        dumped = json.dumps(final_ai.content, ensure_ascii=False)
-        assert "Final answer" in dumped
-        assert "rs_parent" not in dumped
-        assert "rs_child" not in dumped
+        assert _contains_value(final_ai.content, "Final answer")
+        assert not _contains_value(final_ai.content, "rs_parent")
+        assert not _contains_value(final_ai.content, "rs_child")
 
-    @patch("src.agent.create_chat_model")
     async def test_non_openai_preserves_content_ids(self, mock_create):
         """Only OpenAI should sanitize response/item ids from content blocks."""
-        from langchain_core.messages import AIMessageChunk
-
         async def fake_astream(messages):
             yield AIMessageChunk(
                 content=[{"type": "thinking", "thinking": "hmm", "id": "rs_keep"}],
@@ -1820,21 +1991,18 @@ class TestChatAgent:
                 tool_call_chunks=[],
             )
 
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         agent = ChatAgent(
             self._make_config(provider="anthropic", model="claude-sonnet-4-20250514")
         )
-        async for _ in agent.handle_message("hi"):
-            pass
+        await _collect(agent.handle_message("hi"))
 
         final_ai = agent.messages[-1]
         assert isinstance(final_ai, AIMessage)
         assert isinstance(final_ai.content, list)
-        dumped = json.dumps(final_ai.content, ensure_ascii=False)
-        assert "rs_keep" in dumped
+        assert _contains_value(final_ai.content, "rs_keep")
 
 
 class TestSanitizeDelta:
@@ -1866,22 +2034,16 @@ class TestSanitizeDelta:
 class TestStreamingSanitization:
     """Integration test: U+FFFD in LLM chunks must not reach assistant_delta or complete events."""
 
-    @patch("src.agent.create_chat_model")
     async def test_ufffd_stripped_from_stream(self, mock_create):
-        from langchain_core.messages import AIMessageChunk
-
         async def fake_astream(messages):
             yield AIMessageChunk(content="你好\ufffd世界", tool_call_chunks=[])
 
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         config = AgentConfig({"conversation_id": "test", "api_key": "k"})
         agent = ChatAgent(config)
-        events = []
-        async for event in agent.handle_message("hi"):
-            events.append(event)
+        events = await _collect(agent.handle_message("hi"))
 
         deltas = [e for e in events if e.type == "assistant_delta"]
         assert len(deltas) == 1
@@ -1892,11 +2054,8 @@ class TestStreamingSanitization:
         assert "\ufffd" not in complete.data["content"]
         assert complete.data["content"] == "你好世界"
 
-    @patch("src.agent.create_chat_model")
     async def test_ufffd_in_thinking_block_stripped(self, mock_create):
         """U+FFFD in thinking content blocks should be stripped."""
-        from langchain_core.messages import AIMessageChunk
-
         async def fake_astream(messages):
             yield AIMessageChunk(
                 content=[{"type": "thinking", "thinking": "思考\ufffd中"}],
@@ -1904,64 +2063,49 @@ class TestStreamingSanitization:
             )
             yield AIMessageChunk(content="结果", tool_call_chunks=[])
 
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         config = AgentConfig({"conversation_id": "test", "api_key": "k"})
         agent = ChatAgent(config)
-        events = []
-        async for event in agent.handle_message("think"):
-            events.append(event)
+        events = await _collect(agent.handle_message("think"))
 
         thinking_deltas = [e for e in events if e.type == "thinking_delta"]
         assert len(thinking_deltas) == 1
         assert "\ufffd" not in thinking_deltas[0].data["delta"]
         assert thinking_deltas[0].data["delta"] == "思考中"
 
-    @patch("src.agent.create_chat_model")
     async def test_ufffd_in_text_block_list_stripped(self, mock_create):
         """U+FFFD in list-style text content blocks should be stripped."""
-        from langchain_core.messages import AIMessageChunk
-
         async def fake_astream(messages):
             yield AIMessageChunk(
                 content=[{"type": "text", "text": "你\ufffd好"}],
                 tool_call_chunks=[],
             )
 
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         config = AgentConfig({"conversation_id": "test", "api_key": "k"})
         agent = ChatAgent(config)
-        events = []
-        async for event in agent.handle_message("hi"):
-            events.append(event)
+        events = await _collect(agent.handle_message("hi"))
 
         deltas = [e for e in events if e.type == "assistant_delta"]
         assert len(deltas) == 1
         assert deltas[0].data["delta"] == "你好"
 
-    @patch("src.agent.create_chat_model")
     async def test_pure_ufffd_chunk_produces_no_delta(self, mock_create):
         """A chunk containing only U+FFFD should not emit an assistant_delta event."""
-        from langchain_core.messages import AIMessageChunk
-
         async def fake_astream(messages):
             yield AIMessageChunk(content="\ufffd", tool_call_chunks=[])
             yield AIMessageChunk(content="ok", tool_call_chunks=[])
 
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         config = AgentConfig({"conversation_id": "test", "api_key": "k"})
         agent = ChatAgent(config)
-        events = []
-        async for event in agent.handle_message("hi"):
-            events.append(event)
+        events = await _collect(agent.handle_message("hi"))
 
         deltas = [e for e in events if e.type == "assistant_delta"]
         # Only the "ok" chunk should produce a delta, not the pure U+FFFD one
@@ -1971,25 +2115,19 @@ class TestStreamingSanitization:
         complete = next(e for e in events if e.type == "complete")
         assert complete.data["content"] == "ok"
 
-    @patch("src.agent.create_chat_model")
     async def test_multiple_chunks_with_ufffd(self, mock_create):
         """U+FFFD across multiple chunks should all be stripped, content accumulated correctly."""
-        from langchain_core.messages import AIMessageChunk
-
         async def fake_astream(messages):
             yield AIMessageChunk(content="你\ufffd", tool_call_chunks=[])
             yield AIMessageChunk(content="\ufffd好", tool_call_chunks=[])
             yield AIMessageChunk(content="世界", tool_call_chunks=[])
 
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         config = AgentConfig({"conversation_id": "test", "api_key": "k"})
         agent = ChatAgent(config)
-        events = []
-        async for event in agent.handle_message("hi"):
-            events.append(event)
+        events = await _collect(agent.handle_message("hi"))
 
         deltas = [e for e in events if e.type == "assistant_delta"]
         combined = "".join(e.data["delta"] for e in deltas)
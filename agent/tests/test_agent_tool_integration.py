@@ -3,14 +3,19 @@
 from __future__ import annotations
 
 import json
+from collections import defaultdict
+from functools import partial
+from pathlib import Path
 from typing import Any
-from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
+import orjson
 import pytest
 from langchain_core.messages import AIMessageChunk, ToolCallChunk
 
 from src.agent import AgentConfig, ChatAgent, StreamEvent
-from src.tools import create_all_tools
+
+from .stubs import _StubLLM
 
 
 # ---------------------------------------------------------------------------
@@ -33,7 +38,7 @@ def _tool_call_chunk(name: str, args: dict, tc_id: str = "tc-1") -> AIMessageChu
     return AIMessageChunk(
         content="",
         tool_call_chunks=[
-            ToolCallChunk(name=name, args=json.dumps(args), id=tc_id, index=0),
+            ToolCallChunk(name=name, args=orjson.dumps(args).decode(), id=tc_id, index=0),
         ],
     )
 
@@ -42,6 +47,61 @@ def _text_chunk(text: str) -> AIMessageChunk:
     return AIMessageChunk(content=text, tool_call_chunks=[])
 
 
+_EMPTY_TURN = [_text_chunk("")]
+
+# Scripted model turns, built once at import: (tool call turn, final turn).
+# The agent only reads the chunks, so every test can share them.
+_BASH_ECHO = (
+    [_tool_call_chunk("bash", {"command": "echo hello"})],
+    [_text_chunk("Done")],
+)
+_READ_FILE = (
+    [_tool_call_chunk("read", {"file_path": "test.txt"})],
+    [_text_chunk("Got it")],
+)
+_WRITE_FILE = (
+    [_tool_call_chunk("write", {"file_path": "out.txt", "content": "hi there"})],
+    [_text_chunk("Written")],
+)
+_EDIT_FILE = (
+    [_tool_call_chunk("edit", {
+        "file_path": "edit_me.txt",
+        "old_string": "old text",
+        "new_string": "new text",
+    })],
+    [_text_chunk("Edited")],
+)
+_GLOB_TXT = (
+    [_tool_call_chunk("glob", {"pattern": "*.txt"})],
+    [_text_chunk("Found them")],
+)
+_GLOB_TXT_NULL_PATH = (
+    [_tool_call_chunk("glob", {"pattern": "*.txt", "path": None})],
+    [_text_chunk("Found them")],
+)
+_GREP_HELLO = (
+    [_tool_call_chunk("grep", {"pattern": "hello"})],
+    [_text_chunk("Found")],
+)
+_WEB_FETCH = (
+    [_tool_call_chunk("web_fetch", {"url": "https://example.com"})],
+    [_text_chunk("Fetched")],
+)
+_CODE_INTERPRETER = (
+    [_tool_call_chunk("code_interpreter", {"code": "print(42)", "language": "python"})],
+    [_text_chunk("Result")],
+)
+_WEB_SEARCH = (
+    [_tool_call_chunk("web_search", {"query": "latest news"})],
+    [_text_chunk("Here are the results")],
+)
+# Iteration 1: text + failing tool call; iteration 2: reply after the error.
+_BASH_FAILS = (
+    [_text_chunk("Sure, "), _tool_call_chunk("bash", {"command": "exit 1"})],
+    [_text_chunk("The command failed.")],
+)
+
+
 def _make_fake_astream(*iterations):
     """Build a fake astream that yields different chunks per call.
 
@@ -51,7 +111,7 @@ def _make_fake_astream(*iterations):
 
     async def fake_astream(messages):
         nonlocal call_count
-        chunks = iterations[call_count] if call_count < len(iterations) else [_text_chunk("")]
+        chunks = iterations[call_count] if call_count < len(iterations) else _EMPTY_TURN
         call_count += 1
         for c in chunks:
             yield c
@@ -60,23 +120,31 @@ def _make_fake_astream(*iterations):
 
 
 def _setup_mock_llm(mock_create, fake_astream):
-    """Wire up mock_create to return a mock LLM with the given astream."""
-    mock_llm = MagicMock()
-    mock_llm.astream = fake_astream
-    mock_llm.bind_tools = MagicMock(return_value=mock_llm)
+    """Wire up mock_create to return a stub LLM with the given astream."""
+    mock_llm = _StubLLM(fake_astream)
     mock_create.return_value = mock_llm
     return mock_llm
 
 
+def _mock_http(monkeypatch, handler) -> None:
+    """Route every httpx.AsyncClient the web tools open through *handler*."""
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(
+        "src.tools.web.httpx.AsyncClient",
+        partial(httpx.AsyncClient, transport=transport),
+    )
+
+
 async def _collect_events(agent: ChatAgent, message: str = "go") -> list[StreamEvent]:
-    events: list[StreamEvent] = []
-    async for event in agent.handle_message(message):
-        events.append(event)
-    return events
+    return [event async for event in agent.handle_message(message)]
 
 
-def _events_by_type(events: list[StreamEvent], t: str) -> list[StreamEvent]:
-    return [e for e in events if e.type == t]
+def _bucket(events: list[StreamEvent]) -> defaultdict[str, list[StreamEvent]]:
+    """Group events by type in a single pass."""
+    by_type: defaultdict[str, list[StreamEvent]] = defaultdict(list)
+    for event in events:
+        by_type[event.type].append(event)
+    return by_type
 
 
 def _result_text(event: StreamEvent) -> str:
@@ -90,83 +158,110 @@ def _result_text(event: StreamEvent) -> str:
 # Fixtures (workspace provided by conftest.py)
 # ---------------------------------------------------------------------------
 
+@pytest.fixture
+def agent_factory(tools_by_name):
+    """Build a ChatAgent over the named workspace tools.
+
+    Call it after scripting the model: the agent binds its LLM on init. Agents
+    keep history, so each test gets fresh ones rather than a shared cache.
+    """
+    def make(*tool_names: str) -> ChatAgent:
+        return ChatAgent(_make_config(), tools=[tools_by_name[n] for n in tool_names])
+
+    return make
+
 
 # ---------------------------------------------------------------------------
 # Tests — one per tool
 # ---------------------------------------------------------------------------
 
 class TestBashToolIntegration:
-    @patch("src.agent.create_chat_model")
-    async def test_bash_echo(self, mock_create, workspace):
-        fake = _make_fake_astream(
-            [_tool_call_chunk("bash", {"command": "echo hello"})],
-            [_text_chunk("Done")],
-        )
+    async def test_bash_echo(self, mock_create, agent_factory):
+        fake = _make_fake_astream(*_BASH_ECHO)
         _setup_mock_llm(mock_create, fake)
 
-        tools = create_all_tools(workspace)
-        bash = next(t for t in tools if t.name == "bash")
-        agent = ChatAgent(_make_config(), tools=[bash])
-        events = await _collect_events(agent)
+        agent = agent_factory("bash")
+        by_type = _bucket(await _collect_events(agent))
 
-        tc_events = _events_by_type(events, "tool_call")
+        tc_events = by_type["tool_call"]
         assert len(tc_events) == 1
         assert tc_events[0].data["tool_name"] == "bash"
 
-        tr_events = _events_by_type(events, "tool_result")
+        tr_events = by_type["tool_result"]
         assert len(tr_events) == 1
         assert tr_events[0].data["result"]["kind"] == "bash"
         assert "hello" in _result_text(tr_events[0])
         assert tr_events[0].data["is_error"] is False
 
-        complete = _events_by_type(events, "complete")
+        complete = by_type["complete"]
         assert len(complete) == 1
         assert complete[0].data["tool_calls"] is not None
         assert complete[0].data["tool_calls"][0]["name"] == "bash"
         assert complete[0].data["tool_calls"][0]["result"]["kind"] == "bash"
 
 
-class TestReadToolIntegration:
-    @patch("src.agent.create_chat_model")
-    async def test_read_file(self, mock_create, workspace):
-        # Create a file to read
-        import os
-        test_file = os.path.join(workspace, "test.txt")
-        with open(test_file, "w") as f:
-            f.write("hello world\n")
+_WEB_SEARCH_RESULT = json.dumps({
+    "jsonrpc": "2.0", "id": 1,
+    "result": {"content": [{"type": "text", "text": "Latest news results"}]},
+})
 
-        fake = _make_fake_astream(
-            [_tool_call_chunk("read", {"file_path": "test.txt"})],
-            [_text_chunk("Got it")],
-        )
-        _setup_mock_llm(mock_create, fake)
 
-        tools = create_all_tools(workspace)
-        read_tool = next(t for t in tools if t.name == "read")
-        agent = ChatAgent(_make_config(), tools=[read_tool])
-        events = await _collect_events(agent)
+def _html_response(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, html="<html><body>Example Page Content</body></html>")
 
-        tr = _events_by_type(events, "tool_result")[0]
-        assert tr.data["result"]["kind"] == "read"
-        assert "hello world" in _result_text(tr)
+
+def _search_sse_response(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(
+        200,
+        headers={"content-type": "text/event-stream"},
+        content=f"event: message\ndata: {_WEB_SEARCH_RESULT}\n\n".encode(),
+    )
+
+
+class TestToolRoundTrip:
+    """One scripted tool call per tool, checked through its tool_result event."""
+
+    @pytest.mark.parametrize(
+        "tool_name, turns, files, http_handler, expected",
+        [
+            pytest.param("read", _READ_FILE, {"test.txt": "hello world\n"}, None, "hello world", id="read"),
+            pytest.param(
+                "grep", _GREP_HELLO, {"data.txt": "line one\nhello world\nline three\n"},
+                None, "hello world", id="grep",
+            ),
+            pytest.param("code_interpreter", _CODE_INTERPRETER, {}, None, "42", id="code_interpreter"),
+            pytest.param("web_fetch", _WEB_FETCH, {}, _html_response, "Example Page Content", id="web_fetch"),
+            pytest.param("web_search", _WEB_SEARCH, {}, _search_sse_response, "Latest news results", id="web_search"),
+        ],
+    )
+    async def test_tool_result(
+        self, tool_name, turns, files, http_handler, expected,
+        mock_create, workspace, agent_factory, monkeypatch,
+    ):
+        for name, text in files.items():
+            (Path(workspace) / name).write_text(text)
+        if http_handler is not None:
+            _mock_http(monkeypatch, http_handler)
+        _setup_mock_llm(mock_create, _make_fake_astream(*turns))
+
+        agent = agent_factory(tool_name)
+        by_type = _bucket(await _collect_events(agent))
+
+        [tr] = by_type["tool_result"]
+        assert tr.data["result"]["kind"] == tool_name
+        assert expected in _result_text(tr)
         assert tr.data["is_error"] is False
 
 
 class TestWriteToolIntegration:
-    @patch("src.agent.create_chat_model")
-    async def test_write_file(self, mock_create, workspace):
-        fake = _make_fake_astream(
-            [_tool_call_chunk("write", {"file_path": "out.txt", "content": "hi there"})],
-            [_text_chunk("Written")],
-        )
+    async def test_write_file(self, mock_create, workspace, agent_factory):
+        fake = _make_fake_astream(*_WRITE_FILE)
         _setup_mock_llm(mock_create, fake)
 
-        tools = create_all_tools(workspace)
-        write_tool = next(t for t in tools if t.name == "write")
-        agent = ChatAgent(_make_config(), tools=[write_tool])
-        events = await _collect_events(agent)
+        agent = agent_factory("write")
+        by_type = _bucket(await _collect_events(agent))
 
-        tr = _events_by_type(events, "tool_result")[0]
+        tr = by_type["tool_result"][0]
         assert tr.data["result"]["kind"] == "write"
         assert "Successfully wrote" in _result_text(tr)
         assert tr.data["is_error"] is False
@@ -178,29 +273,19 @@ class TestWriteToolIntegration:
 
 
 class TestEditToolIntegration:
-    @patch("src.agent.create_chat_model")
-    async def test_edit_file(self, mock_create, workspace):
+    async def test_edit_file(self, mock_create, workspace, agent_factory):
         import os
         test_file = os.path.join(workspace, "edit_me.txt")
         with open(test_file, "w") as f:
             f.write("old text here\n")
 
-        fake = _make_fake_astream(
-            [_tool_call_chunk("edit", {
-                "file_path": "edit_me.txt",
-                "old_string": "old text",
-                "new_string": "new text",
-            })],
-            [_text_chunk("Edited")],
-        )
+        fake = _make_fake_astream(*_EDIT_FILE)
         _setup_mock_llm(mock_create, fake)
 
-        tools = create_all_tools(workspace)
-        edit_tool = next(t for t in tools if t.name == "edit")
-        agent = ChatAgent(_make_config(), tools=[edit_tool])
-        events = await _collect_events(agent)
+        agent = agent_factory("edit")
+        by_type = _bucket(await _collect_events(agent))
 
-        tr = _events_by_type(events, "tool_result")[0]
+        tr = by_type["tool_result"][0]
         assert tr.data["result"]["kind"] == "edit"
         assert "Successfully replaced" in _result_text(tr)
 
@@ -209,182 +294,49 @@ class TestEditToolIntegration:
 
 
 class TestGlobToolIntegration:
-    @patch("src.agent.create_chat_model")
-    async def test_glob_pattern(self, mock_create, workspace):
+    async def test_glob_pattern(self, mock_create, workspace, agent_factory):
         import os
         for name in ["a.txt", "b.txt", "c.py"]:
             with open(os.path.join(workspace, name), "w") as f:
                 f.write("x")
 
-        fake = _make_fake_astream(
-            [_tool_call_chunk("glob", {"pattern": "*.txt"})],
-            [_text_chunk("Found them")],
-        )
+        fake = _make_fake_astream(*_GLOB_TXT)
         _setup_mock_llm(mock_create, fake)
 
-        tools = create_all_tools(workspace)
-        glob_tool = next(t for t in tools if t.name == "glob")
-        agent = ChatAgent(_make_config(), tools=[glob_tool])
-        events = await _collect_events(agent)
+        agent = agent_factory("glob")
+        by_type = _bucket(await _collect_events(agent))
 
-        tr = _events_by_type(events, "tool_result")[0]
+        tr = by_type["tool_result"][0]
         assert tr.data["result"]["kind"] == "glob"
         assert "a.txt" in _result_text(tr)
         assert "b.txt" in _result_text(tr)
         assert "c.py" not in _result_text(tr)
 
-    @patch("src.agent.create_chat_model")
-    async def test_glob_null_path_defaults_to_workspace(self, mock_create, workspace):
+    async def test_glob_null_path_defaults_to_workspace(self, mock_create, workspace, agent_factory):
         import os
         for name in ["a.txt", "b.txt"]:
             with open(os.path.join(workspace, name), "w") as f:
                 f.write("x")
 
-        fake = _make_fake_astream(
-            [_tool_call_chunk("glob", {"pattern": "*.txt", "path": None})],
-            [_text_chunk("Found them")],
-        )
+        fake = _make_fake_astream(*_GLOB_TXT_NULL_PATH)
         _setup_mock_llm(mock_create, fake)
 
-        tools = create_all_tools(workspace)
-        glob_tool = next(t for t in tools if t.name == "glob")
-        agent = ChatAgent(_make_config(), tools=[glob_tool])
-        events = await _collect_events(agent)
+        agent = agent_factory("glob")
+        by_type = _bucket(await _collect_events(agent))
 
-        tr = _events_by_type(events, "tool_result")[0]
+        tr = by_type["tool_result"][0]
         assert tr.data["result"]["kind"] == "glob"
         assert "a.txt" in _result_text(tr)
         assert "b.txt" in _result_text(tr)
         assert tr.data["result"]["data"]["path"] == "."
 
 
-class TestGrepToolIntegration:
-    @patch("src.agent.create_chat_model")
-    async def test_grep_pattern(self, mock_create, workspace):
-        import os
-        with open(os.path.join(workspace, "data.txt"), "w") as f:
-            f.write("line one\nhello world\nline three\n")
-
-        fake = _make_fake_astream(
-            [_tool_call_chunk("grep", {"pattern": "hello"})],
-            [_text_chunk("Found")],
-        )
-        _setup_mock_llm(mock_create, fake)
-
-        tools = create_all_tools(workspace)
-        grep_tool = next(t for t in tools if t.name == "grep")
-        agent = ChatAgent(_make_config(), tools=[grep_tool])
-        events = await _collect_events(agent)
-
-        tr = _events_by_type(events, "tool_result")[0]
-        assert tr.data["result"]["kind"] == "grep"
-        assert "hello world" in _result_text(tr)
-
-
-class TestWebFetchToolIntegration:
-    @patch("src.agent.create_chat_model")
-    @patch("src.tools.web.httpx.AsyncClient")
-    async def test_web_fetch(self, mock_client_cls, mock_create, workspace):
-        # Mock httpx response
-        mock_response = MagicMock()
-        mock_response.text = "<html><body>Example Page Content</body></html>"
-        mock_response.headers = {"content-type": "text/html"}
-        mock_response.raise_for_status = MagicMock()
-
-        mock_client = AsyncMock()
-        mock_client.get = AsyncMock(return_value=mock_response)
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=False)
-        mock_client_cls.return_value = mock_client
-
-        fake = _make_fake_astream(
-            [_tool_call_chunk("web_fetch", {"url": "https://example.com"})],
-            [_text_chunk("Fetched")],
-        )
-        _setup_mock_llm(mock_create, fake)
-
-        tools = create_all_tools(workspace)
-        web_tool = next(t for t in tools if t.name == "web_fetch")
-        agent = ChatAgent(_make_config(), tools=[web_tool])
-        events = await _collect_events(agent)
-
-        tr = _events_by_type(events, "tool_result")[0]
-        assert tr.data["result"]["kind"] == "web_fetch"
-        assert "Example Page Content" in _result_text(tr)
-        assert tr.data["is_error"] is False
-
-
-class TestCodeInterpreterToolIntegration:
-    @patch("src.agent.create_chat_model")
-    async def test_code_interpreter_python(self, mock_create, workspace):
-        fake = _make_fake_astream(
-            [_tool_call_chunk("code_interpreter", {"code": "print(42)", "language": "python"})],
-            [_text_chunk("Result")],
-        )
-        _setup_mock_llm(mock_create, fake)
-
-        tools = create_all_tools(workspace)
-        ci_tool = next(t for t in tools if t.name == "code_interpreter")
-        agent = ChatAgent(_make_config(), tools=[ci_tool])
-        events = await _collect_events(agent)
-
-        tr = _events_by_type(events, "tool_result")[0]
-        assert tr.data["result"]["kind"] == "code_interpreter"
-        assert "42" in _result_text(tr)
-        assert tr.data["is_error"] is False
-
-
-class TestWebSearchToolIntegration:
-    @patch("src.agent.create_chat_model")
-    @patch("src.tools.web.httpx_sse.aconnect_sse")
-    @patch("src.tools.web.httpx.AsyncClient")
-    async def test_web_search(self, mock_client_cls, mock_aconnect, mock_create, workspace):
-        # Mock SSE event
-        mock_event = MagicMock()
-        mock_event.data = json.dumps({
-            "jsonrpc": "2.0", "id": 1,
-            "result": {"content": [{"type": "text", "text": "Latest news results"}]},
-        })
-
-        mock_event_source = MagicMock()
-        async def _aiter():
-            yield mock_event
-        mock_event_source.aiter_sse = _aiter
-
-        mock_ctx = AsyncMock()
-        mock_ctx.__aenter__ = AsyncMock(return_value=mock_event_source)
-        mock_ctx.__aexit__ = AsyncMock(return_value=False)
-        mock_aconnect.return_value = mock_ctx
-
-        mock_client = AsyncMock()
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=False)
-        mock_client_cls.return_value = mock_client
-
-        fake = _make_fake_astream(
-            [_tool_call_chunk("web_search", {"query": "latest news"})],
-            [_text_chunk("Here are the results")],
-        )
-        _setup_mock_llm(mock_create, fake)
-
-        tools = create_all_tools(workspace)
-        ws_tool = next(t for t in tools if t.name == "web_search")
-        agent = ChatAgent(_make_config(), tools=[ws_tool])
-        events = await _collect_events(agent)
-
-        tr = _events_by_type(events, "tool_result")[0]
-        assert tr.data["result"]["kind"] == "web_search"
-        assert "Latest news results" in _result_text(tr)
-        assert tr.data["is_error"] is False
-
-
 # ---------------------------------------------------------------------------
 # Ghost tool call (index gap) test
 # ---------------------------------------------------------------------------
 
 class TestGhostToolCallFiltering:
-    @patch("src.agent.create_chat_model")
-    async def test_index_gap_ghost_tool_call_filtered(self, mock_create, workspace):
+    async def test_index_gap_ghost_tool_call_filtered(self, mock_create, agent_factory):
         """When LLM sends tool_call_chunks starting at index=1, the ghost
         entry at index=0 should be filtered out and not executed."""
 
@@ -392,7 +344,7 @@ class TestGhostToolCallFiltering:
         ghost_chunk = AIMessageChunk(
             content="",
             tool_call_chunks=[
-                ToolCallChunk(name="bash", args=json.dumps({"command": "echo hi"}),
+                ToolCallChunk(name="bash", args=orjson.dumps({"command": "echo hi"}).decode(),
                               id="tc-real", index=1),
             ],
         )
@@ -403,18 +355,16 @@ class TestGhostToolCallFiltering:
         )
         _setup_mock_llm(mock_create, fake)
 
-        tools = create_all_tools(workspace)
-        bash = next(t for t in tools if t.name == "bash")
-        agent = ChatAgent(_make_config(), tools=[bash])
-        events = await _collect_events(agent)
+        agent = agent_factory("bash")
+        by_type = _bucket(await _collect_events(agent))
 
         # Only the real tool call should appear — no ghost
-        tc_events = _events_by_type(events, "tool_call")
+        tc_events = by_type["tool_call"]
         assert len(tc_events) == 1
         assert tc_events[0].data["tool_name"] == "bash"
 
         # No "Unknown tool: " error from the ghost entry
-        tr_events = _events_by_type(events, "tool_result")
+        tr_events = by_type["tool_result"]
         assert len(tr_events) == 1
         assert tr_events[0].data["is_error"] is False
 
@@ -424,23 +374,15 @@ class TestGhostToolCallFiltering:
 # ---------------------------------------------------------------------------
 
 class TestToolErrorPreservesContent:
-    @patch("src.agent.create_chat_model")
-    async def test_tool_error_preserves_prior_content(self, mock_create, workspace):
+    async def test_tool_error_preserves_prior_content(self, mock_create, agent_factory):
         """When a tool errors, total_content still includes text from all iterations."""
-        fake = _make_fake_astream(
-            # Iteration 1: text + tool call
-            [_text_chunk("Sure, "), _tool_call_chunk("bash", {"command": "exit 1"})],
-            # Iteration 2: LLM responds after tool error
-            [_text_chunk("The command failed.")],
-        )
+        fake = _make_fake_astream(*_BASH_FAILS)
         _setup_mock_llm(mock_create, fake)
 
-        tools = create_all_tools(workspace)
-        bash = next(t for t in tools if t.name == "bash")
-        agent = ChatAgent(_make_config(), tools=[bash])
-        events = await _collect_events(agent)
+        agent = agent_factory("bash")
+        by_type = _bucket(await _collect_events(agent))
 
-        complete = _events_by_type(events, "complete")
+        complete = by_type["complete"]
         assert len(complete) == 1
         content = complete[0].data["content"]
         # Must contain text from BOTH iterations
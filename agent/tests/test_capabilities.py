@@ -49,3 +49,38 @@ def test_annotate_mcp_tools_override_takes_precedence_over_metadata() -> None:
         [tool], mcp_servers=[{"name": "repo", "read_only_overrides": {"update": False}}],
     )
     assert tool_is_read_only(tool) is False
+
+
+def test_annotate_mcp_tools_infers_dotted_server_from_tool_name() -> None:
+    tool = _FakeTool("org.repo__search")
+    annotate_mcp_tools(
+        [tool],
+        mcp_servers=[
+            {"name": "org.repo", "read_only_overrides": {"search": True}},
+            {"name": "tickets", "read_only_overrides": {"search": False}},
+        ],
+    )
+    assert tool.metadata.get("mcp_server") == "org.repo"
+    assert tool_is_read_only(tool) is True
+
+
+def test_annotate_mcp_tools_prefers_longest_matching_server() -> None:
+    tool = _FakeTool("org.repo__search")
+    annotate_mcp_tools(
+        [tool],
+        mcp_servers=[
+            {"name": "org", "read_only_overrides": {"repo__search": False}},
+            {"name": "org.repo", "read_only_overrides": {"search": True}},
+        ],
+    )
+    assert tool.metadata.get("mcp_server") == "org.repo"
+    assert tool_is_read_only(tool) is True
+
+
+def test_annotate_mcp_tools_matches_server_starting_with_separator() -> None:
+    tool = _FakeTool("__x__tool")
+    annotate_mcp_tools(
+        [tool], mcp_servers=[{"name": "__x", "read_only_overrides": {"tool": True}}],
+    )
+    assert tool.metadata.get("mcp_server") == "__x"
+    assert tool_is_read_only(tool) is True
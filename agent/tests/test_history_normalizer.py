@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from src.history_normalizer import normalize_history_content
 
+from .result_helpers import _contains_value
+
 
 def test_openai_normalizer_strips_response_ids_and_empty_text() -> None:
     content = [
@@ -12,10 +14,8 @@ def test_openai_normalizer_strips_response_ids_and_empty_text() -> None:
     normalized = normalize_history_content("openai", content)
     assert isinstance(normalized, list)
     assert len(normalized) == 2
-    dumped = str(normalized)
-    assert "rs_parent" not in dumped
-    assert "rs_child" not in dumped
-    assert "rs_block" not in dumped
+    for response_id in ("rs_parent", "rs_child", "rs_block"):
+        assert not _contains_value(normalized, response_id)
 
 
 def test_non_openai_keeps_ids_but_cleans_empty_blocks() -> None:
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import base64
 import os
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
@@ -50,7 +50,34 @@ def _google_response(*image_datas: bytes) -> MagicMock:
     return resp
 
 
+# Built once: the tool only reads these, and no test inspects the responses.
+_OPENAI_PNG_RESPONSE = _openai_response(FAKE_B64)
+_OPENAI_JPEG_RESPONSE = _openai_response(FAKE_B64, fmt="jpeg")
+_GOOGLE_PNG_RESPONSE = _google_response(FAKE_IMAGE_DATA)
+
+
+@pytest.fixture
+def openai_client(monkeypatch) -> tuple[AsyncMock, MagicMock]:
+    """Patch AsyncOpenAI; returns (client, class). Tests script chat.completions.create."""
+    cls = MagicMock()
+    cls.return_value = client = AsyncMock()
+    monkeypatch.setattr("src.tools.image_gen.openai.AsyncOpenAI", cls)
+    return client, cls
+
+
+@pytest.fixture
+def google_client(monkeypatch) -> tuple[MagicMock, MagicMock, MagicMock]:
+    """Patch genai and types; returns (client, genai, types). Tests script generate_content."""
+    genai, types = MagicMock(), MagicMock()
+    genai.Client.return_value = client = MagicMock()
+    monkeypatch.setattr("src.tools.image_gen.genai", genai)
+    monkeypatch.setattr("src.tools.image_gen.types", types)
+    return client, genai, types
+
+
 class TestImageGenerationTool:
+    """Provider-independent behaviour and provider dispatch."""
+
     def test_sync_raises(self):
         tool = ImageGenerationTool(
             workspace="/workspace", provider="openai", api_key="test-key", model="gpt-4o",
@@ -67,97 +94,146 @@ class TestImageGenerationTool:
         assert _rsuccess(result) is False
         assert "No model specified" in _rtext(result)
 
-    # --- OpenAI tests ---
+    @pytest.mark.asyncio
+    async def test_unsupported_provider_mistral(self, workspace):
+        tool = ImageGenerationTool(
+            workspace=workspace, provider="mistral", api_key="test-key", model="m",
+        )
+        result = await tool._arun(prompt="test")
+        assert _rsuccess(result) is False
+        assert "does not support image generation" in _rtext(result)
+
+    @pytest.mark.asyncio
+    async def test_unsupported_provider_anthropic(self, workspace):
+        tool = ImageGenerationTool(
+            workspace=workspace, provider="anthropic", api_key="test-key", model="m",
+        )
+        result = await tool._arun(prompt="test")
+        assert _rsuccess(result) is False
+        assert "does not support image generation" in _rtext(result)
+
+    def test_tool_metadata(self):
+        tool = ImageGenerationTool(
+            workspace="/workspace", provider="openai", api_key="test", model="gpt-4o",
+        )
+        assert tool.name == "image_generation"
+        assert "image" in tool.description.lower()
 
     @pytest.mark.asyncio
-    async def test_openai_generates_image(self, workspace):
+    async def test_uses_conversation_model_openai(self, workspace, openai_client):
+        tool = ImageGenerationTool(
+            workspace=workspace, provider="openai", api_key="sk-test",
+            model="my-custom-model",
+        )
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
+
+        await tool._arun(prompt="test")
+
+        call_kwargs = mock_client.chat.completions.create.call_args[1]
+        assert call_kwargs["model"] == "my-custom-model"
+
+    @pytest.mark.asyncio
+    async def test_uses_conversation_model_google(self, workspace, google_client):
+        tool = ImageGenerationTool(
+            workspace=workspace, provider="google", api_key="google-key",
+            model="my-gemini-model",
+        )
+        mock_client, _, _ = google_client
+        mock_client.aio.models.generate_content = AsyncMock(
+            return_value=_GOOGLE_PNG_RESPONSE
+        )
+
+        await tool._arun(prompt="test")
+
+        call_kwargs = mock_client.aio.models.generate_content.call_args[1]
+        assert call_kwargs["model"] == "my-gemini-model"
+
+
+class TestOpenAIProvider:
+    """OpenAI chat-completions image generation."""
+
+    @pytest.mark.asyncio
+    async def test_openai_generates_image(self, workspace, openai_client):
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
 
-            result = await tool._arun(prompt="a cute cat")
+        result = await tool._arun(prompt="a cute cat")
 
         assert _rsuccess(result) is True
-        assert "sandbox://" in _rtext(result)
+        text = _rtext(result)
+        assert "sandbox://" in text
         llm_content = _rllm(result)
         assert isinstance(llm_content, str)
-        assert llm_content == _rtext(result)
+        assert llm_content == text
         gen_dir = os.path.join(workspace, "generated_images")
         assert os.path.isdir(gen_dir)
         assert len(os.listdir(gen_dir)) == 1
 
     @pytest.mark.asyncio
-    async def test_openai_passes_model_and_messages(self, workspace):
+    async def test_openai_passes_model_and_messages(self, workspace, openai_client):
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
 
-            await tool._arun(prompt="test", size="1536x1024", quality="high")
+        await tool._arun(prompt="test", size="1536x1024", quality="high")
 
-            call_kwargs = mock_client.chat.completions.create.call_args[1]
-            assert call_kwargs["model"] == "gpt-4o"
-            expected_prompt = "test Output the image at 1536x1024 resolution. Use high quality."
-            assert call_kwargs["messages"] == [{"role": "user", "content": expected_prompt}]
+        call_kwargs = mock_client.chat.completions.create.call_args[1]
+        assert call_kwargs["model"] == "gpt-4o"
+        expected_prompt = "test Output the image at 1536x1024 resolution. Use high quality."
+        assert call_kwargs["messages"] == [{"role": "user", "content": expected_prompt}]
 
     @pytest.mark.asyncio
-    async def test_openai_with_endpoint_url(self, workspace):
+    async def test_openai_with_endpoint_url(self, workspace, openai_client):
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test",
             model="gpt-4o", endpoint_url="https://custom.api.com/v1",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        mock_client, mock_cls = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
 
-            await tool._arun(prompt="test")
+        await tool._arun(prompt="test")
 
-            mock_cls.assert_called_once_with(api_key="sk-test", base_url="https://custom.api.com/v1")
+        mock_cls.assert_called_once_with(api_key="sk-test", base_url="https://custom.api.com/v1")
 
     @pytest.mark.asyncio
-    async def test_openai_multiple_images(self, workspace):
+    async def test_openai_multiple_images(self, workspace, openai_client):
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
 
-            result = await tool._arun(prompt="two cats", n=2)
+        result = await tool._arun(prompt="two cats", n=2)
 
         assert _rsuccess(result) is True
-        assert _rtext(result).count("sandbox://") == 2
+        text = _rtext(result)
+        assert text.count("sandbox://") == 2
         llm_content = _rllm(result)
         assert isinstance(llm_content, str)
-        assert llm_content == _rtext(result)
+        assert llm_content == text
         assert len(os.listdir(os.path.join(workspace, "generated_images"))) == 2
         assert mock_client.chat.completions.create.call_count == 2
 
     @pytest.mark.asyncio
-    async def test_openai_api_error(self, workspace):
+    async def test_openai_api_error(self, workspace, openai_client):
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(side_effect=Exception("API rate limit"))
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(side_effect=Exception("API rate limit"))
 
-            result = await tool._arun(prompt="test")
-            assert _rsuccess(result) is False
-            assert "API rate limit" in _rtext(result) or "API rate limit" in _rerror(result)
+        result = await tool._arun(prompt="test")
+        assert _rsuccess(result) is False
+        assert "API rate limit" in _rtext(result) or "API rate limit" in _rerror(result)
 
     @pytest.mark.asyncio
-    async def test_openai_no_image_in_response(self, workspace):
+    async def test_openai_no_image_in_response(self, workspace, openai_client):
         """When model returns text without data URIs, return a helpful message."""
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
@@ -165,154 +241,142 @@ class TestImageGenerationTool:
         resp = MagicMock()
         resp.choices = [MagicMock()]
         resp.choices[0].message.content = "I cannot generate images."
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=resp)
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=resp)
 
-            result = await tool._arun(prompt="test")
+        result = await tool._arun(prompt="test")
 
         assert _rsuccess(result) is False
-        assert "No images were generated" in _rtext(result)
-        assert "I cannot generate images." in _rtext(result)
+        text = _rtext(result)
+        assert "No images were generated" in text
+        assert "I cannot generate images." in text
         assert _rdata(result).get("model_output") == "I cannot generate images."
         assert _rdata(result).get("raw_output") == "I cannot generate images."
         assert _rllm(result) == "I cannot generate images."
 
     @pytest.mark.asyncio
-    async def test_openai_string_response_with_data_uri(self, workspace):
+    async def test_openai_string_response_with_data_uri(self, workspace, openai_client):
         """OpenAI-compatible proxies may return plain string responses."""
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
         response_text = f"Here is your image: data:image/png;base64,{FAKE_B64}"
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=response_text)
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=response_text)
 
-            result = await tool._arun(prompt="test")
+        result = await tool._arun(prompt="test")
 
         assert _rsuccess(result) is True
-        assert "sandbox://" in _rtext(result)
+        text = _rtext(result)
+        assert "sandbox://" in text
         llm_content = _rllm(result)
         assert isinstance(llm_content, str)
-        assert llm_content == _rtext(result)
+        assert llm_content == text
 
     @pytest.mark.asyncio
-    async def test_openai_string_response_without_data_uri(self, workspace):
+    async def test_openai_string_response_without_data_uri(self, workspace, openai_client):
         """Plain string responses without image payload should fail gracefully."""
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
         response_text = "I can only describe the scene in words."
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=response_text)
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=response_text)
 
-            result = await tool._arun(prompt="test")
+        result = await tool._arun(prompt="test")
 
         assert _rsuccess(result) is False
-        assert "No images were generated" in _rtext(result)
-        assert "I can only describe the scene in words." in _rtext(result)
-        assert "str' object has no attribute 'choices" not in _rtext(result)
+        text = _rtext(result)
+        assert "No images were generated" in text
+        assert "I can only describe the scene in words." in text
+        assert "str' object has no attribute 'choices" not in text
         assert _rdata(result).get("model_output") == "I can only describe the scene in words."
         assert _rdata(result).get("raw_output") == "I can only describe the scene in words."
         assert _rllm(result) == "I can only describe the scene in words."
 
     @pytest.mark.asyncio
-    async def test_openai_jpeg_format(self, workspace):
+    async def test_openai_jpeg_format(self, workspace, openai_client):
         """Verify JPEG data URIs are parsed and saved as .jpg."""
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(
-                return_value=_openai_response(FAKE_B64, fmt="jpeg")
-            )
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(
+            return_value=_OPENAI_JPEG_RESPONSE
+        )
 
-            result = await tool._arun(prompt="test")
+        result = await tool._arun(prompt="test")
 
         assert _rsuccess(result) is True
-        assert "sandbox://" in _rtext(result)
-        assert ".jpg" in _rtext(result)
+        text = _rtext(result)
+        assert "sandbox://" in text
+        assert ".jpg" in text
         llm_content = _rllm(result)
         assert isinstance(llm_content, str)
-        assert llm_content == _rtext(result)
+        assert llm_content == text
 
     @pytest.mark.asyncio
-    async def test_openai_prompt_includes_size_hint(self, workspace):
+    async def test_openai_prompt_includes_size_hint(self, workspace, openai_client):
         """Non-default size should append resolution hint to prompt."""
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
 
-            await tool._arun(prompt="a cat", size="1024x1536")
+        await tool._arun(prompt="a cat", size="1024x1536")
 
-            call_kwargs = mock_client.chat.completions.create.call_args[1]
-            sent_prompt = call_kwargs["messages"][0]["content"]
-            assert "1024x1536 resolution" in sent_prompt
+        call_kwargs = mock_client.chat.completions.create.call_args[1]
+        sent_prompt = call_kwargs["messages"][0]["content"]
+        assert "1024x1536 resolution" in sent_prompt
 
     @pytest.mark.asyncio
-    async def test_openai_prompt_includes_quality_hint(self, workspace):
+    async def test_openai_prompt_includes_quality_hint(self, workspace, openai_client):
         """Non-auto quality should append quality hint to prompt."""
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
 
-            await tool._arun(prompt="a cat", quality="high")
+        await tool._arun(prompt="a cat", quality="high")
 
-            call_kwargs = mock_client.chat.completions.create.call_args[1]
-            sent_prompt = call_kwargs["messages"][0]["content"]
-            assert "high quality" in sent_prompt
+        call_kwargs = mock_client.chat.completions.create.call_args[1]
+        sent_prompt = call_kwargs["messages"][0]["content"]
+        assert "high quality" in sent_prompt
 
     @pytest.mark.asyncio
-    async def test_openai_default_size_no_hint(self, workspace):
+    async def test_openai_default_size_no_hint(self, workspace, openai_client):
         """Default 1024x1024 size and auto quality should not append hints."""
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
 
-            await tool._arun(prompt="a cat", size="1024x1024", quality="auto")
+        await tool._arun(prompt="a cat", size="1024x1024", quality="auto")
 
-            call_kwargs = mock_client.chat.completions.create.call_args[1]
-            sent_prompt = call_kwargs["messages"][0]["content"]
-            assert sent_prompt == "a cat"
+        call_kwargs = mock_client.chat.completions.create.call_args[1]
+        sent_prompt = call_kwargs["messages"][0]["content"]
+        assert sent_prompt == "a cat"
 
     @pytest.mark.asyncio
-    async def test_openai_empty_quality_no_hint(self, workspace):
+    async def test_openai_empty_quality_no_hint(self, workspace, openai_client):
         """Empty string quality should not append hint."""
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
 
-            await tool._arun(prompt="a cat", quality="")
+        await tool._arun(prompt="a cat", quality="")
 
-            call_kwargs = mock_client.chat.completions.create.call_args[1]
-            sent_prompt = call_kwargs["messages"][0]["content"]
-            assert sent_prompt == "a cat"
+        call_kwargs = mock_client.chat.completions.create.call_args[1]
+        sent_prompt = call_kwargs["messages"][0]["content"]
+        assert sent_prompt == "a cat"
 
     @pytest.mark.asyncio
-    async def test_openai_ref_image_with_size_quality_hints(self, workspace):
+    async def test_openai_ref_image_with_size_quality_hints(self, workspace, openai_client):
         """Reference image + non-default size/quality should include hints in text part."""
         img_path = os.path.join(workspace, "ref.png")
         with open(img_path, "wb") as f:
@@ -321,116 +385,106 @@ class TestImageGenerationTool:
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
 
-            await tool._arun(
-                prompt="make it blue", reference_image="ref.png",
-                size="1024x1536", quality="high",
-            )
+        await tool._arun(
+            prompt="make it blue", reference_image="ref.png",
+            size="1024x1536", quality="high",
+        )
 
-            call_kwargs = mock_client.chat.completions.create.call_args[1]
-            content = call_kwargs["messages"][0]["content"]
-            assert isinstance(content, list)
-            text_part = content[1]["text"]
-            assert "1024x1536 resolution" in text_part
-            assert "high quality" in text_part
+        call_kwargs = mock_client.chat.completions.create.call_args[1]
+        content = call_kwargs["messages"][0]["content"]
+        assert isinstance(content, list)
+        text_part = content[1]["text"]
+        assert "1024x1536 resolution" in text_part
+        assert "high quality" in text_part
 
-    # --- Google tests ---
+
+class TestGoogleProvider:
+    """Google genai image generation and its size/aspect mapping."""
 
     @pytest.mark.asyncio
-    async def test_google_generates_image(self, workspace):
+    async def test_google_generates_image(self, workspace, google_client):
         tool = ImageGenerationTool(
             workspace=workspace, provider="google", api_key="google-key", model="gemini-2.0-flash",
         )
-        with patch("src.tools.image_gen.genai") as mock_genai, \
-             patch("src.tools.image_gen.types") as mock_types:
-            mock_client = MagicMock()
-            mock_client.aio.models.generate_content = AsyncMock(
-                return_value=_google_response(FAKE_IMAGE_DATA)
-            )
-            mock_genai.Client.return_value = mock_client
+        mock_client, _, _ = google_client
+        mock_client.aio.models.generate_content = AsyncMock(
+            return_value=_GOOGLE_PNG_RESPONSE
+        )
 
-            result = await tool._arun(prompt="a dog")
+        result = await tool._arun(prompt="a dog")
 
         assert _rsuccess(result) is True
-        assert "sandbox://" in _rtext(result)
-        assert ".png" in _rtext(result)
+        text = _rtext(result)
+        assert "sandbox://" in text
+        assert ".png" in text
         llm_content = _rllm(result)
         assert isinstance(llm_content, str)
-        assert llm_content == _rtext(result)
+        assert llm_content == text
 
     @pytest.mark.asyncio
-    async def test_google_passes_model_and_config(self, workspace):
+    async def test_google_passes_model_and_config(self, workspace, google_client):
         tool = ImageGenerationTool(
             workspace=workspace, provider="google", api_key="google-key",
             model="gemini-2.0-flash",
         )
-        with patch("src.tools.image_gen.genai") as mock_genai, \
-             patch("src.tools.image_gen.types") as mock_types:
-            mock_client = MagicMock()
-            mock_client.aio.models.generate_content = AsyncMock(
-                return_value=_google_response(FAKE_IMAGE_DATA)
-            )
-            mock_genai.Client.return_value = mock_client
+        mock_client, _, mock_types = google_client
+        mock_client.aio.models.generate_content = AsyncMock(
+            return_value=_GOOGLE_PNG_RESPONSE
+        )
 
-            await tool._arun(prompt="test", size="1024x1536")
+        await tool._arun(prompt="test", size="1024x1536")
 
-            call_kwargs = mock_client.aio.models.generate_content.call_args[1]
-            assert call_kwargs["model"] == "gemini-2.0-flash"
-            assert call_kwargs["contents"] == "test"
-            # Verify config was built with correct types calls
-            mock_types.GenerateContentConfig.assert_called_once()
-            mock_types.ImageConfig.assert_called_once_with(aspect_ratio="2:3", image_size="2K")
+        call_kwargs = mock_client.aio.models.generate_content.call_args[1]
+        assert call_kwargs["model"] == "gemini-2.0-flash"
+        assert call_kwargs["contents"] == "test"
+        # Verify config was built with correct types calls
+        mock_types.GenerateContentConfig.assert_called_once()
+        mock_types.ImageConfig.assert_called_once_with(aspect_ratio="2:3", image_size="2K")
 
     @pytest.mark.asyncio
-    async def test_google_with_endpoint_url(self, workspace):
+    async def test_google_with_endpoint_url(self, workspace, google_client):
         tool = ImageGenerationTool(
             workspace=workspace, provider="google", api_key="google-key",
             model="gemini-2.0-flash", endpoint_url="https://custom.google.proxy/v1",
         )
-        with patch("src.tools.image_gen.genai") as mock_genai, \
-             patch("src.tools.image_gen.types") as mock_types:
-            mock_client = MagicMock()
-            mock_client.aio.models.generate_content = AsyncMock(
-                return_value=_google_response(FAKE_IMAGE_DATA)
-            )
-            mock_genai.Client.return_value = mock_client
+        mock_client, mock_genai, _ = google_client
+        mock_client.aio.models.generate_content = AsyncMock(
+            return_value=_GOOGLE_PNG_RESPONSE
+        )
 
-            await tool._arun(prompt="test")
+        await tool._arun(prompt="test")
 
-            mock_genai.Client.assert_called_once_with(
-                api_key="google-key",
-                http_options={"base_url": "https://custom.google.proxy/v1"},
-            )
+        mock_genai.Client.assert_called_once_with(
+            api_key="google-key",
+            http_options={"base_url": "https://custom.google.proxy/v1"},
+        )
 
     @pytest.mark.asyncio
-    async def test_google_multiple_images(self, workspace):
+    async def test_google_multiple_images(self, workspace, google_client):
         tool = ImageGenerationTool(
             workspace=workspace, provider="google", api_key="google-key",
             model="gemini-2.0-flash",
         )
-        with patch("src.tools.image_gen.genai") as mock_genai, \
-             patch("src.tools.image_gen.types") as mock_types:
-            mock_client = MagicMock()
-            mock_client.aio.models.generate_content = AsyncMock(
-                return_value=_google_response(FAKE_IMAGE_DATA)
-            )
-            mock_genai.Client.return_value = mock_client
+        mock_client, _, _ = google_client
+        mock_client.aio.models.generate_content = AsyncMock(
+            return_value=_GOOGLE_PNG_RESPONSE
+        )
 
-            result = await tool._arun(prompt="dogs", n=3)
+        result = await tool._arun(prompt="dogs", n=3)
 
         assert _rsuccess(result) is True
-        assert _rtext(result).count("sandbox://") == 3
+        text = _rtext(result)
+        assert text.count("sandbox://") == 3
         llm_content = _rllm(result)
         assert isinstance(llm_content, str)
-        assert llm_content == _rtext(result)
+        assert llm_content == text
         assert mock_client.aio.models.generate_content.call_count == 3
 
     @pytest.mark.asyncio
-    async def test_google_model_text_included_in_result(self, workspace):
+    async def test_google_model_text_included_in_result(self, workspace, google_client):
         """When Google returns text alongside images, text and llm_content include it."""
         tool = ImageGenerationTool(
             workspace=workspace, provider="google", api_key="google-key",
@@ -446,24 +500,21 @@ class TestImageGenerationTool:
         resp.candidates = [MagicMock()]
         resp.candidates[0].content.parts = [img_part, text_part]
 
-        with patch("src.tools.image_gen.genai") as mock_genai, \
-             patch("src.tools.image_gen.types"):
-            mock_client = MagicMock()
-            mock_client.aio.models.generate_content = AsyncMock(return_value=resp)
-            mock_genai.Client.return_value = mock_client
+        mock_client, _, _ = google_client
+        mock_client.aio.models.generate_content = AsyncMock(return_value=resp)
 
-            result = await tool._arun(prompt="a cat")
+        result = await tool._arun(prompt="a cat")
 
         assert _rsuccess(result) is True
-        assert "Here is the generated cat image." in _rtext(result)
-        assert "sandbox://" in _rtext(result)
+        text = _rtext(result)
+        assert "Here is the generated cat image." in text
+        assert "sandbox://" in text
         llm_content = _rllm(result)
         assert isinstance(llm_content, str)
         assert "Here is the generated cat image." in llm_content
         assert "sandbox://" in llm_content
 
-    @pytest.mark.asyncio
-    async def test_google_aspect_ratio_computed(self, workspace):
+    def test_google_aspect_ratio_computed(self, workspace):
         """Verify aspect ratio is computed from size input."""
         assert _compute_google_aspect_ratio(1024, 1024) == "1:1"
         assert _compute_google_aspect_ratio(1024, 1536) == "2:3"
@@ -471,25 +522,22 @@ class TestImageGenerationTool:
         assert _compute_google_aspect_ratio(800, 800) == "1:1"
 
     @pytest.mark.asyncio
-    async def test_google_passes_image_size(self, workspace):
+    async def test_google_passes_image_size(self, workspace, google_client):
         """Verify image_size is passed to ImageConfig for all known sizes."""
         tool = ImageGenerationTool(
             workspace=workspace, provider="google", api_key="google-key",
             model="gemini-2.0-flash",
         )
-        with patch("src.tools.image_gen.genai") as mock_genai, \
-             patch("src.tools.image_gen.types") as mock_types:
-            mock_client = MagicMock()
-            mock_client.aio.models.generate_content = AsyncMock(
-                return_value=_google_response(FAKE_IMAGE_DATA)
-            )
-            mock_genai.Client.return_value = mock_client
+        mock_client, _, mock_types = google_client
+        mock_client.aio.models.generate_content = AsyncMock(
+            return_value=_GOOGLE_PNG_RESPONSE
+        )
 
-            await tool._arun(prompt="test", size="1024x1024")
+        await tool._arun(prompt="test", size="1024x1024")
 
-            mock_types.ImageConfig.assert_called_once_with(
-                aspect_ratio="1:1", image_size="1K",
-            )
+        mock_types.ImageConfig.assert_called_once_with(
+            aspect_ratio="1:1", image_size="1K",
+        )
 
     def test_google_image_size_tiers(self):
         """Verify image_size tier selection based on total pixels."""
@@ -534,120 +582,100 @@ class TestImageGenerationTool:
         assert _compute_google_image_size(2049, 2048) == "4K"
 
     @pytest.mark.asyncio
-    async def test_google_nonstandard_size_end_to_end(self, workspace):
+    async def test_google_nonstandard_size_end_to_end(self, workspace, google_client):
         """Non-standard size like 1920x1080 should compute 16:9 + 2K and pass to ImageConfig."""
         tool = ImageGenerationTool(
             workspace=workspace, provider="google", api_key="google-key",
             model="gemini-2.0-flash",
         )
-        with patch("src.tools.image_gen.genai") as mock_genai, \
-             patch("src.tools.image_gen.types") as mock_types:
-            mock_client = MagicMock()
-            mock_client.aio.models.generate_content = AsyncMock(
-                return_value=_google_response(FAKE_IMAGE_DATA)
-            )
-            mock_genai.Client.return_value = mock_client
-
-            result = await tool._arun(prompt="test", size="1920x1080")
-
-            mock_types.ImageConfig.assert_called_once_with(
-                aspect_ratio="16:9", image_size="2K",
-            )
-            assert _rsuccess(result) is True
-            assert "sandbox://" in _rtext(result)
-
-    def test_parse_size(self):
-        assert _parse_size("1024x1536") == (1024, 1536)
-        assert _parse_size("800x800") == (800, 800)
-
-    def test_input_schema_descriptions_clarify_provider_behavior(self):
-        if hasattr(ImageGenerationInput, "model_json_schema"):
-            schema = ImageGenerationInput.model_json_schema()
-        else:
-            schema = ImageGenerationInput.schema()
-
-        size_desc = schema["properties"]["size"]["description"].lower()
-        quality_desc = schema["properties"]["quality"]["description"].lower()
-
-        assert "wxh" in size_desc
-        assert "best-effort" in size_desc
-        assert "openai" in size_desc
-        assert "google" in size_desc
-        assert "1k/2k/4k" in size_desc
-        assert "openai only" in quality_desc
-        assert "ignored by google" in quality_desc
-
-    def test_parse_size_invalid(self):
-        with pytest.raises((ValueError, IndexError)):
-            _parse_size("abc")
-        with pytest.raises((ValueError, IndexError)):
-            _parse_size("1024")
-        with pytest.raises((ValueError, IndexError)):
-            _parse_size("")
+        mock_client, _, mock_types = google_client
+        mock_client.aio.models.generate_content = AsyncMock(
+            return_value=_GOOGLE_PNG_RESPONSE
+        )
 
-    # --- Provider tests ---
+        result = await tool._arun(prompt="test", size="1920x1080")
 
-    @pytest.mark.asyncio
-    async def test_unsupported_provider_mistral(self, workspace):
-        tool = ImageGenerationTool(
-            workspace=workspace, provider="mistral", api_key="test-key", model="m",
+        mock_types.ImageConfig.assert_called_once_with(
+            aspect_ratio="16:9", image_size="2K",
         )
-        result = await tool._arun(prompt="test")
-        assert _rsuccess(result) is False
-        assert "does not support image generation" in _rtext(result)
+        assert _rsuccess(result) is True
+        assert "sandbox://" in _rtext(result)
 
     @pytest.mark.asyncio
-    async def test_unsupported_provider_anthropic(self, workspace):
+    async def test_google_no_image_in_response(self, workspace, google_client):
+        """When Google returns parts with no inline_data, return fallback message."""
         tool = ImageGenerationTool(
-            workspace=workspace, provider="anthropic", api_key="test-key", model="m",
+            workspace=workspace, provider="google", api_key="google-key",
+            model="gemini-2.0-flash",
         )
+        resp = MagicMock()
+        text_part = MagicMock()
+        text_part.inline_data = None
+        text_part.text = "Image generation is blocked by policy."
+        resp.candidates = [MagicMock()]
+        resp.candidates[0].content.parts = [text_part]
+
+        mock_client, _, _ = google_client
+        mock_client.aio.models.generate_content = AsyncMock(return_value=resp)
+
         result = await tool._arun(prompt="test")
-        assert _rsuccess(result) is False
-        assert "does not support image generation" in _rtext(result)
 
-    def test_tool_metadata(self):
-        tool = ImageGenerationTool(
-            workspace="/workspace", provider="openai", api_key="test", model="gpt-4o",
-        )
-        assert tool.name == "image_generation"
-        assert "image" in tool.description.lower()
+        assert _rsuccess(result) is False
+        text = _rtext(result)
+        assert "No images were generated" in text
+        assert "Image generation is blocked by policy." in text
+        assert _rdata(result).get("model_output") == "Image generation is blocked by policy."
+        assert _rdata(result).get("raw_output") == "Image generation is blocked by policy."
+        assert _rllm(result) == "Image generation is blocked by policy."
 
     @pytest.mark.asyncio
-    async def test_uses_conversation_model_openai(self, workspace):
+    async def test_google_null_parts_returns_no_images(self, workspace, google_client):
+        """When Google returns content.parts=None (policy rejection), return fallback."""
         tool = ImageGenerationTool(
-            workspace=workspace, provider="openai", api_key="sk-test",
-            model="my-custom-model",
+            workspace=workspace, provider="google", api_key="google-key",
+            model="gemini-2.0-flash",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        resp = MagicMock()
+        resp.candidates = [MagicMock()]
+        resp.candidates[0].content.parts = None
+
+        mock_client, _, _ = google_client
+        mock_client.aio.models.generate_content = AsyncMock(return_value=resp)
 
-            await tool._arun(prompt="test")
+        result = await tool._arun(prompt="test")
 
-            call_kwargs = mock_client.chat.completions.create.call_args[1]
-            assert call_kwargs["model"] == "my-custom-model"
+        assert _rsuccess(result) is False
+        assert "No images were generated" in _rtext(result)
+        raw_output = _rdata(result).get("raw_output")
+        assert isinstance(raw_output, str)
+        assert raw_output
+        assert _rllm(result) == raw_output
 
     @pytest.mark.asyncio
-    async def test_uses_conversation_model_google(self, workspace):
+    async def test_google_empty_candidates_returns_no_images(self, workspace, google_client):
+        """When Google returns candidates=[], return fallback."""
         tool = ImageGenerationTool(
             workspace=workspace, provider="google", api_key="google-key",
-            model="my-gemini-model",
+            model="gemini-2.0-flash",
         )
-        with patch("src.tools.image_gen.genai") as mock_genai, \
-             patch("src.tools.image_gen.types") as mock_types:
-            mock_client = MagicMock()
-            mock_client.aio.models.generate_content = AsyncMock(
-                return_value=_google_response(FAKE_IMAGE_DATA)
-            )
-            mock_genai.Client.return_value = mock_client
+        resp = MagicMock()
+        resp.candidates = []
 
-            await tool._arun(prompt="test")
+        mock_client, _, _ = google_client
+        mock_client.aio.models.generate_content = AsyncMock(return_value=resp)
 
-            call_kwargs = mock_client.aio.models.generate_content.call_args[1]
-            assert call_kwargs["model"] == "my-gemini-model"
+        result = await tool._arun(prompt="test")
+
+        assert _rsuccess(result) is False
+        assert "No images were generated" in _rtext(result)
+        raw_output = _rdata(result).get("raw_output")
+        assert isinstance(raw_output, str)
+        assert raw_output
+        assert _rllm(result) == raw_output
 
-    # --- Reference image tests ---
+
+class TestReferenceImages:
+    """Reference-image resolution and per-provider request shape."""
 
     @pytest.mark.asyncio
     async def test_reference_image_not_found(self, workspace):
@@ -671,7 +699,7 @@ class TestImageGenerationTool:
         assert "Unsupported image format" in _rtext(result)
 
     @pytest.mark.asyncio
-    async def test_reference_image_resolves_relative_path(self, workspace):
+    async def test_reference_image_resolves_relative_path(self, workspace, openai_client):
         """Relative paths should resolve against the workspace directory."""
         sub = os.path.join(workspace, "imgs")
         os.makedirs(sub)
@@ -682,18 +710,16 @@ class TestImageGenerationTool:
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
 
-            result = await tool._arun(prompt="edit", reference_image="imgs/ref.png")
+        result = await tool._arun(prompt="edit", reference_image="imgs/ref.png")
 
         assert _rsuccess(result) is True
         assert "sandbox://" in _rtext(result)
 
     @pytest.mark.asyncio
-    async def test_openai_with_reference_image(self, workspace):
+    async def test_openai_with_reference_image(self, workspace, openai_client):
         """OpenAI should receive multimodal message with image data URI + text."""
         img_path = os.path.join(workspace, "ref.png")
         with open(img_path, "wb") as f:
@@ -702,26 +728,24 @@ class TestImageGenerationTool:
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
 
-            await tool._arun(prompt="make it blue", reference_image="ref.png")
+        await tool._arun(prompt="make it blue", reference_image="ref.png")
 
-            call_kwargs = mock_client.chat.completions.create.call_args[1]
-            messages = call_kwargs["messages"]
-            assert len(messages) == 1
-            content = messages[0]["content"]
-            # Should be multimodal list, not plain string
-            assert isinstance(content, list)
-            assert len(content) == 2
-            assert content[0]["type"] == "image_url"
-            assert content[0]["image_url"]["url"].startswith("data:image/png;base64,")
-            assert content[1] == {"type": "text", "text": "make it blue"}
+        call_kwargs = mock_client.chat.completions.create.call_args[1]
+        messages = call_kwargs["messages"]
+        assert len(messages) == 1
+        content = messages[0]["content"]
+        # Should be multimodal list, not plain string
+        assert isinstance(content, list)
+        assert len(content) == 2
+        assert content[0]["type"] == "image_url"
+        assert content[0]["image_url"]["url"].startswith("data:image/png;base64,")
+        assert content[1] == {"type": "text", "text": "make it blue"}
 
     @pytest.mark.asyncio
-    async def test_google_with_reference_image(self, workspace):
+    async def test_google_with_reference_image(self, workspace, google_client):
         """Google should receive multimodal contents with image bytes + text."""
         img_path = os.path.join(workspace, "ref.jpg")
         with open(img_path, "wb") as f:
@@ -731,24 +755,21 @@ class TestImageGenerationTool:
             workspace=workspace, provider="google", api_key="google-key",
             model="gemini-2.0-flash",
         )
-        with patch("src.tools.image_gen.genai") as mock_genai, \
-             patch("src.tools.image_gen.types") as mock_types:
-            mock_client = MagicMock()
-            mock_client.aio.models.generate_content = AsyncMock(
-                return_value=_google_response(FAKE_IMAGE_DATA)
-            )
-            mock_genai.Client.return_value = mock_client
+        mock_client, _, mock_types = google_client
+        mock_client.aio.models.generate_content = AsyncMock(
+            return_value=_GOOGLE_PNG_RESPONSE
+        )
 
-            await tool._arun(prompt="add a hat", reference_image="ref.jpg")
+        await tool._arun(prompt="add a hat", reference_image="ref.jpg")
 
-            call_kwargs = mock_client.aio.models.generate_content.call_args[1]
-            # contents should be the types.Content object, not a plain string
-            assert call_kwargs["contents"] == mock_types.Content.return_value
-            mock_types.Part.from_bytes.assert_called_once_with(
-                data=FAKE_IMAGE_DATA, mime_type="image/jpeg",
-            )
-            mock_types.Part.from_text.assert_called_once_with(text="add a hat")
-            mock_types.Content.assert_called_once()
+        call_kwargs = mock_client.aio.models.generate_content.call_args[1]
+        # contents should be the types.Content object, not a plain string
+        assert call_kwargs["contents"] == mock_types.Content.return_value
+        mock_types.Part.from_bytes.assert_called_once_with(
+            data=FAKE_IMAGE_DATA, mime_type="image/jpeg",
+        )
+        mock_types.Part.from_text.assert_called_once_with(text="add a hat")
+        mock_types.Content.assert_called_once()
 
     @pytest.mark.asyncio
     async def test_reference_image_path_traversal_dotdot(self, workspace):
@@ -771,7 +792,7 @@ class TestImageGenerationTool:
         assert "Access denied" in _rtext(result)
 
     @pytest.mark.asyncio
-    async def test_reference_image_absolute_path_within_workspace(self, workspace):
+    async def test_reference_image_absolute_path_within_workspace(self, workspace, openai_client):
         """Absolute path inside workspace should be accepted."""
         img_path = os.path.join(workspace, "photo.png")
         with open(img_path, "wb") as f:
@@ -780,18 +801,16 @@ class TestImageGenerationTool:
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
 
-            result = await tool._arun(prompt="edit", reference_image=img_path)
+        result = await tool._arun(prompt="edit", reference_image=img_path)
 
         assert _rsuccess(result) is True
         assert "sandbox://" in _rtext(result)
 
     @pytest.mark.asyncio
-    async def test_reference_image_dot_slash_relative(self, workspace):
+    async def test_reference_image_dot_slash_relative(self, workspace, openai_client):
         """./file.png style relative path should resolve correctly."""
         img_path = os.path.join(workspace, "input.png")
         with open(img_path, "wb") as f:
@@ -800,18 +819,16 @@ class TestImageGenerationTool:
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
 
-            result = await tool._arun(prompt="edit", reference_image="./input.png")
+        result = await tool._arun(prompt="edit", reference_image="./input.png")
 
         assert _rsuccess(result) is True
         assert "sandbox://" in _rtext(result)
 
     @pytest.mark.asyncio
-    async def test_reference_image_with_multiple_n(self, workspace):
+    async def test_reference_image_with_multiple_n(self, workspace, openai_client):
         """reference_image + n>1 should send the same multimodal content n times."""
         img_path = os.path.join(workspace, "ref.png")
         with open(img_path, "wb") as f:
@@ -820,12 +837,10 @@ class TestImageGenerationTool:
         tool = ImageGenerationTool(
             workspace=workspace, provider="openai", api_key="sk-test", model="gpt-4o",
         )
-        with patch("src.tools.image_gen.openai.AsyncOpenAI") as mock_cls:
-            mock_client = AsyncMock()
-            mock_client.chat.completions.create = AsyncMock(return_value=_openai_response(FAKE_B64))
-            mock_cls.return_value = mock_client
+        mock_client, _ = openai_client
+        mock_client.chat.completions.create = AsyncMock(return_value=_OPENAI_PNG_RESPONSE)
 
-            result = await tool._arun(prompt="variations", reference_image="ref.png", n=2)
+        result = await tool._arun(prompt="variations", reference_image="ref.png", n=2)
 
         assert _rsuccess(result) is True
         assert _rtext(result).count("sandbox://") == 2
@@ -835,6 +850,39 @@ class TestImageGenerationTool:
             content = call[1]["messages"][0]["content"]
             assert isinstance(content, list)
 
+
+class TestImageGenUtils:
+    """Module helpers and input schema."""
+
+    def test_parse_size(self):
+        assert _parse_size("1024x1536") == (1024, 1536)
+        assert _parse_size("800x800") == (800, 800)
+
+    def test_input_schema_descriptions_clarify_provider_behavior(self):
+        if hasattr(ImageGenerationInput, "model_json_schema"):
+            schema = ImageGenerationInput.model_json_schema()
+        else:
+            schema = ImageGenerationInput.schema()
+
+        size_desc = schema["properties"]["size"]["description"].lower()
+        quality_desc = schema["properties"]["quality"]["description"].lower()
+
+        assert "wxh" in size_desc
+        assert "best-effort" in size_desc
+        assert "openai" in size_desc
+        assert "google" in size_desc
+        assert "1k/2k/4k" in size_desc
+        assert "openai only" in quality_desc
+        assert "ignored by google" in quality_desc
+
+    def test_parse_size_invalid(self):
+        with pytest.raises((ValueError, IndexError)):
+            _parse_size("abc")
+        with pytest.raises((ValueError, IndexError)):
+            _parse_size("1024")
+        with pytest.raises((ValueError, IndexError)):
+            _parse_size("")
+
     def test_mime_types_mapping(self):
         """Verify all MIME type mappings are correct."""
         assert _MIME_TYPES == {
@@ -858,85 +906,3 @@ class TestImageGenerationTool:
     def test_strip_data_uri_images_empty_after_strip(self):
         text = f"![img](data:image/jpeg;base64,{FAKE_B64})"
         assert _strip_data_uri_images(text) == ""
-
-    # --- Google null/empty response tests ---
-
-    @pytest.mark.asyncio
-    async def test_google_no_image_in_response(self, workspace):
-        """When Google returns parts with no inline_data, return fallback message."""
-        tool = ImageGenerationTool(
-            workspace=workspace, provider="google", api_key="google-key",
-            model="gemini-2.0-flash",
-        )
-        resp = MagicMock()
-        text_part = MagicMock()
-        text_part.inline_data = None
-        text_part.text = "Image generation is blocked by policy."
-        resp.candidates = [MagicMock()]
-        resp.candidates[0].content.parts = [text_part]
-
-        with patch("src.tools.image_gen.genai") as mock_genai, \
-             patch("src.tools.image_gen.types"):
-            mock_client = MagicMock()
-            mock_client.aio.models.generate_content = AsyncMock(return_value=resp)
-            mock_genai.Client.return_value = mock_client
-
-            result = await tool._arun(prompt="test")
-
-        assert _rsuccess(result) is False
-        assert "No images were generated" in _rtext(result)
-        assert "Image generation is blocked by policy." in _rtext(result)
-        assert _rdata(result).get("model_output") == "Image generation is blocked by policy."
-        assert _rdata(result).get("raw_output") == "Image generation is blocked by policy."
-        assert _rllm(result) == "Image generation is blocked by policy."
-
-    @pytest.mark.asyncio
-    async def test_google_null_parts_returns_no_images(self, workspace):
-        """When Google returns content.parts=None (policy rejection), return fallback."""
-        tool = ImageGenerationTool(
-            workspace=workspace, provider="google", api_key="google-key",
-            model="gemini-2.0-flash",
-        )
-        resp = MagicMock()
-        resp.candidates = [MagicMock()]
-        resp.candidates[0].content.parts = None
-
-        with patch("src.tools.image_gen.genai") as mock_genai, \
-             patch("src.tools.image_gen.types"):
-            mock_client = MagicMock()
-            mock_client.aio.models.generate_content = AsyncMock(return_value=resp)
-            mock_genai.Client.return_value = mock_client
-
-            result = await tool._arun(prompt="test")
-
-        assert _rsuccess(result) is False
-        assert "No images were generated" in _rtext(result)
-        raw_output = _rdata(result).get("raw_output")
-        assert isinstance(raw_output, str)
-        assert raw_output
-        assert _rllm(result) == raw_output
-
-    @pytest.mark.asyncio
-    async def test_google_empty_candidates_returns_no_images(self, workspace):
-        """When Google returns candidates=[], return fallback."""
-        tool = ImageGenerationTool(
-            workspace=workspace, provider="google", api_key="google-key",
-            model="gemini-2.0-flash",
-        )
-        resp = MagicMock()
-        resp.candidates = []
-
-        with patch("src.tools.image_gen.genai") as mock_genai, \
-             patch("src.tools.image_gen.types"):
-            mock_client = MagicMock()
-            mock_client.aio.models.generate_content = AsyncMock(return_value=resp)
-            mock_genai.Client.return_value = mock_client
-
-            result = await tool._arun(prompt="test")
-
-        assert _rsuccess(result) is False
-        assert "No images were generated" in _rtext(result)
-        raw_output = _rdata(result).get("raw_output")
-        assert isinstance(raw_output, str)
-        assert raw_output
-        assert _rllm(result) == raw_output
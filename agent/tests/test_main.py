@@ -106,7 +106,7 @@ class TestAgentSession:
         # Should not start agent
         assert session._current_task is None
 
-    async def test_handle_cancel(self):
+    def test_handle_cancel(self):
         session = AgentSession("ws://test", "tok")
         session.agent = MagicMock()
         mock_task = MagicMock()
@@ -117,7 +117,7 @@ class TestAgentSession:
         session.agent.cancel.assert_called_once()
         mock_task.cancel.assert_called_once()
 
-    async def test_handle_cancel_no_agent(self):
+    def test_handle_cancel_no_agent(self):
         session = AgentSession("ws://test", "tok")
         session._handle_cancel()  # Should not raise
 
@@ -170,13 +170,13 @@ class TestAgentSession:
         await session._handle_message(json.dumps(msg))
         session._handle_truncate_history.assert_called_once()
 
-    async def test_handle_truncate_history_calls_agent(self):
+    def test_handle_truncate_history_calls_agent(self):
         session = AgentSession("ws://test", "tok")
         session.agent = MagicMock()
         session._handle_truncate_history({"keep_turns": 3})
         session.agent.truncate_history.assert_called_once_with(3)
 
-    async def test_handle_truncate_history_no_agent(self):
+    def test_handle_truncate_history_no_agent(self):
         session = AgentSession("ws://test", "tok")
         session.agent = None
         # Should not raise
@@ -194,6 +194,22 @@ class TestAgentSession:
         session.agent.cancel.assert_called_once()
         mock_task.cancel.assert_called_once()
 
+    async def test_run_agent_sends_events_as_text_frames(self):
+        session = AgentSession("ws://test", "tok")
+        session.ws = AsyncMock()
+        session.agent = MagicMock()
+
+        async def fake_handle_message(*_args):
+            yield StreamEvent("assistant_delta", {"delta": "héllo"})
+
+        session.agent.handle_message = fake_handle_message
+        await session._run_agent("hi")
+
+        payload = session.ws.send.call_args.args[0]
+        assert isinstance(payload, bytes)
+        assert session.ws.send.call_args.kwargs == {"text": True}
+        assert json.loads(payload) == {"type": "assistant_delta", "delta": "héllo"}
+
     async def test_send_error(self):
         session = AgentSession("ws://test", "tok")
         session.ws = AsyncMock()
@@ -14,6 +14,7 @@ from src.agent import ChatAgent, StreamEvent
 from src.tools.web import WebFetchTool, WebSearchTool
 from src.tools.search import GrepTool
 from .result_helpers import _rtext
+from .stubs import _StubLLM, _StubTool
 
 
 # ---------------------------------------------------------------------------
@@ -41,9 +42,9 @@ class TestWebFetchToolAsync:
     @patch("src.tools.web.httpx.AsyncClient")
     async def test_fetch_html(self, mock_client_cls):
         mock_response = MagicMock()
-        mock_response.text = (
-            "<html><head><title>Test</title></head>"
-            "<body><h1>Hello</h1><p>World</p></body></html>"
+        mock_response.content = (
+            b"<html><head><title>Test</title></head>"
+            b"<body><h1>Hello</h1><p>World</p></body></html>"
         )
         mock_response.headers = {"content-type": "text/html; charset=utf-8"}
         mock_response.raise_for_status = MagicMock()
@@ -64,7 +65,7 @@ class TestWebFetchToolAsync:
     @patch("src.tools.web.httpx.AsyncClient")
     async def test_fetch_plain_text(self, mock_client_cls):
         mock_response = MagicMock()
-        mock_response.text = "Plain text content here"
+        mock_response.content = b"Plain text content here"
         mock_response.headers = {"content-type": "text/plain"}
         mock_response.raise_for_status = MagicMock()
 
@@ -81,9 +82,8 @@ class TestWebFetchToolAsync:
     @pytest.mark.asyncio
     @patch("src.tools.web.httpx.AsyncClient")
     async def test_fetch_truncation(self, mock_client_cls):
-        long_text = "x" * 60000
         mock_response = MagicMock()
-        mock_response.text = long_text
+        mock_response.content = b"x" * 60000
         mock_response.headers = {"content-type": "text/plain"}
         mock_response.raise_for_status = MagicMock()
 
@@ -168,7 +168,6 @@ class TestWebFetchToolAsync:
 # ---------------------------------------------------------------------------
 
 class TestCancelDuringStreaming:
-    @patch("src.agent.create_chat_model")
     async def test_cancel_stops_iteration(self, mock_create):
         """Setting _cancelled mid-stream should stop yielding events."""
         chunks_yielded = 0
@@ -181,8 +180,7 @@ class TestCancelDuringStreaming:
                     content=f"chunk{i} ", tool_call_chunks=[]
                 )
 
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         agent = ChatAgent(_make_config())
@@ -205,7 +203,6 @@ class TestCancelDuringStreaming:
 # ---------------------------------------------------------------------------
 
 class TestThinkingDeltas:
-    @patch("src.agent.create_chat_model")
     async def test_anthropic_thinking_blocks(self, mock_create):
         """Anthropic-style thinking blocks should emit thinking_delta events."""
         async def fake_astream(messages):
@@ -222,9 +219,7 @@ class TestThinkingDeltas:
                 tool_call_chunks=[],
             )
 
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
-        mock_llm.bind = MagicMock(return_value=mock_llm)
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         config = _make_config(provider="anthropic")
@@ -240,7 +235,6 @@ class TestThinkingDeltas:
         delta_events = [e for e in events if e.type == "assistant_delta"]
         assert any("answer" in e.data["delta"] for e in delta_events)
 
-    @patch("src.agent.create_chat_model")
     async def test_openai_reasoning_blocks(self, mock_create):
         """OpenAI-style reasoning blocks should emit thinking_delta events."""
         async def fake_astream(messages):
@@ -260,9 +254,7 @@ class TestThinkingDeltas:
                 tool_call_chunks=[],
             )
 
-        mock_llm = MagicMock()
-        mock_llm.astream = fake_astream
-        mock_llm.bind = MagicMock(return_value=mock_llm)
+        mock_llm = _StubLLM(fake_astream)
         mock_create.return_value = mock_llm
 
         config = _make_config(provider="openai")
@@ -281,7 +273,6 @@ class TestThinkingDeltas:
 # ---------------------------------------------------------------------------
 
 class TestMaxIterations:
-    @patch("src.agent.create_chat_model")
     async def test_max_iterations_exceeded(self, mock_create):
         """Agent should stop after MAX_ITERATIONS and emit an error."""
         import src.agent as agent_module
@@ -299,14 +290,10 @@ class TestMaxIterations:
                 ],
             )
 
-        mock_llm = MagicMock()
-        mock_llm.astream = infinite_tool_calls
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
+        mock_llm = _StubLLM(infinite_tool_calls)
         mock_create.return_value = mock_llm
 
-        mock_tool = MagicMock()
-        mock_tool.name = "bash"
-        mock_tool.ainvoke = AsyncMock(return_value="hi")
+        mock_tool = _StubTool("bash", result="hi")
 
         previous_max_iterations = agent_module.MAX_ITERATIONS
         agent_module.MAX_ITERATIONS = 2
@@ -392,15 +379,17 @@ class TestPathTraversalSharedPrefix:
 # _get_thinking_llm with custom thinking_budget
 # ---------------------------------------------------------------------------
 
+@pytest.fixture
+def mock_llm(mock_create) -> MagicMock:
+    """Chat model whose bind() calls the budget tests assert on."""
+    llm = MagicMock()
+    mock_create.return_value = llm
+    return llm
+
+
 class TestGetThinkingLlmBudget:
-    @patch("src.agent.create_chat_model")
-    def test_default_budget_anthropic(self, mock_create):
+    def test_default_budget_anthropic(self, mock_llm):
         """_get_thinking_llm(None) should use default budget (128000) for Anthropic."""
-        mock_llm = MagicMock()
-        mock_llm.bind = MagicMock(return_value=mock_llm)
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
-        mock_create.return_value = mock_llm
-
         config = _make_config(provider="anthropic")
         agent = ChatAgent(config)
         agent._get_thinking_llm(None)
@@ -410,14 +399,8 @@ class TestGetThinkingLlmBudget:
             thinking={"type": "enabled", "budget_tokens": 128000 - 1},
         )
 
-    @patch("src.agent.create_chat_model")
-    def test_custom_budget_anthropic(self, mock_create):
+    def test_custom_budget_anthropic(self, mock_llm):
         """_get_thinking_llm(200000) should use custom budget for Anthropic."""
-        mock_llm = MagicMock()
-        mock_llm.bind = MagicMock(return_value=mock_llm)
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
-        mock_create.return_value = mock_llm
-
         config = _make_config(provider="anthropic")
         agent = ChatAgent(config)
         agent._get_thinking_llm(200000)
@@ -427,14 +410,8 @@ class TestGetThinkingLlmBudget:
             thinking={"type": "enabled", "budget_tokens": 200000 - 1},
         )
 
-    @patch("src.agent.create_chat_model")
-    def test_custom_budget_google(self, mock_create):
+    def test_custom_budget_google(self, mock_llm):
         """_get_thinking_llm(100000) should use custom budget for Google."""
-        mock_llm = MagicMock()
-        mock_llm.bind = MagicMock(return_value=mock_llm)
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
-        mock_create.return_value = mock_llm
-
         config = _make_config(provider="google")
         agent = ChatAgent(config)
         agent._get_thinking_llm(100000)
@@ -444,14 +421,8 @@ class TestGetThinkingLlmBudget:
             thinking_budget=100000 - 1,
         )
 
-    @patch("src.agent.create_chat_model")
-    def test_default_budget_google(self, mock_create):
+    def test_default_budget_google(self, mock_llm):
         """_get_thinking_llm(None) should use default budget (128000) for Google."""
-        mock_llm = MagicMock()
-        mock_llm.bind = MagicMock(return_value=mock_llm)
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
-        mock_create.return_value = mock_llm
-
         config = _make_config(provider="google")
         agent = ChatAgent(config)
         agent._get_thinking_llm(None)
@@ -461,14 +432,8 @@ class TestGetThinkingLlmBudget:
             thinking_budget=128000 - 1,
         )
 
-    @patch("src.agent.create_chat_model")
-    def test_openai_uses_budget(self, mock_create):
+    def test_openai_uses_budget(self, mock_llm):
         """OpenAI should set max_completion_tokens from budget."""
-        mock_llm = MagicMock()
-        mock_llm.bind = MagicMock(return_value=mock_llm)
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
-        mock_create.return_value = mock_llm
-
         config = _make_config(provider="openai")
         agent = ChatAgent(config)
         agent._get_thinking_llm(200000)
@@ -478,14 +443,8 @@ class TestGetThinkingLlmBudget:
             reasoning={"effort": "high", "summary": "auto"},
         )
 
-    @patch("src.agent.create_chat_model")
-    def test_mistral_uses_budget_as_max_tokens(self, mock_create):
+    def test_mistral_uses_budget_as_max_tokens(self, mock_llm):
         """Mistral (no thinking) should set max_tokens from budget."""
-        mock_llm = MagicMock()
-        mock_llm.bind = MagicMock(return_value=mock_llm)
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
-        mock_create.return_value = mock_llm
-
         config = _make_config(provider="mistral")
         agent = ChatAgent(config)
         agent._get_thinking_llm(50000)
@@ -494,56 +453,32 @@ class TestGetThinkingLlmBudget:
 
 
 class TestGetBudgetedLlmBudget:
-    @patch("src.agent.create_chat_model")
-    def test_default_budget_openai(self, mock_create):
+    def test_default_budget_openai(self, mock_llm):
         """_get_budgeted_llm(None) should use default budget for OpenAI."""
-        mock_llm = MagicMock()
-        mock_llm.bind = MagicMock(return_value=mock_llm)
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
-        mock_create.return_value = mock_llm
-
         config = _make_config(provider="openai")
         agent = ChatAgent(config)
         agent._get_budgeted_llm(None)
 
         mock_llm.bind.assert_called_once_with(max_completion_tokens=128000)
 
-    @patch("src.agent.create_chat_model")
-    def test_budgeted_llm_clamps_below_min(self, mock_create):
+    def test_budgeted_llm_clamps_below_min(self, mock_llm):
         """_get_budgeted_llm should clamp too-small values to a safe minimum."""
-        mock_llm = MagicMock()
-        mock_llm.bind = MagicMock(return_value=mock_llm)
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
-        mock_create.return_value = mock_llm
-
         config = _make_config(provider="openai")
         agent = ChatAgent(config)
         agent._get_budgeted_llm(1)
 
         mock_llm.bind.assert_called_once_with(max_completion_tokens=1024)
 
-    @patch("src.agent.create_chat_model")
-    def test_budgeted_llm_clamps_above_max(self, mock_create):
+    def test_budgeted_llm_clamps_above_max(self, mock_llm):
         """_get_budgeted_llm should clamp too-large values to a safe maximum."""
-        mock_llm = MagicMock()
-        mock_llm.bind = MagicMock(return_value=mock_llm)
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
-        mock_create.return_value = mock_llm
-
         config = _make_config(provider="openai")
         agent = ChatAgent(config)
         agent._get_budgeted_llm(2_000_000)
 
         mock_llm.bind.assert_called_once_with(max_completion_tokens=1_000_000)
 
-    @patch("src.agent.create_chat_model")
-    def test_thinking_llm_clamps_below_min_before_provider_specific_budget(self, mock_create):
+    def test_thinking_llm_clamps_below_min_before_provider_specific_budget(self, mock_llm):
         """_get_thinking_llm should clamp then derive provider-specific thinking budget."""
-        mock_llm = MagicMock()
-        mock_llm.bind = MagicMock(return_value=mock_llm)
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
-        mock_create.return_value = mock_llm
-
         config = _make_config(provider="anthropic")
         agent = ChatAgent(config)
         agent._get_thinking_llm(1)
@@ -553,14 +488,8 @@ class TestGetBudgetedLlmBudget:
             thinking={"type": "enabled", "budget_tokens": 1023},
         )
 
-    @patch("src.agent.create_chat_model")
-    def test_thinking_llm_google_clamps_above_max_before_provider_specific_budget(self, mock_create):
+    def test_thinking_llm_google_clamps_above_max_before_provider_specific_budget(self, mock_llm):
         """Google thinking params should derive from the clamped max budget."""
-        mock_llm = MagicMock()
-        mock_llm.bind = MagicMock(return_value=mock_llm)
-        mock_llm.bind_tools = MagicMock(return_value=mock_llm)
-        mock_create.return_value = mock_llm
-
         config = _make_config(provider="google")
         agent = ChatAgent(config)
         agent._get_thinking_llm(2_000_000)
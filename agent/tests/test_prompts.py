@@ -32,6 +32,7 @@ class TestToolDescriptions:
             "glob",
             "grep",
             "web_fetch",
+            "web_fetch_many",
             "web_search",
             "question",
             "code_interpreter",
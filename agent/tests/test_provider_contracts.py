@@ -55,3 +55,12 @@ def test_openai_contract_extracts_reasoning_and_text() -> None:
 def test_base_contract_extracts_default_thinking_block() -> None:
     contract = get_provider_contract("mistral")
     assert contract.extract_thinking_deltas({"type": "thinking", "thinking": "hmm"}) == ["hmm"]
+
+
+def test_extract_block_deltas_routes_by_block_type() -> None:
+    contract = get_provider_contract("openai")
+    assert contract.extract_block_deltas({"type": "text", "text": "hi"}) == ((), "hi")
+    assert contract.extract_block_deltas(
+        {"type": "reasoning", "reasoning": "because"}
+    ) == (["because"], "")
+    assert contract.extract_block_deltas({"type": "tool_use", "id": "x"}) == ([], "")
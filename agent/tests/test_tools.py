@@ -2,15 +2,17 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 import tempfile
 from pathlib import Path
-from typing import Any
+from typing import Any, Self
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
 import pytest
+from httpx_sse import ServerSentEvent
 
 from src.tools.bash import BashTool
 from src.tools.file_ops import EditTool, ReadTool, WriteTool
@@ -18,7 +20,7 @@ from src.tools._paths import resolve_workspace_path as _resolve_path
 from src.tools.list_tool import ListTool
 from src.tools.question import QuestionInput, QuestionTool
 from src.tools.search import GlobTool, GrepTool, _expand_braces
-from src.tools.web import WebFetchTool, WebSearchTool
+from src.tools.web import WebFetchManyTool, WebFetchTool, WebSearchTool
 from src.tools.code_interpreter import CodeInterpreterTool
 from .result_helpers import _rdata, _rllm, _rmeta, _rtext
 
@@ -977,6 +979,36 @@ class TestCodeInterpreterTool:
 # WebFetchTool (async only, tested with mock)
 # ---------------------------------------------------------------------------
 
+class _FakeFetchClient:
+    """Stand-in for httpx.AsyncClient that serves one canned response."""
+
+    def __init__(self, response) -> None:
+        self._response = response
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_exc) -> bool:
+        return False
+
+    async def get(self, _url):
+        return self._response
+
+
+@pytest.fixture
+def fetch_response(monkeypatch):
+    """Serve a canned body to WebFetchTool without any network."""
+    def wire(content: bytes, content_type: str, url: str) -> None:
+        response = MagicMock()
+        response.content = content
+        response.headers = {"content-type": content_type}
+        response.url = url
+        monkeypatch.setattr(
+            "src.tools.web.httpx.AsyncClient", lambda **_kw: _FakeFetchClient(response),
+        )
+    return wire
+
+
 class TestWebFetchTool:
     def test_sync_raises(self):
         from src.tools.web import WebFetchTool
@@ -984,12 +1016,47 @@ class TestWebFetchTool:
         with pytest.raises(NotImplementedError):
             tool._run("https://example.com")
 
+    def test_parse_content_type(self):
+        from src.tools.web import _parse_content_type
+        assert _parse_content_type("Text/HTML; Charset=\"UTF-8\"") == ("text", "html", "utf-8")
+        assert _parse_content_type("application/json") == ("application", "json", "")
+        assert _parse_content_type("") == ("", "", "")
+
+    @pytest.mark.parametrize("header", [
+        "text/plain",
+        "application/json; charset=utf-8",
+        "application/ld+json",
+        "application/xhtml+xml",
+        "application/x-yaml",
+        "application/x-ndjson",
+        "application/jsonl",
+        "application/x-json",
+        "application/json-seq",
+        "application/x-csv",
+        "application/xml-dtd",
+    ])
+    def test_is_textual_content_type(self, header):
+        from src.tools.web import _parse_content_type
+        assert WebFetchTool()._is_textual_content_type(parsed_type=_parse_content_type(header))
+
+    @pytest.mark.parametrize("header", ["image/png", "application/octet-stream", ""])
+    def test_rejects_binary_content_type(self, header):
+        from src.tools.web import _parse_content_type
+        assert not WebFetchTool()._is_textual_content_type(parsed_type=_parse_content_type(header))
+
+    def test_only_html_and_json_are_formatted(self):
+        from src.tools.web import _is_passthrough_type, _parse_content_type
+        for header in ("text/plain", "text/csv", "application/yaml", "application/xml"):
+            assert _is_passthrough_type(_parse_content_type(header)) is True
+        for header in ("text/html", "application/xhtml+xml", "application/json",
+                       "application/ld+json"):
+            assert _is_passthrough_type(_parse_content_type(header)) is False
+
     @pytest.mark.asyncio
     @patch("src.tools.web.httpx.AsyncClient")
     async def test_html_format_returns_raw_html(self, mock_client_cls):
         response = MagicMock()
         response.content = b"<h1>Title</h1><p>Hello</p>"
-        response.text = "<h1>Title</h1><p>Hello</p>"
         response.headers = {"content-type": "text/html; charset=utf-8"}
         response.url = "https://example.com"
         response.raise_for_status = MagicMock()
@@ -1011,7 +1078,6 @@ class TestWebFetchTool:
     async def test_html_text_format_strips_tags(self, mock_client_cls):
         response = MagicMock()
         response.content = b"<h1>Title</h1><p>Hello</p>"
-        response.text = "<h1>Title</h1><p>Hello</p>"
         response.headers = {"content-type": "text/html"}
         response.url = "https://example.com"
         response.raise_for_status = MagicMock()
@@ -1033,7 +1099,6 @@ class TestWebFetchTool:
     async def test_json_markdown_format_wraps_code_fence(self, mock_client_cls):
         response = MagicMock()
         response.content = b'{"ok": true, "n": 1}'
-        response.text = '{"ok": true, "n": 1}'
         response.headers = {"content-type": "application/json"}
         response.url = "https://example.com/api"
         response.raise_for_status = MagicMock()
@@ -1056,7 +1121,6 @@ class TestWebFetchTool:
         big_bytes = b"x" * ((5 * 1024 * 1024) + 1)
         response = MagicMock()
         response.content = big_bytes
-        response.text = "x"
         response.headers = {"content-type": "text/plain"}
         response.url = "https://example.com/large"
         response.raise_for_status = MagicMock()
@@ -1072,11 +1136,159 @@ class TestWebFetchTool:
         assert result["success"] is False
         assert "response too large" in _rtext(result).lower()
 
+    @pytest.mark.asyncio
+    async def test_plain_text_decodes_only_needed_prefix(self, fetch_response):
+        fetch_response(
+            "é".encode() * 1000, "text/plain; charset=utf-8", "https://example.com/utf8",
+        )
+
+        tool = WebFetchTool()
+        result = await tool._arun("https://example.com/utf8", max_length=10)
+        assert _rtext(result) == "é" * 10 + "\n... content truncated"
+        assert _rmeta(result)["truncated"] is True
+        assert _rmeta(result)["original_char_count"] is None
+        assert _rmeta(result)["bytes"] == 2000
+
+    @pytest.mark.asyncio
+    async def test_stateful_charset_is_decoded_whole(self, fetch_response):
+        body = "日本語のテキスト" * 20
+        fetch_response(
+            body.encode("iso-2022-jp"),
+            "text/plain; charset=iso-2022-jp",
+            "https://example.com/jp",
+        )
+
+        tool = WebFetchTool()
+        result = await tool._arun("https://example.com/jp", max_length=10)
+        assert _rtext(result) == body[:10] + "\n... content truncated"
+        assert _rmeta(result)["truncated"] is True
+        assert _rmeta(result)["original_char_count"] == len(body)
+
+    @pytest.mark.asyncio
+    async def test_passthrough_body_skips_formatter(self, fetch_response):
+        fetch_response(
+            b"<note><to>Tove</to></note>", "application/xml", "https://example.com/note.xml",
+        )
+
+        tool = WebFetchTool()
+        with patch.object(WebFetchTool, "_format_response_body", side_effect=AssertionError):
+            result = await tool._arun("https://example.com/note.xml", format="text")
+        assert _rtext(result) == "<note><to>Tove</to></note>"
+        assert _rmeta(result)["truncated"] is False
+        assert _rmeta(result)["original_char_count"] == len("<note><to>Tove</to></note>")
+
+
+# ---------------------------------------------------------------------------
+# WebFetchManyTool (async only, tested with mock)
+# ---------------------------------------------------------------------------
+
+class TestWebFetchManyTool:
+    def test_sync_raises(self):
+        tool = WebFetchManyTool()
+        with pytest.raises(NotImplementedError):
+            tool._run(["https://example.com"])
+
+    @pytest.mark.asyncio
+    async def test_afetch_many_preserves_order_and_bounds_concurrency(self):
+        in_flight = 0
+        peak = 0
+
+        async def fake_arun(self, url, max_length=50000, format="markdown"):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if url.endswith("/boom"):
+                raise RuntimeError("boom")
+            return {"kind": "web_fetch", "text": url, "success": True}
+
+        urls = [f"https://example.com/{i}" for i in range(6)] + ["https://example.com/boom"]
+        with patch.object(WebFetchTool, "_arun", fake_arun):
+            results = await WebFetchTool().afetch_many(urls, concurrency=2)
+
+        assert peak == 2
+        assert [r["text"] for r in results[:6]] == urls[:6]
+        assert results[6]["success"] is False
+        assert "boom" in _rtext(results[6])
+
+    @pytest.mark.asyncio
+    async def test_arun_combines_results(self):
+        async def fake_arun(self, url, max_length=50000, format="markdown"):
+            if url.endswith("/missing"):
+                return {"kind": "web_fetch", "text": "Error: HTTP 404", "success": False}
+            return {"kind": "web_fetch", "text": f"body of {url}", "success": True}
+
+        urls = ["https://example.com/a", "https://example.com/missing"]
+        with patch.object(WebFetchTool, "_arun", fake_arun):
+            result = await WebFetchManyTool()._arun(urls, format="text")
+
+        assert result["kind"] == "web_fetch_many"
+        assert result["success"] is True
+        assert "## https://example.com/a\n\nbody of https://example.com/a" in _rtext(result)
+        assert "HTTP 404" in _rtext(result)
+        assert [r["url"] for r in _rdata(result)["results"]] == urls
+        assert [r["success"] for r in _rdata(result)["results"]] == [True, False]
+        assert all("text" not in r for r in _rdata(result)["results"])
+        assert _rmeta(result) == {"url_count": 2, "failed_count": 1}
+
+    @pytest.mark.asyncio
+    async def test_arun_reports_error_when_every_url_fails(self):
+        async def fake_arun(self, url, max_length=50000, format="markdown"):
+            return {"kind": "web_fetch", "text": "Error: HTTP 404", "success": False,
+                    "error": "HTTP 404"}
+
+        urls = ["https://example.com/a", "https://example.com/b"]
+        with patch.object(WebFetchTool, "_arun", fake_arun):
+            result = await WebFetchManyTool()._arun(urls)
+
+        assert result["success"] is False
+        assert "all 2 URLs failed" in result["error"]
+        assert _rdata(result)["results"][0]["error"] == "HTTP 404"
+        assert _rmeta(result) == {"url_count": 2, "failed_count": 2}
+
+    @pytest.mark.asyncio
+    async def test_rejects_empty_and_oversized_batches(self):
+        tool = WebFetchManyTool()
+        assert (await tool._arun([]))["success"] is False
+        too_many = [f"https://example.com/{i}" for i in range(21)]
+        result = await tool._arun(too_many)
+        assert result["success"] is False
+        assert "too many urls" in _rtext(result).lower()
+
 
 # ---------------------------------------------------------------------------
 # WebSearchTool (async only, tested with mock)
 # ---------------------------------------------------------------------------
 
+class _FakeSSE:
+    """Stand-in for both the httpx client and aconnect_sse's context."""
+
+    def __init__(self, events=()) -> None:
+        self._events = events
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_exc) -> bool:
+        return False
+
+    async def aiter_sse(self):
+        for event in self._events:
+            yield event
+
+
+@pytest.fixture
+def sse_events(monkeypatch):
+    """Serve the given SSE events to WebSearchTool without any network."""
+    def wire(events) -> None:
+        monkeypatch.setattr("src.tools.web.httpx.AsyncClient", lambda **_kw: _FakeSSE())
+        monkeypatch.setattr(
+            "src.tools.web.httpx_sse.aconnect_sse", lambda *_a, **_kw: _FakeSSE(events),
+        )
+    return wire
+
+
 class TestWebSearchTool:
     def test_sync_raises(self):
         tool = WebSearchTool()
@@ -1084,31 +1296,11 @@ class TestWebSearchTool:
             tool._run("test query")
 
     @pytest.mark.asyncio
-    @patch("src.tools.web.httpx_sse.aconnect_sse")
-    @patch("src.tools.web.httpx.AsyncClient")
-    async def test_successful_search(self, mock_client_cls, mock_aconnect):
-        # Build a mock SSE event
-        mock_event = MagicMock()
-        mock_event.data = json.dumps({
+    async def test_successful_search(self, sse_events):
+        sse_events([ServerSentEvent(data=json.dumps({
             "jsonrpc": "2.0", "id": 1,
             "result": {"content": [{"type": "text", "text": "Search results here"}]},
-        })
-
-        mock_event_source = MagicMock()
-        async def _aiter():
-            yield mock_event
-        mock_event_source.aiter_sse = _aiter
-
-        # aconnect_sse is an async context manager
-        mock_ctx = AsyncMock()
-        mock_ctx.__aenter__ = AsyncMock(return_value=mock_event_source)
-        mock_ctx.__aexit__ = AsyncMock(return_value=False)
-        mock_aconnect.return_value = mock_ctx
-
-        mock_client = AsyncMock()
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=False)
-        mock_client_cls.return_value = mock_client
+        }))])
 
         tool = WebSearchTool()
         result = await tool._arun("test query")
@@ -1117,29 +1309,11 @@ class TestWebSearchTool:
         assert _rtext(result) == "Search results here"
 
     @pytest.mark.asyncio
-    @patch("src.tools.web.httpx_sse.aconnect_sse")
-    @patch("src.tools.web.httpx.AsyncClient")
-    async def test_no_results(self, mock_client_cls, mock_aconnect):
-        mock_event = MagicMock()
-        mock_event.data = json.dumps({
+    async def test_no_results(self, sse_events):
+        sse_events([ServerSentEvent(data=json.dumps({
             "jsonrpc": "2.0", "id": 1,
             "result": {"content": []},
-        })
-
-        mock_event_source = MagicMock()
-        async def _aiter():
-            yield mock_event
-        mock_event_source.aiter_sse = _aiter
-
-        mock_ctx = AsyncMock()
-        mock_ctx.__aenter__ = AsyncMock(return_value=mock_event_source)
-        mock_ctx.__aexit__ = AsyncMock(return_value=False)
-        mock_aconnect.return_value = mock_ctx
-
-        mock_client = AsyncMock()
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=False)
-        mock_client_cls.return_value = mock_client
+        }))])
 
         tool = WebSearchTool()
         result = await tool._arun("nothing")
@@ -1171,6 +1345,40 @@ class TestWebSearchTool:
             result = await tool._arun("test")
             assert "Error" in _rtext(result)
 
+    @pytest.mark.asyncio
+    async def test_jsonrpc_error_frame_returns_error(self, sse_events):
+        error_event = ServerSentEvent(data=json.dumps({
+            "jsonrpc": "2.0", "id": 1,
+            "error": {"code": -32602, "message": "invalid query"},
+        }))
+        sse_events([error_event])
+
+        result = await WebSearchTool()._arun("test")
+        assert result["success"] is False
+        assert "invalid query" in _rtext(result)
+
+    @pytest.mark.asyncio
+    async def test_sse_error_event_returns_error(self, sse_events):
+        sse_events([ServerSentEvent(event="error", data="upstream down")])
+
+        result = await WebSearchTool()._arun("test")
+        assert result["success"] is False
+        assert "upstream down" in _rtext(result)
+
+    @pytest.mark.asyncio
+    async def test_stops_reading_after_event_cap(self, sse_events):
+        from src.tools.web import MAX_SSE_EVENTS
+        noise = [ServerSentEvent(data="{}") for _ in range(MAX_SSE_EVENTS)]
+        late_result = ServerSentEvent(data=json.dumps({
+            "result": {"content": [{"type": "text", "text": "too late"}]},
+        }))
+        sse_events([*noise, late_result])
+
+        result = await WebSearchTool()._arun("test")
+        assert result["success"] is False
+        assert "SSE event" in result["error"]
+        assert "too late" not in _rtext(result)
+
 
 # ---------------------------------------------------------------------------
 # create_all_tools
@@ -1196,11 +1404,12 @@ class TestCreateAllTools:
         assert "glob" in names
         assert "grep" in names
         assert "web_fetch" in names
+        assert "web_fetch_many" in names
         assert "web_search" in names
         assert "question" in names
         assert "code_interpreter" in names
         assert "image_generation" in names
-        assert len(tools) == 12
+        assert len(tools) == 13
 
     def test_creates_tools_without_image_config(self, workspace):
         from src.tools import create_all_tools
@@ -1209,7 +1418,7 @@ class TestCreateAllTools:
         assert "image_generation" not in names
         assert "list" in names
         assert "question" in names
-        assert len(tools) == 11
+        assert len(tools) == 12
 
     def test_creates_tools_without_provider(self, workspace):
         from src.tools import create_all_tools
@@ -1218,7 +1427,7 @@ class TestCreateAllTools:
         assert "image_generation" not in names
         assert "list" in names
         assert "question" in names
-        assert len(tools) == 11
+        assert len(tools) == 12
 
     def test_image_tool_uses_image_config(self, workspace):
         from src.tools import create_all_tools